@@ -1,19 +1,40 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 from pydantic import BaseModel, EmailStr
+from typing import Optional
 
-from app.core.database import get_db
-from app.core.security import verify_password, create_access_token, verify_token, get_password_hash
+from app.core.cache import TTLCache
+from app.core.database import get_async_db
+from app.core.security import verify_password_async, create_access_token, verify_token, get_password_hash_async
 from app.models.user import User, UserRole, TrainingStatus
 from app.core.config import settings
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.activity_service import ActivityService, LOGIN
 
 router = APIRouter()
 
 # OAuth2密码流
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# 当前用户缓存：按令牌 subject（邮箱）缓存用户快照，避免每个请求都查询数据库
+principal_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+# 缓存的用户字段（不缓存密码哈希）
+_PRINCIPAL_FIELDS = (
+    "id", "email", "name", "role", "is_active",
+    "training_status", "training_progress", "created_at", "updated_at"
+)
+
+# 会话中待提交后清除缓存的邮箱
+_PENDING_INVALIDATIONS = "principal_invalidations"
+
 
 # Pydantic模型
 class UserResponse(BaseModel):
@@ -32,6 +53,11 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class LoginRequest(BaseModel):
@@ -44,20 +70,69 @@ class ResetPasswordRequest(BaseModel):
     newPassword: str
 
 
-def get_user_by_email(db: Session, email: str):
+async def get_user_by_email(db: AsyncSession, email: str):
     """根据邮箱获取用户"""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
 
-def authenticate_user(db: Session, email: str, password: str):
+async def authenticate_user(db: AsyncSession, email: str, password: str):
     """验证用户"""
-    user = get_user_by_email(db, email)
-    if not user or not verify_password(password, user.hashed_password):
+    user = await get_user_by_email(db, email)
+    if not user or not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def invalidate_principal(email: str):
+    """使指定用户的缓存失效"""
+    if email:
+        principal_cache.invalidate(email)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_principal_change(mapper, connection, target):
+    """用户资料、角色或密码变更时记录需清除缓存的邮箱（包括修改前的邮箱）
+
+    flush 时事务尚未提交，此时清除缓存，并发请求仍可能读到旧数据并重新缓存，因此提交后再清除
+    """
+    emails = {target.email, *(inspect(target).attrs.email.history.deleted or ())}
+    session = object_session(target)
+    if session is None:
+        for email in emails:
+            invalidate_principal(email)
+        return
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).update(emails)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals_after_commit(session: Session):
+    """事务提交后清除变更用户的缓存"""
+    for email in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        invalidate_principal(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session: Session):
+    """事务回滚后缓存仍然有效"""
+    session.info.pop(_PENDING_INVALIDATIONS, None)
+
+
+async def _load_principal(db: AsyncSession, email: str):
+    """读取当前用户，优先使用缓存快照"""
+    snapshot = principal_cache.get(email)
+    if snapshot is not None:
+        # 返回未绑定会话的用户对象，处理函数只读取其字段
+        return User(**snapshot)
+
+    user = await get_user_by_email(db, email=email)
+    if user is not None:
+        principal_cache.set(email, {field: getattr(user, field) for field in _PRINCIPAL_FIELDS})
+    return user
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     """获取当前用户"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,19 +148,19 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except Exception:
         raise credentials_exception
     
-    user = get_user_by_email(db, email=email)
+    user = await _load_principal(db, email)
     if user is None:
         raise credentials_exception
     return user
 
 
 @router.post("/login", response_model=Token)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """用户登录"""
     # 添加调试日志
     print(f"DEBUG: 登录请求 - Email: {login_data.email}, Password: {login_data.password[:3]}***")
     
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
         print(f"DEBUG: 认证失败 - Email: {login_data.email}")
         raise HTTPException(
@@ -101,6 +176,46 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
         data={"sub": user.email}, expires_delta=access_token_expires
     )
     
+    # 登录事件随刷新令牌一起提交
+    ActivityService(db).record(LOGIN, f"{user.name}登录了系统", actor=user)
+    
+    refresh_token = await RefreshTokenService(db).issue("local", user.email)
+    
+    user_response = UserResponse(
+        id=user.id,
+        email=user.email,
+        name=user.name,
+        role=user.role.value,
+        training_status=user.training_status.value,
+        training_progress=user.training_progress
+    )
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": user_response,
+        "refresh_token": refresh_token
+    }
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(refresh_data: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """使用刷新令牌换取新的访问令牌（无需重新验证密码）"""
+    email, refresh_token = await RefreshTokenService(db).rotate("local", refresh_data.refresh_token)
+    
+    user = await get_user_by_email(db, email)
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无法验证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.email}, expires_delta=access_token_expires
+    )
+    
     user_response = UserResponse(
         id=user.id,
         email=user.email,
@@ -113,7 +228,8 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": user_response
+        "user": user_response,
+        "refresh_token": refresh_token
     }
 
 
@@ -131,16 +247,18 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout():
+async def logout(refresh_data: Optional[RefreshRequest] = None, db: AsyncSession = Depends(get_async_db)):
     """登出"""
+    if refresh_data is not None:
+        await RefreshTokenService(db).revoke("local", refresh_data.refresh_token)
     return {"message": "登出成功"}
 
 
 @router.post("/reset-password")
-async def reset_password(reset_data: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(reset_data: ResetPasswordRequest, db: AsyncSession = Depends(get_async_db)):
     """重置密码"""
     # 查找用户
-    user = get_user_by_email(db, reset_data.email)
+    user = await get_user_by_email(db, reset_data.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -156,12 +274,14 @@ async def reset_password(reset_data: ResetPasswordRequest, db: Session = Depends
     
     try:
         # 更新密码
-        user.hashed_password = get_password_hash(reset_data.newPassword)
-        db.commit()
+        user.hashed_password = await get_password_hash_async(reset_data.newPassword)
+        # 与新密码一起提交：吊销该用户全部刷新令牌，已泄露的刷新令牌不能再换取访问令牌
+        await RefreshTokenService(db).revoke_user("local", user.email)
+        invalidate_principal(user.email)
         
         return {"message": "密码重置成功"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="重置密码失败，请重试"
@@ -1,11 +1,12 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime, timezone
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_read_db
 from app.api.auth import get_current_user
 from app.models.user import User
 from app.models.learning_progress import LearningProgress
@@ -40,29 +41,32 @@ class LearningProgressResponse(BaseModel):
 async def start_learning(
     request: LearningProgressCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """开始学习资料"""
     # 检查资料是否存在
-    material = db.query(TrainingMaterial).filter(TrainingMaterial.id == request.material_id).first()
+    material = await db.get(TrainingMaterial, request.material_id)
     if not material:
         raise HTTPException(status_code=404, detail="培训资料不存在")
     
     # 检查是否已有学习记录
-    existing_progress = db.query(LearningProgress).filter(
-        and_(
-            LearningProgress.user_id == current_user.id,
-            LearningProgress.material_id == request.material_id
+    result = await db.execute(
+        select(LearningProgress).where(
+            and_(
+                LearningProgress.user_id == current_user.id,
+                LearningProgress.material_id == request.material_id
+            )
         )
-    ).first()
+    )
+    existing_progress = result.scalars().first()
     
     if existing_progress:
         # 更新开始时间和最后活跃时间
         existing_progress.start_time = datetime.now(timezone.utc)
         existing_progress.last_active_time = datetime.now(timezone.utc)
         existing_progress.updated_at = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(existing_progress)
+        await db.commit()
+        await db.refresh(existing_progress)
         
         # 计算进度百分比
         progress_percentage = min(100, int((existing_progress.total_study_seconds / (15 * 60)) * 100))
@@ -86,15 +90,28 @@ async def start_learning(
     )
     
     db.add(progress)
-    db.commit()
-    db.refresh(progress)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 并发请求已创建同一资料的记录（唯一索引 user_id + material_id），直接返回已有记录
+        await db.rollback()
+        result = await db.execute(
+            select(LearningProgress).where(
+                and_(
+                    LearningProgress.user_id == current_user.id,
+                    LearningProgress.material_id == request.material_id
+                )
+            )
+        )
+        progress = result.scalars().one()
+    await db.refresh(progress)
     
     return LearningProgressResponse(
         id=progress.id,
         material_id=progress.material_id,
         total_study_seconds=progress.total_study_seconds,
         is_completed=progress.is_completed,
-        progress_percentage=0,
+        progress_percentage=min(100, int((progress.total_study_seconds / (15 * 60)) * 100)),
         start_time=progress.start_time,
         completion_time=progress.completion_time
     )
@@ -105,15 +122,18 @@ async def update_learning_progress(
     progress_id: int,
     request: LearningProgressUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新学习进度"""
-    progress = db.query(LearningProgress).filter(
-        and_(
-            LearningProgress.id == progress_id,
-            LearningProgress.user_id == current_user.id
+    result = await db.execute(
+        select(LearningProgress).where(
+            and_(
+                LearningProgress.id == progress_id,
+                LearningProgress.user_id == current_user.id
+            )
         )
-    ).first()
+    )
+    progress = result.scalars().first()
     
     if not progress:
         raise HTTPException(status_code=404, detail="学习记录不存在")
@@ -133,8 +153,8 @@ async def update_learning_progress(
         if request.is_completed and not progress.completion_time:
             progress.completion_time = datetime.now(timezone.utc)
     
-    db.commit()
-    db.refresh(progress)
+    await db.commit()
+    await db.refresh(progress)
     
     # 计算进度百分比
     progress_percentage = min(100, int((progress.total_study_seconds / (15 * 60)) * 100))
@@ -154,15 +174,18 @@ async def update_learning_progress(
 async def get_material_progress(
     material_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取特定资料的学习进度"""
-    progress = db.query(LearningProgress).filter(
-        and_(
-            LearningProgress.user_id == current_user.id,
-            LearningProgress.material_id == material_id
+    result = await db.execute(
+        select(LearningProgress).where(
+            and_(
+                LearningProgress.user_id == current_user.id,
+                LearningProgress.material_id == material_id
+            )
         )
-    ).first()
+    )
+    progress = result.scalars().first()
     
     if not progress:
         return None
@@ -184,12 +207,15 @@ async def get_material_progress(
 @router.get("/", response_model=List[LearningProgressResponse])
 async def get_all_progress(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取用户所有学习进度"""
-    progress_list = db.query(LearningProgress).filter(
-        LearningProgress.user_id == current_user.id
-    ).all()
+    rows = await db.execute(
+        select(LearningProgress).where(
+            LearningProgress.user_id == current_user.id
+        )
+    )
+    progress_list = rows.scalars().all()
     
     result = []
     for progress in progress_list:
@@ -1,22 +1,45 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File, Form, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-import os
-import uuid
 import shutil
+import uuid
+from email.utils import formatdate
 from pathlib import Path
 from datetime import datetime, timedelta
 import logging
 
-from app.core.database import get_db
-from app.api.auth import get_current_user
-from app.models.user import User, UserRole
-from app.models.training import TrainingMaterial, MaterialType, PracticeSession, CourseTopic
+from app.core.database import get_async_db, get_read_db
+from app.core.reference_cache import cached_json_response
+from app.core.pagination import approximate_count, fetch_keyset_page, set_pagination_headers
+from app.core.config import settings
+from app.core.security import hash_executor, jwt_cache
+from app.core.uploads import save_upload
+from app.services.resumable_upload_service import TUS_VERSION, resumable_uploads
+from app.services.material_blob_service import (
+    MATERIAL_DIR, MaterialBlobService, blob_lock, blob_url, normalize_sha256
+)
+from app.services.media_processing_service import MediaProcessingService, asset_response
+from app.services.progress_report_service import iter_csv, iter_report_rows, iter_xlsx, xlsx_available
+from app.services.material_search_service import MaterialSearchService, schedule_text_extraction
+from app.api.auth import get_current_user, principal_cache
+from app.models.user import User, UserRole, TrainingStatus
+from app.models.training import TrainingMaterial, MaterialType, CourseTopic
 from app.services.sync_service import SyncService
+from app.services.dashboard_counter_service import DashboardCounterService
+from app.services.activity_service import ActivityService, MATERIAL_UPLOAD, format_relative_time
+from app.services.analytics_service import AnalyticsService, GRANULARITIES
+from app.services.leaderboard_service import LeaderboardService
+from app.services.course_topic_service import CourseTopicService
+from app.services.reference_data_service import (
+    ReferenceDataService, invalidate_reference_data, COURSE_TOPICS, MANAGER_COURSE_TOPICS
+)
 from app.models.sync import SyncLog, MaterialVersion
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -84,112 +107,140 @@ def verify_manager_role(current_user: User = Depends(get_current_user)):
 @router.get("/stats", response_model=ManagerStats)
 async def get_manager_stats(
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取管理员统计数据"""
-    from app.models.user import TrainingStatus
-    
-    # 获取教师总数
-    total_teachers = db.query(User).filter(User.role == UserRole.TEACHER).count()
-    
-    # 获取已完成培训的教师数
-    completed_training = db.query(User).filter(
-        User.role == UserRole.TEACHER,
-        User.training_status == TrainingStatus.COMPLETED
-    ).count()
-    
-    # 获取进行中培训的教师数
-    in_progress_training = db.query(User).filter(
-        User.role == UserRole.TEACHER,
-        User.training_status == TrainingStatus.IN_PROGRESS
-    ).count()
-    
-    # 获取待评审的练习会话数
-    pending_reviews = db.query(PracticeSession).filter(
-        PracticeSession.status == "pending_review"
-    ).count()
-    
-    return ManagerStats(
-        total_teachers=total_teachers,
-        completed_training=completed_training,
-        in_progress_training=in_progress_training,
-        pending_reviews=pending_reviews
-    )
+    # 计数随教师和练习状态变化增量维护，这里只读取一行
+    counters = await DashboardCounterService(db).get_counters()
+    return ManagerStats(**counters)
+
+
+@router.post("/stats/reconcile", response_model=ManagerStats)
+async def reconcile_manager_stats(
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """从源表重建管理员统计计数"""
+    counters = await DashboardCounterService(db).reconcile()
+    return ManagerStats(**counters)
+
+
+@router.get("/system/stats")
+async def get_system_stats(current_user: User = Depends(verify_manager_role)):
+    """获取运行时统计（本工作进程）：密码哈希执行器的排队深度、成功/失败/拒绝次数和耗时，认证缓存命中率"""
+    return {
+        "password_hash": hash_executor.stats(),
+        "jwt_cache": jwt_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+    }
 
 
 @router.get("/activities")
 async def get_recent_activities(
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页的 next_cursor"),
+    limit: int = Query(15, ge=1, le=100, description="每页条数"),
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取最近活动"""
-    from datetime import datetime, timedelta
-    from sqlalchemy import desc, or_
-    
-    # 获取最近7天的活动
-    recent_date = datetime.now() - timedelta(days=7)
+    """获取最近活动（按时间倒序，键集分页）"""
+    events, next_cursor = await ActivityService(db).feed(cursor, limit)
     
-    activities = []
+    return {
+        "activities": [
+            {
+                "id": event.id,
+                "type": event.event_type,
+                "description": event.title,
+                "time": format_relative_time(event.created_at),
+                "created_at": event.created_at.isoformat()
+            }
+            for event in events
+        ],
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/teachers", response_model=List[TeacherInfo])
+async def get_teachers_list(
+    response: Response,
+    training_status: Optional[str] = Query(None, description="培训状态: not_started, in_progress, completed"),
+    role: str = Query(UserRole.TEACHER.value, description="用户角色: teacher, manager"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页响应头 X-Next-Cursor）"),
+    limit: int = Query(100, ge=1, le=1000, description="每页数量"),
+    include_total: bool = Query(False, description="是否在响应头 X-Total-Count 中返回总数（近似值）"),
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """获取教师列表（按创建顺序倒序的键集分页）"""
+    try:
+        query = select(User).where(User.role == UserRole(role))
+        if training_status:
+            query = query.where(User.training_status == TrainingStatus(training_status))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"无效的筛选条件: {str(e)}")
     
-    # 获取最近的练习会话
-    recent_sessions = db.query(PracticeSession, User).join(
-        User, PracticeSession.user_id == User.id
-    ).filter(
-        PracticeSession.created_at >= recent_date
-    ).order_by(desc(PracticeSession.created_at)).limit(10).all()
+    teachers, next_cursor = await fetch_keyset_page(db, query, User.id, cursor, limit)
+    total, approximate = await approximate_count(db, query) if include_total else (None, False)
+    set_pagination_headers(response, next_cursor, total, approximate)
     
-    for session, user in recent_sessions:
-        time_diff = datetime.now() - session.created_at
-        if time_diff.days > 0:
-            time_str = f"{time_diff.days}天前"
-        elif time_diff.seconds > 3600:
-            time_str = f"{time_diff.seconds // 3600}小时前"
-        else:
-            time_str = f"{time_diff.seconds // 60}分钟前"
-        
-        activities.append({
-            "id": session.id,
-            "description": f"{user.name}完成了试讲练习",
-            "time": time_str
-        })
-    
-    # 获取最近注册的教师
-    recent_teachers = db.query(User).filter(
-        User.role == UserRole.TEACHER,
-        User.created_at >= recent_date
-    ).order_by(desc(User.created_at)).limit(5).all()
+    return [
+        TeacherInfo(
+            id=teacher.id,
+            name=teacher.name,
+            email=teacher.email,
+            training_status=teacher.training_status.value,
+            training_progress=teacher.training_progress,
+            created_at=teacher.created_at.isoformat() if teacher.created_at else ""
+        )
+        for teacher in teachers
+    ]
+
+
+@router.get("/reports/progress")
+async def export_progress_report(
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="导出格式：csv 或 xlsx"),
+    gzip: bool = Query(False, description="是否 gzip 压缩"),
+    training_status: Optional[str] = Query(None, description="培训状态: not_started, in_progress, completed"),
+    current_user: User = Depends(verify_manager_role)
+):
+    """流式导出教师学习进度报表（每位教师每个资料一行，附练习汇总）"""
+    try:
+        status_filter = TrainingStatus(training_status) if training_status else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的培训状态: {training_status}")
     
-    for teacher in recent_teachers:
-        time_diff = datetime.now() - teacher.created_at
-        if time_diff.days > 0:
-            time_str = f"{time_diff.days}天前"
-        elif time_diff.seconds > 3600:
-            time_str = f"{time_diff.seconds // 3600}小时前"
-        else:
-            time_str = f"{time_diff.seconds // 60}分钟前"
-        
-        activities.append({
-            "id": f"user_{teacher.id}",
-            "description": f"新教师{teacher.name}注册了账户",
-            "time": time_str
-        })
+    if format == "xlsx":
+        if not xlsx_available():
+            raise HTTPException(status_code=400, detail="服务器未安装 openpyxl，无法导出 XLSX，请使用 CSV 格式")
+        body = iter_xlsx(iter_report_rows(status_filter), compress=gzip)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        body = iter_csv(iter_report_rows(status_filter), compress=gzip)
+        media_type = "text/csv; charset=utf-8"
     
-    # 按时间排序
-    activities.sort(key=lambda x: x["time"])
+    filename = f"teacher_progress_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
     
-    return {
-        "activities": activities[:15]  # 返回最近15条活动
-    }
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
-@router.get("/teachers", response_model=List[TeacherInfo])
-async def get_teachers_list(
+@router.get("/teachers/search", response_model=List[TeacherInfo])
+async def search_teachers(
+    q: str = Query(..., min_length=1, max_length=100, description="姓名或邮箱（前缀匹配）"),
+    limit: int = Query(20, ge=1, le=100, description="最多返回数量"),
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取教师列表"""
-    # TODO: 实现教师列表查询
-    teachers = db.query(User).filter(User.role == UserRole.TEACHER).all()
+    """按姓名或邮箱搜索教师，结果按相关度排序"""
+    from app.services.teacher_search_service import TeacherSearchService
+    
+    teachers = await TeacherSearchService(db).search(q, limit=limit)
     
     return [
         TeacherInfo(
@@ -207,7 +258,7 @@ async def get_teachers_list(
 @router.post("/teachers")
 async def create_teacher(
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建教师账户"""
     # TODO: 实现教师账户创建
@@ -215,11 +266,32 @@ async def create_teacher(
     return {"message": "教师账户创建功能开发中"}
 
 
+@router.post("/teachers/import")
+async def import_teachers(
+    file: UploadFile = File(...),
+    sync_supabase: bool = Form(False),
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """批量导入教师账户（CSV 或 JSON，字段：name, email, password, training_status）"""
+    from app.services.teacher_import_service import TeacherImportService
+    
+    import_service = TeacherImportService(db, sync_supabase=sync_supabase)
+    try:
+        rows = TeacherImportService.iter_rows(file.file, file.filename or "")
+        return await import_service.import_rows(rows)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"导入文件解析失败: {str(e)}"
+        )
+
+
 @router.put("/teachers/{teacher_id}")
 async def update_teacher(
     teacher_id: int,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新教师信息"""
     # TODO: 实现教师信息更新
@@ -231,7 +303,7 @@ async def update_teacher(
 async def delete_teacher(
     teacher_id: int,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除教师账户"""
     # TODO: 实现教师账户删除
@@ -242,7 +314,7 @@ async def delete_teacher(
 @router.get("/lectures")
 async def get_pending_lectures(
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取待评审讲座"""
     # TODO: 实现待评审讲座查询
@@ -306,7 +378,7 @@ async def review_lecture(
     lecture_id: int,
     review_data: LectureReviewRequest,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """提交讲座评审结果"""
     # TODO: 实现讲座评审数据库操作
@@ -342,11 +414,25 @@ async def auto_review(
 
 @router.get("/materials", response_model=List[MaterialResponse])
 async def get_materials_list(
+    response: Response,
+    category: Optional[str] = Query(None, description="资料类别"),
+    material_status: Optional[str] = Query(None, alias="status", description="状态: draft, published, archived"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页响应头 X-Next-Cursor）"),
+    limit: int = Query(100, ge=1, le=1000, description="每页数量"),
+    include_total: bool = Query(False, description="是否在响应头 X-Total-Count 中返回总数（近似值）"),
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取培训资料列表"""
-    materials = db.query(TrainingMaterial).order_by(TrainingMaterial.created_at.desc()).all()
+    """获取培训资料列表（按创建顺序倒序的键集分页）"""
+    query = select(TrainingMaterial)
+    if category:
+        query = query.where(TrainingMaterial.category == category)
+    if material_status:
+        query = query.where(TrainingMaterial.status == material_status)
+    
+    materials, next_cursor = await fetch_keyset_page(db, query, TrainingMaterial.id, cursor, limit)
+    total, approximate = await approximate_count(db, query) if include_total else (None, False)
+    set_pagination_headers(response, next_cursor, total, approximate)
     
     return [
         MaterialResponse(
@@ -366,6 +452,110 @@ async def get_materials_list(
     ]
 
 
+# 允许上传的文件类型及保存时使用的扩展名
+ALLOWED_MATERIAL_TYPES = {
+    'application/pdf': '.pdf',
+    'application/msword': '.doc',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
+    'application/vnd.ms-powerpoint': '.ppt',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': '.pptx',
+    'video/mp4': '.mp4',
+    'video/avi': '.avi',
+    'video/quicktime': '.mov',
+    'video/x-ms-wmv': '.wmv',
+    'audio/mpeg': '.mp3',
+    'audio/mp3': '.mp3',
+    'text/plain': '.txt'  # 添加文本文件支持
+}
+
+def check_material_content_type(content_type: Optional[str]) -> str:
+    """验证文件类型，返回保存时使用的扩展名"""
+    if content_type not in ALLOWED_MATERIAL_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的文件类型: {content_type}"
+        )
+    return ALLOWED_MATERIAL_TYPES[content_type]
+
+
+def parse_material_type(type: str) -> MaterialType:
+    """将字符串类型转换为 MaterialType 枚举，无法识别时默认为文档类型"""
+    try:
+        return MaterialType(type.lower())
+    except ValueError:
+        return MaterialType.DOCUMENT
+
+
+def material_response(material: TrainingMaterial) -> MaterialResponse:
+    """转换为资料响应模型"""
+    return MaterialResponse(
+        id=material.id,
+        title=material.title,
+        description=material.description,
+        category=material.category,
+        type=material.type.value,  # 转换枚举为字符串
+        status=material.status,
+        file_url=material.file_url,
+        file_size=material.file_size,
+        download_count=material.download_count,
+        created_at=material.created_at.isoformat(),
+        updated_at=material.updated_at.isoformat() if material.updated_at else material.created_at.isoformat()
+    )
+
+
+async def create_uploaded_material(
+    db: AsyncSession,
+    current_user: User,
+    title: str,
+    description: str,
+    category: str,
+    type: str,
+    status: str,
+    sha256: str,
+    file_size: int,
+    extension: str,
+    source: Optional[Path] = None
+) -> TrainingMaterial:
+    """按内容哈希引用资料文件（内容首次出现时保存 source）并创建资料记录、写入上传事件，
+    文档在后台提取正文供搜索，音视频文件登记后台处理任务"""
+    async with blob_lock(sha256):
+        blob, created = await MaterialBlobService(db).acquire(sha256, file_size, extension, source)
+        file_path = blob.path
+        try:
+            material = TrainingMaterial(
+                title=title,
+                description=description,
+                category=category,
+                type=parse_material_type(type),
+                status=status,
+                file_url=blob_url(file_path),
+                file_path=file_path,  # 存储本地文件路径
+                file_size=format_file_size(blob.size),
+                download_count=0
+            )
+            
+            db.add(material)
+            await db.flush()
+            ActivityService(db).record(
+                MATERIAL_UPLOAD, f"{current_user.name}上传了培训资料",
+                description=f"资料: {title}", actor=current_user,
+                subject_type="training_material", subject_id=material.id
+            )
+            await db.commit()
+        except BaseException:
+            # 本次新建的记录尚未提交，其他进程写入同一内容时会等待该记录回滚，
+            # 此时不存在已提交的记录引用该文件，回滚前随记录一起删除
+            if created:
+                Path(file_path).unlink(missing_ok=True)
+            await db.rollback()
+            raise
+    await db.refresh(material)
+    if created:
+        schedule_text_extraction(sha256, file_path)
+    await MediaProcessingService(db).schedule(material)
+    return material
+
+
 @router.post("/materials", response_model=MaterialResponse)
 async def upload_material(
     title: str = Form(...),
@@ -375,126 +565,196 @@ async def upload_material(
     status: str = Form("draft"),
     file: UploadFile = File(...),
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """上传新的培训资料"""
     try:
         # 验证文件类型
-        allowed_types = {
-            'application/pdf': '.pdf',
-            'application/msword': '.doc',
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
-            'application/vnd.ms-powerpoint': '.ppt',
-            'application/vnd.openxmlformats-officedocument.presentationml.presentation': '.pptx',
-            'video/mp4': '.mp4',
-            'video/avi': '.avi',
-            'video/quicktime': '.mov',
-            'video/x-ms-wmv': '.wmv',
-            'audio/mpeg': '.mp3',
-            'audio/mp3': '.mp3',
-            'text/plain': '.txt'  # 添加文本文件支持
-        }
-        
-        if file.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"不支持的文件类型: {file.content_type}"
-            )
-        
-        # 验证文件大小 (100MB)
-        max_size = 100 * 1024 * 1024
-        if file.size and file.size > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail="文件大小不能超过 100MB"
-            )
+        file_extension = check_material_content_type(file.content_type)
         
-        # 创建上传目录
-        upload_dir = Path("uploads/materials")
-        upload_dir.mkdir(parents=True, exist_ok=True)
+        # 按块异步保存到临时文件，写入过程中检查大小上限 (100MB) 并计算 SHA-256
+        stored = await save_upload(file, MATERIAL_DIR, settings.MATERIAL_MAX_UPLOAD_SIZE)
+        file_path = stored.path
         
-        # 生成唯一文件名
-        file_extension = allowed_types[file.content_type]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = upload_dir / unique_filename
-        
-        # 保存文件
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # 计算文件大小
-        file_size_bytes = os.path.getsize(file_path)
-        file_size_str = format_file_size(file_size_bytes)
-        
-        # 创建数据库记录
-        from datetime import datetime
-        
-        # 将字符串类型转换为 MaterialType 枚举
-        material_type = None
-        if type.lower() == "video":
-            material_type = MaterialType.VIDEO
-        elif type.lower() == "document":
-            material_type = MaterialType.DOCUMENT
-        elif type.lower() == "audio":
-            material_type = MaterialType.AUDIO
-        elif type.lower() == "interactive":
-            material_type = MaterialType.INTERACTIVE
-        else:
-            material_type = MaterialType.DOCUMENT  # 默认为文档类型
-        
-        material = TrainingMaterial(
-            title=title,
-            description=description,
-            category=category,
-            type=material_type,
-            status=status,
-            file_url=f"/uploads/materials/{unique_filename}",
-            file_path=str(file_path),  # 存储本地文件路径
-            file_size=file_size_str,
-            download_count=0
-        )
-        
-        db.add(material)
-        db.commit()
-        db.refresh(material)
-        
-        return MaterialResponse(
-            id=material.id,
-            title=material.title,
-            description=material.description,
-            category=material.category,
-            type=material.type.value,  # 转换枚举为字符串
-            status=material.status,
-            file_url=material.file_url,
-            file_size=material.file_size,
-            download_count=material.download_count,
-            created_at=material.created_at.isoformat(),
-            updated_at=material.updated_at.isoformat() if material.updated_at else material.created_at.isoformat()
+        # 按哈希保存（已有相同内容时只增加引用）并创建数据库记录
+        material = await create_uploaded_material(
+            db, current_user, title, description, category, type, status,
+            stored.sha256, stored.size, file_extension, file_path
         )
+        return material_response(material)
         
+    except HTTPException:
+        # 参数校验、大小超限、磁盘空间不足等错误原样返回（save_upload 已清理临时文件）
+        raise
     except Exception as e:
         # 打印详细错误信息到日志
         import traceback
         print(f"文件上传错误: {str(e)}")
         print(f"错误堆栈: {traceback.format_exc()}")
         
-        # 如果出错，删除已上传的文件
-        if 'file_path' in locals() and file_path.exists():
-            file_path.unlink()
         raise HTTPException(
             status_code=500,
             detail=f"文件上传失败: {str(e)}"
         )
+    finally:
+        # 临时文件已移动到内容寻址路径或因内容重复、出错需要删除
+        if 'file_path' in locals():
+            file_path.unlink(missing_ok=True)
+
+
+class MaterialFromBlob(BaseModel):
+    sha256: str
+    title: str
+    description: str
+    category: str = "教学文档"
+    type: str
+    status: str = "draft"
+
+
+@router.post("/materials/from-blob", response_model=MaterialResponse)
+async def create_material_from_blob(
+    material_data: MaterialFromBlob,
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """按 SHA-256 引用服务器上已有的文件创建资料，无需再次上传；文件不存在时返回404，客户端改为上传"""
+    sha256 = normalize_sha256(material_data.sha256)
+    material = await create_uploaded_material(
+        db, current_user, material_data.title, material_data.description, material_data.category,
+        material_data.type, material_data.status, sha256, 0, ""
+    )
+    return material_response(material)
+
+
+# 断点续传上传（参照 tus 协议）：
+# POST 创建（请求头 Upload-Length，请求体为资料信息）→ PATCH 按 Upload-Offset 追加数据
+# → 中断后 HEAD 查询已接收字节数并续传 → POST /complete 生成培训资料
+class ResumableUploadCreate(BaseModel):
+    title: str
+    description: str
+    category: str = "教学文档"
+    type: str
+    status: str = "draft"
+    filename: Optional[str] = None
+    content_type: str
+
+
+def _tus_headers(upload: dict) -> dict:
+    """断点续传响应头"""
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(upload["offset"]),
+        "Upload-Length": str(upload["length"]),
+        "Upload-Expires": formatdate(upload["expires_at"], usegmt=True),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("/uploads", status_code=status.HTTP_201_CREATED)
+async def create_resumable_upload(
+    request: Request,
+    response: Response,
+    upload_data: ResumableUploadCreate,
+    current_user: User = Depends(verify_manager_role)
+):
+    """创建断点续传上传，返回上传地址（Location）"""
+    check_material_content_type(upload_data.content_type)
+    try:
+        length = int(request.headers.get("upload-length", ""))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="缺少或无效的 Upload-Length 请求头")
+    
+    upload = resumable_uploads.create(length, {
+        **upload_data.model_dump(),
+        "owner_id": current_user.id
+    })
+    response.headers.update(_tus_headers(upload))
+    response.headers["Location"] = str(request.url_for("get_resumable_upload", upload_id=upload["id"]))
+    return {"id": upload["id"], "offset": upload["offset"], "length": upload["length"]}
+
+
+def _owned_upload(upload_id: str, current_user: User) -> dict:
+    """读取当前管理员创建的上传"""
+    upload = resumable_uploads.get(upload_id)
+    if upload["metadata"].get("owner_id") != current_user.id:
+        raise HTTPException(status_code=404, detail="上传不存在或已过期")
+    return upload
+
+
+@router.head("/uploads/{upload_id}", name="get_resumable_upload")
+async def get_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(verify_manager_role)
+):
+    """查询上传进度（Upload-Offset 为服务器已接收的字节数）"""
+    upload = _owned_upload(upload_id, current_user)
+    return Response(status_code=status.HTTP_200_OK, headers=_tus_headers(upload))
+
+
+@router.patch("/uploads/{upload_id}")
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    current_user: User = Depends(verify_manager_role)
+):
+    """从 Upload-Offset 处追加上传数据（请求体为原始字节）"""
+    if request.headers.get("content-type") != "application/offset+octet-stream":
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Content-Type 必须为 application/offset+octet-stream"
+        )
+    try:
+        offset = int(request.headers.get("upload-offset", ""))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="缺少或无效的 Upload-Offset 请求头")
+    
+    _owned_upload(upload_id, current_user)
+    upload = await resumable_uploads.append(upload_id, offset, request.stream())
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_tus_headers(upload))
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(verify_manager_role)
+):
+    """取消上传并删除已接收的数据"""
+    _owned_upload(upload_id, current_user)
+    resumable_uploads.delete(upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=MaterialResponse)
+async def complete_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """上传全部数据后生成培训资料"""
+    upload = _owned_upload(upload_id, current_user)
+    metadata = upload["metadata"]
+    file_extension = check_material_content_type(metadata['content_type'])
+    file_path = MATERIAL_DIR / f".{uuid.uuid4().hex}.part"
+    
+    upload = await resumable_uploads.complete(upload_id, file_path)
+    try:
+        material = await create_uploaded_material(
+            db, current_user, metadata["title"], metadata["description"], metadata["category"],
+            metadata["type"], metadata["status"], upload["sha256"], upload["length"], file_extension, file_path
+        )
+    finally:
+        file_path.unlink(missing_ok=True)
+    return material_response(material)
 
 
 @router.delete("/materials/{material_id}")
 async def delete_material(
     material_id: int,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除培训资料"""
-    material = db.query(TrainingMaterial).filter(TrainingMaterial.id == material_id).first()
+    material = await db.get(TrainingMaterial, material_id)
     
     if not material:
         raise HTTPException(
@@ -502,22 +762,76 @@ async def delete_material(
             detail="资料不存在"
         )
     
-    # 删除文件
-    if material.file_url:
-        file_path = Path("uploads") / "materials" / Path(material.file_url).name
-        if file_path.exists():
+    blobs = MaterialBlobService(db)
+    blob = await blobs.find_by_path(material.file_path)
+    if blob is None:
+        # 内容寻址之前上传的文件只属于这条资料，直接删除
+        if material.file_url:
+            file_path = MATERIAL_DIR / Path(material.file_url).name
+            if file_path.exists():
+                try:
+                    file_path.unlink()
+                except Exception as e:
+                    logger.warning(f"删除文件失败: {file_path}: {e}")
+        
+        await db.delete(material)
+        await db.commit()
+        return {"message": "资料删除成功"}
+    
+    # 删除数据库记录并减少文件引用，最后一条引用删除后才删除文件
+    async with blob_lock(blob.sha256):
+        await db.delete(material)
+        orphan = await blobs.release(blob.sha256)
+        media_dir = await MediaProcessingService(db).discard(blob.sha256) if orphan else None
+        if orphan:
+            await MaterialSearchService(db).discard(blob.sha256)
+        await db.commit()
+        if orphan:
             try:
-                file_path.unlink()
+                orphan.unlink(missing_ok=True)
+                shutil.rmtree(media_dir, ignore_errors=True)
             except Exception as e:
-                print(f"删除文件失败: {e}")
-    
-    # 删除数据库记录
-    db.delete(material)
-    db.commit()
+                logger.warning(f"删除文件失败: {orphan}: {e}")
     
     return {"message": "资料删除成功"}
 
 
+async def _get_material(db: AsyncSession, material_id: int) -> TrainingMaterial:
+    """读取资料，不存在时返回404"""
+    material = await db.get(TrainingMaterial, material_id)
+    if not material:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="资料不存在"
+        )
+    return material
+
+
+@router.get("/materials/{material_id}/media")
+async def get_material_media(
+    material_id: int,
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """查询音视频资料的后台处理状态和结果（时长、媒体信息、封面、HLS 播放列表）"""
+    material = await _get_material(db, material_id)
+    return asset_response(await MediaProcessingService(db).get(material))
+
+
+@router.post("/materials/{material_id}/media/reprocess")
+async def reprocess_material_media(
+    material_id: int,
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """重新处理音视频资料（处理失败或启用 HLS 之后）"""
+    material = await _get_material(db, material_id)
+    asset = await MediaProcessingService(db).reprocess(material)
+    if asset is None:
+        raise HTTPException(status_code=400, detail="该资料不是可处理的音视频文件")
+    return asset_response(asset)
+
+
 def format_file_size(bytes_size: int) -> str:
     """格式化文件大小"""
     if bytes_size == 0:
@@ -537,7 +851,7 @@ def format_file_size(bytes_size: int) -> str:
 @router.get("/analytics/overview")
 async def get_analytics_overview(
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取数据分析概览"""
     # TODO: 实现数据分析
@@ -547,140 +861,96 @@ async def get_analytics_overview(
 
 @router.get("/analytics")
 async def get_analytics(
+    granularity: str = Query("day", pattern="^(day|week)$", description="时间桶粒度：day 或 week"),
+    periods: int = Query(30, ge=1, le=366, description="返回最近多少个时间桶"),
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取分析数据"""
-    try:
-        from datetime import datetime, timedelta
-        from sqlalchemy import func
-        
-        # 获取活跃教师数量（最近30天有活动的教师）
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        active_teachers = db.query(User).filter(
-            User.role == UserRole.TEACHER,
-            User.last_login >= thirty_days_ago
-        ).count()
-        
-        # 获取完成的讲座数量
-        completed_lectures = db.query(PracticeSession).filter(
-            PracticeSession.status == "completed"
-        ).count()
-        
-        # 计算平均评分
-        avg_score_result = db.query(func.avg(PracticeSession.overall_score)).filter(
-            PracticeSession.overall_score.isnot(None)
-        ).scalar()
-        average_score = round(float(avg_score_result or 0), 1)
-        
-        # 计算平均时长（分钟）
-        avg_duration_result = db.query(func.avg(PracticeSession.duration)).filter(
-            PracticeSession.duration.isnot(None)
-        ).scalar()
-        average_duration = round(float(avg_duration_result or 0) / 60, 1)  # 转换为分钟
-        
-        return {
-            "activeTeachers": active_teachers,
-            "completedLectures": completed_lectures,
-            "averageScore": average_score,
-            "averageDuration": average_duration
-        }
-    except Exception as e:
-        print(f"获取分析数据失败: {str(e)}")
-        return {
-            "activeTeachers": 0,
-            "completedLectures": 0,
-            "averageScore": 0.0,
-            "averageDuration": 0.0
-        }
+    """获取分析数据：最近30天汇总指标和按天/按周的时间桶序列（只刷新当前桶）"""
+    analytics = AnalyticsService(db)
+    buckets = await analytics.get_buckets(granularity, periods)
+    summary = await analytics.get_summary()
+    
+    return {
+        **summary,
+        "granularity": granularity,
+        "buckets": buckets
+    }
+
+
+@router.post("/analytics/rebuild")
+async def rebuild_analytics(
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """从源表重算全部分析汇总（修正历史数据被补录或修改后的偏差）"""
+    analytics = AnalyticsService(db)
+    rebuilt = {}
+    for granularity in GRANULARITIES:
+        rebuilt[granularity] = await analytics.refresh(granularity, rebuild=True)
+    return {"message": "分析汇总已重建", "buckets": rebuilt}
 
 
 @router.get("/top-teachers")
 async def get_top_teachers(
+    limit: int = Query(5, ge=1, le=100, description="返回前多少名"),
+    days: Optional[int] = Query(None, ge=1, le=365, description="只统计最近多少天的练习，不传时为总榜"),
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取顶级教师数据"""
-    try:
-        # 获取评分最高的教师
-        top_teachers = db.query(
-            User.id,
-            User.name,
-            User.email,
-            func.avg(PracticeSession.overall_score).label('avg_score'),
-            func.count(PracticeSession.id).label('lecture_count')
-        ).join(
-            PracticeSession, User.id == PracticeSession.teacher_id
-        ).filter(
-            User.role == UserRole.TEACHER,
-            PracticeSession.overall_score.isnot(None)
-        ).group_by(
-            User.id, User.name, User.email
-        ).order_by(
-            func.avg(PracticeSession.overall_score).desc()
-        ).limit(5).all()
-        
-        result = []
-        for i, teacher in enumerate(top_teachers):
-            result.append({
-                "id": teacher.id,
-                "name": teacher.name,
-                "email": teacher.email,
-                "rank": i + 1,
-                "score": round(float(teacher.avg_score or 0), 1),
-                "lectureCount": teacher.lecture_count
-            })
-        
-        return result
-    except Exception as e:
-        print(f"获取顶级教师数据失败: {str(e)}")
-        return []
+    """获取顶级教师数据（按平均评分排名）"""
+    return await LeaderboardService(db).top(limit, days)
+
+
+@router.get("/top-teachers/{teacher_id}/rank")
+async def get_teacher_rank(
+    teacher_id: int,
+    days: Optional[int] = Query(None, ge=1, le=365, description="只统计最近多少天的练习，不传时为总榜"),
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """获取教师在排行榜中的名次"""
+    entry = await LeaderboardService(db).rank_of(teacher_id, days)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="该教师暂无评分记录"
+        )
+    return entry
+
+
+@router.post("/top-teachers/rebuild")
+async def rebuild_top_teachers(
+    current_user: User = Depends(verify_manager_role),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """从练习表重建教师排行榜"""
+    teachers = await LeaderboardService(db).rebuild()
+    return {"message": "教师排行榜已重建", "teachers": teachers}
 
 
 @router.get("/recent-activities")
 async def get_recent_activities(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="分页游标，取自响应头 X-Next-Cursor"),
+    limit: int = Query(15, ge=1, le=100, description="每页条数"),
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取最近活动数据"""
-    try:
-        activities = []
-        
-        # 获取最近的练习会话
-        recent_sessions = db.query(PracticeSession).join(
-            User, PracticeSession.teacher_id == User.id
-        ).order_by(PracticeSession.created_at.desc()).limit(10).all()
-        
-        for session in recent_sessions:
-            activities.append({
-                "id": session.id,
-                "type": "lecture",
-                "title": f"{session.teacher.name} 完成了讲座练习",
-                "description": f"模式: {session.mode}, 评分: {session.overall_score or 'N/A'}",
-                "timestamp": session.created_at.isoformat()
-            })
-        
-        # 获取最近注册的教师
-        recent_teachers = db.query(User).filter(
-            User.role == UserRole.TEACHER
-        ).order_by(User.created_at.desc()).limit(5).all()
-        
-        for teacher in recent_teachers:
-            activities.append({
-                "id": f"teacher_{teacher.id}",
-                "type": "login",
-                "title": f"新教师 {teacher.name} 加入平台",
-                "description": f"邮箱: {teacher.email}",
-                "timestamp": teacher.created_at.isoformat()
-            })
-        
-        # 按时间排序
-        activities.sort(key=lambda x: x["timestamp"], reverse=True)
-        
-        return activities[:15]  # 返回最近15条活动
-    except Exception as e:
-        print(f"获取最近活动数据失败: {str(e)}")
-        return []
+    """获取最近活动数据（按时间倒序，下一页游标在响应头 X-Next-Cursor 中）"""
+    events, next_cursor = await ActivityService(db).feed(cursor, limit)
+    set_pagination_headers(response, next_cursor)
+    
+    return [
+        {
+            "id": event.id,
+            "type": event.event_type,
+            "title": event.title,
+            "description": event.description or "",
+            "timestamp": event.created_at.isoformat()
+        }
+        for event in events
+    ]
 
 
 # 同步相关API
@@ -725,20 +995,20 @@ class CourseTopicResponse(BaseModel):
 async def sync_materials_to_teachers(
     sync_request: SyncRequest,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """将培训资料同步给教师"""
-    sync_service = SyncService(db)
-    
     try:
         if sync_request.material_ids:
             # 同步指定资料
             results = []
             for material_id in sync_request.material_ids:
-                success = sync_service.sync_material_to_teachers(
-                    material_id, 
-                    current_user, 
-                    sync_request.target_teacher_ids
+                success = await db.run_sync(
+                    lambda session: SyncService(session).sync_material_to_teachers(
+                        material_id, 
+                        current_user, 
+                        sync_request.target_teacher_ids
+                    )
                 )
                 results.append({
                     "material_id": material_id,
@@ -752,9 +1022,11 @@ async def sync_materials_to_teachers(
             }
         else:
             # 同步所有资料
-            result = sync_service.sync_all_materials_to_teachers(
-                current_user, 
-                sync_request.target_teacher_ids
+            result = await db.run_sync(
+                lambda session: SyncService(session).sync_all_materials_to_teachers(
+                    current_user, 
+                    sync_request.target_teacher_ids
+                )
             )
             return result
             
@@ -770,14 +1042,15 @@ async def get_sync_logs(
     material_id: int = None,
     limit: int = 50,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取同步操作日志"""
-    sync_service = SyncService(db)
-    logs = sync_service.get_sync_logs(
-        user_id=current_user.id,
-        material_id=material_id,
-        limit=limit
+    logs = await db.run_sync(
+        lambda session: SyncService(session).get_sync_logs(
+            user_id=current_user.id,
+            material_id=material_id,
+            limit=limit
+        )
     )
     
     return [
@@ -799,11 +1072,12 @@ async def get_sync_logs(
 async def get_material_versions(
     material_id: int,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取培训资料版本历史"""
-    sync_service = SyncService(db)
-    versions = sync_service.get_material_versions(material_id)
+    versions = await db.run_sync(
+        lambda session: SyncService(session).get_material_versions(material_id)
+    )
     
     return [
         {
@@ -823,19 +1097,21 @@ async def get_material_versions(
 @router.post("/sync/clear-virtual-materials")
 async def clear_virtual_materials(
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """清理教师账户中的虚拟学习资料"""
-    sync_service = SyncService(db)
-    
     # 获取所有教师
-    teachers = db.query(User).filter(User.role == UserRole.TEACHER).all()
+    teachers = (await db.execute(
+        select(User).where(User.role == UserRole.TEACHER)
+    )).scalars().all()
     
     results = []
     for teacher in teachers:
-        result = sync_service.delete_virtual_materials_for_teacher(
-            teacher.id, 
-            current_user
+        result = await db.run_sync(
+            lambda session: SyncService(session).delete_virtual_materials_for_teacher(
+                teacher.id, 
+                current_user
+            )
         )
         results.append({
             "teacher_id": teacher.id,
@@ -853,25 +1129,14 @@ async def clear_virtual_materials(
 # 课程主题管理接口
 @router.get("/course-topics")
 async def get_course_topics(
+    request: Request,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取所有课程主题"""
+    """获取所有课程主题（数据库中没有主题时返回默认主题）"""
     try:
-        topics = db.query(CourseTopic).order_by(CourseTopic.created_at).all()
-        
-        # 如果数据库中没有主题，返回默认主题
-        if not topics:
-            default_topics = [
-                "数学基础概念",
-                "语文阅读理解", 
-                "英语口语交流",
-                "科学实验探索",
-                "历史文化传承"
-            ]
-            return default_topics
-        
-        return [topic.name for topic in topics]
+        body, etag = await ReferenceDataService(db).get(MANAGER_COURSE_TOPICS)
+        return cached_json_response(request, body, etag)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -883,25 +1148,31 @@ async def get_course_topics(
 async def create_course_topic(
     topic_data: CourseTopicCreate,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建新的课程主题"""
+    name = topic_data.name.strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="课程主题名称不能为空")
     try:
-        # TODO: 保存到数据库
-        # existing_topic = db.query(CourseTopic).filter(CourseTopic.name == topic_data.name).first()
-        # if existing_topic:
-        #     raise HTTPException(status_code=400, detail="课程主题已存在")
-        # 
-        # new_topic = CourseTopic(name=topic_data.name)
-        # db.add(new_topic)
-        # db.commit()
-        # db.refresh(new_topic)
-        
+        existing_topic = await db.scalar(select(CourseTopic.id).where(CourseTopic.name == name))
+        if existing_topic:
+            raise HTTPException(status_code=400, detail="课程主题已存在")
+
+        new_topic = CourseTopic(name=name)
+        db.add(new_topic)
+        await db.commit()
+        invalidate_reference_data(COURSE_TOPICS, MANAGER_COURSE_TOPICS)
+
         return {
             "message": "课程主题创建成功",
-            "topic": topic_data.name
+            "id": new_topic.id,
+            "topic": name
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"创建课程主题失败: {str(e)}"
@@ -913,23 +1184,33 @@ async def update_course_topic(
     topic_id: int,
     topic_data: CourseTopicUpdate,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新课程主题"""
+    name = topic_data.name.strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="课程主题名称不能为空")
     try:
-        # TODO: 更新数据库中的课程主题
-        # topic = db.query(CourseTopic).filter(CourseTopic.id == topic_id).first()
-        # if not topic:
-        #     raise HTTPException(status_code=404, detail="课程主题不存在")
-        # 
-        # topic.name = topic_data.name
-        # db.commit()
-        
+        topic = await db.get(CourseTopic, topic_id)
+        if not topic:
+            raise HTTPException(status_code=404, detail="课程主题不存在")
+        if topic.name != name:
+            duplicate = await db.scalar(select(CourseTopic.id).where(CourseTopic.name == name))
+            if duplicate:
+                raise HTTPException(status_code=400, detail="课程主题已存在")
+            topic.name = name
+            await db.commit()
+            invalidate_reference_data(COURSE_TOPICS, MANAGER_COURSE_TOPICS)
+
         return {
             "message": "课程主题更新成功",
-            "topic": topic_data.name
+            "id": topic_id,
+            "topic": name
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"更新课程主题失败: {str(e)}"
@@ -940,62 +1221,64 @@ async def update_course_topic(
 async def delete_course_topic(
     topic_id: int,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除课程主题"""
     try:
-        # TODO: 从数据库删除课程主题
-        # topic = db.query(CourseTopic).filter(CourseTopic.id == topic_id).first()
-        # if not topic:
-        #     raise HTTPException(status_code=404, detail="课程主题不存在")
-        # 
-        # db.delete(topic)
-        # db.commit()
-        
+        result = await db.execute(delete(CourseTopic).where(CourseTopic.id == topic_id))
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="课程主题不存在")
+        await db.commit()
+        invalidate_reference_data(COURSE_TOPICS, MANAGER_COURSE_TOPICS)
+
         return {
             "message": "课程主题删除成功"
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"删除课程主题失败: {str(e)}"
         )
 
 
+class CourseTopicItem(BaseModel):
+    id: Optional[int] = None
+    name: str
+
+
 class CourseTopicsBatch(BaseModel):
-    topics: List[str]
+    # 名称，或带 id 的主题（按 id 重命名）
+    topics: List[Union[str, CourseTopicItem]]
 
 
 @router.post("/course-topics/batch")
 async def update_course_topics_batch(
     data: CourseTopicsBatch,
     current_user: User = Depends(verify_manager_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """批量更新课程主题 - 执行原子操作，清空现有记录并插入新主题"""
+    """批量更新课程主题 - 与现有主题比较，在一个事务中只插入、重命名、删除有变化的主题"""
+    items = [item if isinstance(item, str) else item.model_dump() for item in data.topics]
     try:
-        # 开始事务 - 删除所有现有主题
-        db.query(CourseTopic).delete()
-        
-        # 添加新主题
-        for topic_name in data.topics:
-            # 检查主题名称是否为空
-            if not topic_name or not topic_name.strip():
-                continue
-                
-            new_topic = CourseTopic(name=topic_name.strip())
-            db.add(new_topic)
-        
-        # 提交事务
-        db.commit()
-        
+        diff, topics = await CourseTopicService(db).sync(items)
+        if diff.changed:
+            # 提交成功后使课程主题缓存失效
+            invalidate_reference_data(COURSE_TOPICS, MANAGER_COURSE_TOPICS)
+
         return {
             "message": "课程主题批量保存成功",
-            "count": len([t for t in data.topics if t and t.strip()])
+            "count": len(topics),
+            "topics": topics,
+            "inserted": len(diff.inserts),
+            "renamed": len(diff.renames),
+            "deleted": len(diff.deletes)
         }
     except Exception as e:
         # 回滚事务
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"批量保存课程主题失败: {str(e)}"
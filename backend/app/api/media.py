@@ -0,0 +1,24 @@
+from pathlib import Path
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.media import media_response, stat_file
+
+router = APIRouter()
+
+UPLOAD_ROOT = Path(settings.UPLOAD_DIR).resolve()
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_upload(file_path: str, request: Request):
+    """读取上传文件，支持 Range 分段下载和缓存校验"""
+    path = (UPLOAD_ROOT / file_path).resolve()
+    # 不允许越出上传目录，也不提供以 . 开头的临时文件
+    if not path.is_relative_to(UPLOAD_ROOT) or any(part.startswith(".") for part in path.relative_to(UPLOAD_ROOT).parts):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    stat_result = await stat_file(path)
+    if stat_result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    return media_response(path, stat_result, request.headers, request.method, settings.MEDIA_CACHE_MAX_AGE)
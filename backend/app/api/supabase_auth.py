@@ -1,11 +1,18 @@
+import time
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.services.supabase_user_service import SupabaseUserService
+from app.services.refresh_token_service import RefreshTokenService
+from app.core.database import get_async_db
 from app.core.security import create_access_token, verify_token
+from app.core.cache import TTLCache
+from app.core.revocation import ClaimRevocationList
+from app.services.claim_revocation_service import ClaimRevocationService, sync_claim_revocations
 from app.core.config import settings
 
 router = APIRouter()
@@ -16,6 +23,21 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/supabase-auth/login")
 # 初始化服务
 user_service = SupabaseUserService()
 
+# 远程查询结果缓存（按用户ID）
+user_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+# 用户声明吊销列表：资料变更或停用后，旧令牌中的声明不再可信（按间隔从共享表同步）
+claim_revocations = ClaimRevocationList(
+    retention_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    sync_interval_seconds=settings.CLAIM_REVOCATION_SYNC_SECONDS
+)
+
+# 写入令牌的用户声明字段
+_CLAIM_FIELDS = ("email", "name", "role", "training_status", "training_progress", "is_active")
+
 # Pydantic模型
 class UserResponse(BaseModel):
     id: int
@@ -30,6 +52,10 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class LoginRequest(BaseModel):
     email: EmailStr
@@ -46,6 +72,32 @@ class UpdateProfileRequest(BaseModel):
     training_status: Optional[str] = None
     training_progress: Optional[int] = None
 
+def build_user_claims(user: dict) -> dict:
+    """生成令牌中携带的用户声明"""
+    return {field: user.get(field) for field in _CLAIM_FIELDS}
+
+
+async def invalidate_user(db: AsyncSession, user_id: int, deactivated: bool = False):
+    """用户资料变更或停用后，使缓存和已签发令牌中的声明失效（吊销记录写入共享表，其他工作进程同步后生效）"""
+    await ClaimRevocationService(db, claim_revocations).revoke(user_id, deactivated=deactivated)
+    user_cache.invalidate(user_id)
+
+
+def _user_from_claims(user_id: int, payload: dict) -> Optional[dict]:
+    """从令牌声明中还原用户，声明缺失或过期时返回 None"""
+    claims = payload.get("usr")
+    if not claims:
+        return None
+
+    issued_at = payload.get("iat")
+    if issued_at is None or time.time() - issued_at > settings.SUPABASE_CLAIMS_MAX_AGE_SECONDS:
+        return None
+    if claim_revocations.is_stale(user_id, issued_at):
+        return None
+
+    return {"id": user_id, **claims}
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """获取当前用户"""
     credentials_exception = HTTPException(
@@ -56,17 +108,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     
     try:
         payload = verify_token(token)
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        user_id = int(payload.get("sub"))
     except Exception:
         raise credentials_exception
     
-    user = await user_service.get_user_by_id(user_id)
-    if user is None:
+    await sync_claim_revocations(claim_revocations)
+    if claim_revocations.is_deactivated(user_id):
         raise credentials_exception
     
-    return user
+    # 优先使用令牌声明在本地完成认证
+    if settings.SUPABASE_AUTH_LOCAL_CLAIMS:
+        user = _user_from_claims(user_id, payload)
+        if user is not None:
+            if not user.get("is_active", True):
+                raise credentials_exception
+            return user
+    
+    # 声明缺失或过期时才查询远程数据库
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await user_service.get_user_by_id(user_id)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user_id, user)
+    
+    return dict(user)
 
 @router.post("/register", response_model=UserResponse)
 async def register(register_data: RegisterRequest):
@@ -118,7 +184,7 @@ async def register(register_data: RegisterRequest):
         )
 
 @router.post("/login", response_model=Token)
-async def login(login_data: LoginRequest):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """用户登录"""
     try:
         # 验证用户
@@ -141,9 +207,12 @@ async def login(login_data: LoginRequest):
         # 创建访问令牌
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": str(user["id"])}, expires_delta=access_token_expires
+            data={"sub": str(user["id"]), "usr": build_user_claims(user)},
+            expires_delta=access_token_expires
         )
         
+        refresh_token = await RefreshTokenService(db).issue("supabase", str(user["id"]))
+        
         user_response = UserResponse(
             id=user["id"],
             email=user["email"],
@@ -157,7 +226,8 @@ async def login(login_data: LoginRequest):
         return Token(
             access_token=access_token,
             token_type="bearer",
-            user=user_response
+            user=user_response,
+            refresh_token=refresh_token
         )
         
     except HTTPException:
@@ -168,6 +238,48 @@ async def login(login_data: LoginRequest):
             detail=f"登录失败: {str(e)}"
         )
 
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(refresh_data: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """使用刷新令牌换取新的访问令牌（无需重新验证密码）"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="无法验证凭据",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    subject, refresh_token = await RefreshTokenService(db).rotate("supabase", refresh_data.refresh_token)
+    user_id = int(subject)
+    
+    await sync_claim_revocations(claim_revocations)
+    if claim_revocations.is_deactivated(user_id):
+        raise credentials_exception
+    
+    user = await user_service.get_user_by_id(user_id)
+    if user is None or not user.get("is_active", True):
+        raise credentials_exception
+    user_cache.set(user_id, user)
+    
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": str(user["id"]), "usr": build_user_claims(user)},
+        expires_delta=access_token_expires
+    )
+    
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        user=UserResponse(
+            id=user["id"],
+            email=user["email"],
+            name=user["name"],
+            role=user["role"],
+            training_status=user["training_status"],
+            training_progress=user["training_progress"],
+            is_active=user["is_active"]
+        ),
+        refresh_token=refresh_token
+    )
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """获取当前用户信息"""
@@ -184,7 +296,8 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 @router.put("/profile", response_model=UserResponse)
 async def update_profile(
     update_data: UpdateProfileRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新用户资料"""
     try:
@@ -211,6 +324,8 @@ async def update_profile(
                 detail="更新用户信息失败"
             )
         
+        await invalidate_user(db, current_user["id"])
+        
         # 获取更新后的用户信息
         updated_user = await user_service.get_user_by_id(current_user["id"])
         
@@ -233,9 +348,11 @@ async def update_profile(
         )
 
 @router.post("/logout")
-async def logout():
+async def logout(refresh_data: Optional[RefreshRequest] = None, db: AsyncSession = Depends(get_async_db)):
     """用户登出"""
-    # 在实际应用中，可以在这里处理令牌黑名单等逻辑
+    # 吊销刷新令牌，访问令牌在过期前仍然有效
+    if refresh_data is not None:
+        await RefreshTokenService(db).revoke("supabase", refresh_data.refresh_token)
     return {"message": "登出成功"}
 
 # 管理员专用路由
@@ -268,8 +385,46 @@ async def get_all_users(current_user: dict = Depends(get_current_user)):
             detail=f"获取用户列表失败: {str(e)}"
         )
 
+@router.get("/users/search", response_model=list[UserResponse])
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100, description="姓名或邮箱"),
+    role: str = Query("teacher", description="用户角色: teacher, manager"),
+    limit: int = Query(20, ge=1, le=100, description="最多返回数量"),
+    current_user: dict = Depends(get_current_user)
+):
+    """按姓名或邮箱搜索用户（管理员功能），结果按相关度排序"""
+    if current_user["role"] != "manager":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="权限不足"
+        )
+    if role not in ["teacher", "manager"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的用户角色"
+        )
+    
+    # 使用 pg_trgm 索引的 search_users 函数（见 migrations/add_user_search_trgm.sql）
+    users = await user_service.search_users(q, role=role, limit=limit)
+    return [
+        UserResponse(
+            id=user["id"],
+            email=user["email"],
+            name=user["name"],
+            role=user["role"],
+            training_status=user["training_status"],
+            training_progress=user["training_progress"],
+            is_active=user["is_active"]
+        )
+        for user in users
+    ]
+
 @router.put("/users/{user_id}/deactivate")
-async def deactivate_user(user_id: int, current_user: dict = Depends(get_current_user)):
+async def deactivate_user(
+    user_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """停用用户（管理员功能）"""
     if current_user["role"] != "manager":
         raise HTTPException(
@@ -285,6 +440,8 @@ async def deactivate_user(user_id: int, current_user: dict = Depends(get_current
                 detail="用户不存在"
             )
         
+        await invalidate_user(db, user_id, deactivated=True)
+        
         return {"message": "用户已停用"}
         
     except HTTPException:
@@ -1,15 +1,18 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_read_db
+from app.core.reference_cache import cached_json_response
 from app.api.auth import get_current_user
 from app.models.user import User, UserRole
-from app.models.training import (
-    TrainingMaterial, PracticeSession, Feedback, 
-    PracticeMode, CourseTopic, EvaluationFocus
+from app.models.training import TrainingMaterial, PracticeSession, Feedback
+from app.services.reference_data_service import (
+    ReferenceDataService, PRACTICE_MODES, COURSE_TOPICS, EVALUATION_FOCUS
 )
+from app.services.material_search_service import MaterialSearchService
 
 router = APIRouter()
 
@@ -30,6 +33,18 @@ class TrainingMaterialResponse(BaseModel):
         from_attributes = True
 
 
+class MaterialSearchResult(BaseModel):
+    id: int
+    title: str
+    description: str
+    type: str
+    category: Optional[str] = None
+    duration_minutes: int
+    file_url: Optional[str] = None
+    snippet: str  # 命中片段（HTML，命中部分用 <mark> 标记）
+    score: Optional[float] = None
+
+
 class PracticeSessionResponse(BaseModel):
     id: int
     title: str
@@ -93,16 +108,18 @@ def verify_teacher_role(current_user: User = Depends(get_current_user)):
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取教师仪表板统计数据"""
     # 获取已完成的培训材料数量
-    materials_completed = db.query(TrainingMaterial).count()
+    materials_completed = await db.scalar(select(func.count()).select_from(TrainingMaterial))
     
     # 获取练习会话数量
-    practice_sessions = db.query(PracticeSession).filter(
-        PracticeSession.user_id == current_user.id
-    ).count()
+    practice_sessions = await db.scalar(
+        select(func.count()).select_from(PracticeSession).where(
+            PracticeSession.user_id == current_user.id
+        )
+    )
     
     return DashboardStats(
         materials_completed=materials_completed,
@@ -115,12 +132,15 @@ async def get_dashboard_stats(
 @router.get("/materials", response_model=List[TrainingMaterialResponse])
 async def get_training_materials(
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取培训材料列表"""
-    materials = db.query(TrainingMaterial).filter(
-        TrainingMaterial.status == "published"
-    ).order_by(TrainingMaterial.order_index).all()
+    result = await db.execute(
+        select(TrainingMaterial).where(
+            TrainingMaterial.status == "published"
+        ).order_by(TrainingMaterial.order_index)
+    )
+    materials = result.scalars().all()
     
     # 转换为响应格式
     result = []
@@ -141,15 +161,29 @@ async def get_training_materials(
     return result
 
 
+@router.get("/materials/search", response_model=List[MaterialSearchResult])
+async def search_training_materials(
+    q: str = Query(..., min_length=1, max_length=100, description="搜索关键词，多个词用空格分隔"),
+    limit: int = Query(20, ge=1, le=50),
+    current_user: User = Depends(verify_teacher_role),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """按标题、描述、类别和文档正文搜索已发布的培训材料，按相关度排序"""
+    return await MaterialSearchService(db).search(q, limit)
+
+
 @router.get("/practice-sessions", response_model=List[PracticeSessionResponse])
 async def get_practice_sessions(
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取练习会话列表"""
-    sessions = db.query(PracticeSession).filter(
-        PracticeSession.user_id == current_user.id
-    ).order_by(PracticeSession.created_at.desc()).all()
+    result = await db.execute(
+        select(PracticeSession).where(
+            PracticeSession.user_id == current_user.id
+        ).order_by(PracticeSession.created_at.desc())
+    )
+    sessions = result.scalars().all()
     
     # 转换为响应格式
     result = []
@@ -168,67 +202,50 @@ async def get_practice_sessions(
 
 @router.get("/practice-modes", response_model=List[PracticeModeResponse])
 async def get_practice_modes(
+    request: Request,
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取练习模式列表"""
-    modes = db.query(PracticeMode).filter(
-        PracticeMode.is_active == True
-    ).order_by(PracticeMode.order_index).all()
-    
-    return [PracticeModeResponse(
-        id=mode.id,
-        name=mode.name,
-        description=mode.description or "",
-        duration_minutes=mode.duration_minutes,
-        difficulty_level=mode.difficulty_level
-    ) for mode in modes]
+    body, etag = await ReferenceDataService(db).get(PRACTICE_MODES)
+    return cached_json_response(request, body, etag)
 
 
 @router.get("/course-topics", response_model=List[CourseTopicResponse])
 async def get_course_topics(
+    request: Request,
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取课程主题列表"""
-    topics = db.query(CourseTopic).all()
-    
-    return [CourseTopicResponse(
-        id=topic.id,
-        name=topic.name
-    ) for topic in topics]
+    body, etag = await ReferenceDataService(db).get(COURSE_TOPICS)
+    return cached_json_response(request, body, etag)
 
 
 @router.get("/evaluation-focus", response_model=List[EvaluationFocusResponse])
 async def get_evaluation_focus(
+    request: Request,
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取评估重点列表"""
-    focus_items = db.query(EvaluationFocus).filter(
-        EvaluationFocus.is_active == True
-    ).order_by(EvaluationFocus.order_index).all()
-    
-    return [EvaluationFocusResponse(
-        id=item.id,
-        name=item.name,
-        description=item.description or "",
-        category=item.category or "",
-        weight=item.weight,
-        criteria=item.criteria
-    ) for item in focus_items]
+    body, etag = await ReferenceDataService(db).get(EVALUATION_FOCUS)
+    return cached_json_response(request, body, etag)
 
 
 @router.get("/practice-history", response_model=List[PracticeSessionResponse])
 async def get_practice_history(
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取练习历史数据"""
     # 获取用户的所有练习会话，按时间倒序
-    sessions = db.query(PracticeSession).filter(
-        PracticeSession.user_id == current_user.id
-    ).order_by(PracticeSession.created_at.desc()).limit(50).all()
+    result = await db.execute(
+        select(PracticeSession).where(
+            PracticeSession.user_id == current_user.id
+        ).order_by(PracticeSession.created_at.desc()).limit(50)
+    )
+    sessions = result.scalars().all()
     
     return [PracticeSessionResponse(
         id=session.id,
@@ -243,7 +260,7 @@ async def get_practice_history(
 @router.post("/practice/start")
 async def start_practice_session(
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """开始试讲练习"""
     # TODO: 实现试讲练习开始逻辑
@@ -493,7 +510,7 @@ async def get_sop_documents(
 @router.get("/feedback/reports")
 async def get_feedback_reports(
     current_user: User = Depends(verify_teacher_role),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取反馈报告列表"""
     # TODO: 实现反馈报告查询
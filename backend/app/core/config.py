@@ -75,6 +75,9 @@ class Settings(BaseSettings):
     
     # 数据库配置
     DATABASE_URL: str = "sqlite:///./app.db"
+    SQLITE_PROFILE: str = Field(default="default", description="SQLite性能配置: default, production（WAL + 只读连接池）")
+    QUERY_STATS_ENABLED: bool = Field(default=True, description="是否统计每个请求的查询次数和耗时（Server-Timing 响应头）")
+    QUERY_N_PLUS_ONE_THRESHOLD: int = Field(default=5, description="同一语句形状在单个请求中重复执行达到该次数时记录疑似N+1查询")
     
     # Supabase 配置
     SUPABASE_URL: str = Field(default="", description="Supabase项目URL")
@@ -85,6 +88,25 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: int = Field(default=3600, description="清理过期刷新令牌记录的间隔（秒）")
+    
+    # 认证缓存配置
+    PRINCIPAL_CACHE_TTL_SECONDS: int = Field(default=60, description="当前用户缓存有效期（秒），0表示禁用")
+    PRINCIPAL_CACHE_MAX_SIZE: int = Field(default=10000, description="当前用户缓存最大条目数")
+    JWT_CACHE_ENABLED: bool = Field(default=True, description="是否缓存已验证的JWT解码结果")
+    JWT_CACHE_MAX_SIZE: int = Field(default=50000, description="JWT验证缓存最大条目数")
+    SUPABASE_AUTH_LOCAL_CLAIMS: bool = Field(default=False, description="Supabase认证是否直接使用令牌中的用户声明（无需网络查询）；多进程部署时停用、资料变更最迟在 CLAIM_REVOCATION_SYNC_SECONDS 后在其他进程生效")
+    CLAIM_REVOCATION_SYNC_SECONDS: int = Field(default=5, description="各工作进程从共享表同步用户声明吊销列表的间隔（秒）")
+    SUPABASE_CLAIMS_MAX_AGE_SECONDS: int = Field(default=300, description="令牌用户声明的最长可信时间（秒），超过后重新查询")
+    
+    # 参考数据缓存配置
+    REFERENCE_CACHE_TTL_SECONDS: int = Field(default=300, description="练习模式、课程主题等参考数据的缓存有效期（秒），0表示仅在写操作时失效")
+    
+    # 密码哈希执行器配置
+    PASSWORD_HASH_EXECUTOR: str = Field(default="thread", description="密码哈希执行器类型: thread, process")
+    PASSWORD_HASH_WORKERS: int = Field(default=4, description="密码哈希最大并发数")
+    PASSWORD_HASH_MAX_QUEUE: int = Field(default=64, description="密码哈希最大排队数，超出后返回503")
     
     # AI服务配置占位符
     OPENAI_API_KEY: str = Field(default="", description="OpenAI API密钥")
@@ -94,6 +116,24 @@ class Settings(BaseSettings):
     # 文件上传配置
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MATERIAL_MAX_UPLOAD_SIZE: int = Field(default=100 * 1024 * 1024, description="培训资料上传大小上限（字节）")
+    UPLOAD_CHUNK_SIZE: int = Field(default=1024 * 1024, description="上传文件写入磁盘的分块大小（字节）")
+    MAX_CONCURRENT_UPLOADS: int = Field(default=4, description="同时写入磁盘的上传数上限")
+    UPLOAD_MIN_FREE_DISK_BYTES: int = Field(default=512 * 1024 * 1024, description="上传后磁盘需保留的最小剩余空间（字节）")
+    RESUMABLE_UPLOAD_DIR: str = Field(default="upload_sessions", description="断点续传未完成上传的存放目录（不要放在 uploads 下）")
+    RESUMABLE_UPLOAD_EXPIRE_HOURS: int = Field(default=24, description="断点续传上传无新数据多少小时后过期清理")
+    MEDIA_CACHE_MAX_AGE: int = Field(default=365 * 24 * 3600, description="内容寻址（哈希或 uuid 命名）上传文件的浏览器缓存时间（秒）")
+    
+    # 音视频处理配置
+    MEDIA_PROCESSING_ENABLED: bool = Field(default=True, description="上传音视频资料后是否在后台提取时长、封面等信息")
+    MEDIA_PROCESSING_WORKERS: int = Field(default=2, description="媒体处理进程数")
+    MEDIA_TRANSCODER: str = Field(default="ffmpeg", description="转码后端: ffmpeg, stub（测试用）或 模块路径:类名")
+    MEDIA_HLS_ENABLED: bool = Field(default=False, description="是否为视频生成 HLS 分段")
+    MEDIA_HLS_SEGMENT_SECONDS: int = Field(default=6, description="HLS 分段时长（秒）")
+    MEDIA_PROCESSING_TIMEOUT_SECONDS: int = Field(default=1800, description="单个转码命令的超时时间（秒）")
+    
+    # 资料搜索配置
+    MATERIAL_TEXT_MAX_CHARS: int = Field(default=200000, description="每个资料文件提取并建立全文索引的最大字符数")
     
     class Config:
         case_sensitive = True
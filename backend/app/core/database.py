@@ -1,17 +1,116 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.query_stats import install_query_listeners
 
-# 创建数据库引擎
+# SQLite 性能配置（连接建立时通过 PRAGMA 设置）
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",  # 读写并发，避免 database is locked
+        "synchronous": "NORMAL",  # WAL 模式下安全且减少 fsync
+        "busy_timeout": 5000,  # 等待写锁的毫秒数
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,  # 负数表示 KiB，即约 64MB 页缓存
+        "temp_store": "MEMORY",
+    },
+}
+
+# 只读连接无法修改日志模式
+_READ_ONLY_SKIPPED_PRAGMAS = {"journal_mode"}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """将同步数据库URL转换为异步驱动URL（SQLite 使用 aiosqlite，PostgreSQL 使用 asyncpg）"""
+    if database_url.startswith("sqlite:"):
+        return database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if database_url.startswith("postgresql://"):
+        return database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if database_url.startswith("postgres://"):
+        return database_url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return database_url
+
+
+def get_read_only_database_url(database_url: str):
+    """生成 SQLite 文件数据库的只读连接URL，内存数据库或非 SQLite 返回 None"""
+    url = make_url(database_url)
+    if not url.drivername.startswith("sqlite") or not url.database or url.database == ":memory:":
+        return None
+    return url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"})
+
+
+def apply_sqlite_profile(engine: Engine, profile: str, read_only: bool = False):
+    """为 SQLite 引擎注册连接事件，在每个新连接上应用性能配置"""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"无效的SQLite配置: {profile}")
+
+    pragmas = SQLITE_PROFILES[profile]
+    if read_only:
+        pragmas = {name: value for name, value in pragmas.items() if name not in _READ_ONLY_SKIPPED_PRAGMAS}
+        pragmas["query_only"] = "ON"
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+is_sqlite = "sqlite" in settings.DATABASE_URL
+
+# 创建数据库引擎（同步，供脚本和初始化使用）
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if is_sqlite else {}
 )
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 创建异步数据库引擎（供API路由使用，查询不阻塞事件循环）
+async_engine = create_async_engine(get_async_database_url(settings.DATABASE_URL))
+
+# 只读异步引擎：production 配置下为 SQLite 文件数据库单独建立只读连接池，供 GET 路由使用
+read_only_url = get_read_only_database_url(settings.DATABASE_URL) if is_sqlite else None
+if settings.SQLITE_PROFILE == "production" and read_only_url is not None:
+    async_read_engine = create_async_engine(get_async_database_url(read_only_url.render_as_string(hide_password=False)))
+else:
+    async_read_engine = async_engine
+
+if is_sqlite:
+    apply_sqlite_profile(engine, settings.SQLITE_PROFILE)
+    apply_sqlite_profile(async_engine.sync_engine, settings.SQLITE_PROFILE)
+    if async_read_engine is not async_engine:
+        apply_sqlite_profile(async_read_engine.sync_engine, settings.SQLITE_PROFILE, read_only=True)
+
+# 请求级查询统计
+if settings.QUERY_STATS_ENABLED:
+    install_query_listeners(engine)
+    install_query_listeners(async_engine.sync_engine)
+    if async_read_engine is not async_engine:
+        install_query_listeners(async_read_engine.sync_engine)
+
+# 创建异步会话工厂（提交后不使对象过期，避免在异步上下文中触发隐式加载）
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # 创建基础模型类
 Base = declarative_base()
 
@@ -25,6 +124,18 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    """获取只读异步数据库会话（GET 路由使用）"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     """创建所有表"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
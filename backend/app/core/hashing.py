@@ -0,0 +1,102 @@
+"""
+密码哈希执行器
+将 bcrypt 计算放到独立的线程池/进程池中执行，避免阻塞事件循环，
+并限制并发数与排队深度，记录耗时统计
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+
+class PasswordHashExecutor:
+    """有界的密码哈希执行器"""
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"无效的哈希执行器类型: {kind}")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        """延迟创建执行器"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="password-hash"
+                        )
+        return self._executor
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """在执行器中运行哈希函数，排队已满时返回 503"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="服务繁忙，请稍后重试",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            succeeded = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._pending -= 1
+                if succeeded:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                self._total_seconds += elapsed
+                self._max_seconds = max(self._max_seconds, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取执行器统计信息（耗时包含排队时间，按成功和失败的全部调用计算）"""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_ms": round(self._total_seconds / finished * 1000, 2) if finished else 0.0,
+                "max_ms": round(self._max_seconds * 1000, 2),
+            }
+
+    def shutdown(self):
+        """关闭执行器"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,213 @@
+"""
+媒体文件响应
+支持单个 Range 请求（206 / 416）、If-Range、ETag / Last-Modified 条件请求（304）；
+服务器提供 ASGI zerocopysend 扩展时直接把文件描述符交给服务器 sendfile，
+否则在线程中分块读取，只读取请求的字节范围
+"""
+
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from hashlib import md5
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# 回退读取时的分块大小
+CHUNK_SIZE = 256 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+# 内容寻址文件名（SHA-256）和 uuid 文件名：内容永不改变，可长期缓存
+_SHA256_NAME = re.compile(r"^[0-9a-f]{64}$")
+_UUID_NAME = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# mimetypes 无法正确识别的媒体类型
+_MEDIA_TYPES = {
+    ".ts": "video/mp2t",
+    ".m3u8": "application/vnd.apple.mpegurl",
+}
+
+
+class RangeNotSatisfiable(Exception):
+    """请求的范围超出文件大小"""
+
+
+def is_immutable_name(path: Path) -> bool:
+    """文件名是否为内容寻址或 uuid 命名（写入后不再修改）"""
+    stem = path.name.split(".", 1)[0].lower()
+    return bool(_SHA256_NAME.match(stem) or _UUID_NAME.match(stem))
+
+
+def file_etag(path: Path, stat_result: os.stat_result) -> str:
+    """强 ETag：内容寻址文件直接使用内容哈希，其他文件按修改时间和大小生成"""
+    stem = path.name.split(".", 1)[0].lower()
+    if _SHA256_NAME.match(stem):
+        return f'"{stem}"'
+    base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+    return f'"{md5(base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """解析 Range 请求头，返回闭区间 (start, end)；无法识别或多段范围时返回 None（按整个文件响应）"""
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # 后缀范围：最后 N 个字节
+        if not last:
+            return None
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = int(last) if last else size - 1
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _matches_etag(header: str, etag: str) -> bool:
+    """If-None-Match 是否匹配（弱比较）"""
+    if header.strip() == "*":
+        return True
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return etag in candidates
+
+
+def _not_modified_since(header: Optional[str], mtime: float) -> bool:
+    """If-Modified-Since 是否不早于文件修改时间"""
+    if not header:
+        return False
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def _if_range_matches(header: Optional[str], etag: str, last_modified: str) -> bool:
+    """If-Range 校验：只接受强 ETag 完全相同或与 Last-Modified 相同的日期"""
+    if header is None:
+        return True
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        return header == etag
+    return header == last_modified
+
+
+class MediaFileResponse(Response):
+    """按字节范围发送文件的响应"""
+
+    def __init__(
+        self,
+        path: Path,
+        stat_result: os.stat_result,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        byte_range: Optional[Tuple[int, int]] = None,
+        send_body: bool = True
+    ):
+        self.path = path
+        self.status_code = status_code
+        self.media_type = None
+        self.background = None
+        self.init_headers(headers)
+        self.offset, end = byte_range or (0, stat_result.st_size - 1)
+        self.count = end - self.offset + 1 if status_code in (200, 206) else 0
+        self.send_body = send_body and self.count > 0
+        self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": file.wrapped.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 读取过程中文件被截断
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def stat_file(path: Path) -> Optional[os.stat_result]:
+    """读取普通文件的状态，不存在或不是普通文件时返回 None"""
+    try:
+        stat_result = await anyio.to_thread.run_sync(os.stat, path)
+    except OSError:
+        return None
+    return stat_result if stat.S_ISREG(stat_result.st_mode) else None
+
+
+def media_response(
+    path: Path,
+    stat_result: os.stat_result,
+    request_headers,
+    method: str,
+    cache_max_age: int
+) -> Response:
+    """根据条件请求和 Range 头生成 200 / 206 / 304 / 416 响应"""
+    size = stat_result.st_size
+    etag = file_etag(path, stat_result)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": last_modified,
+        "cache-control": (
+            f"public, max-age={cache_max_age}, immutable" if is_immutable_name(path) else "no-cache"
+        ),
+    }
+
+    if_none_match = request_headers.get("if-none-match")
+    if (if_none_match and _matches_etag(if_none_match, etag)) or (
+        if_none_match is None and _not_modified_since(request_headers.get("if-modified-since"), stat_result.st_mtime)
+    ):
+        return Response(status_code=304, headers=headers)
+
+    headers["content-type"] = (
+        _MEDIA_TYPES.get(path.suffix.lower()) or guess_type(path.name)[0] or "application/octet-stream"
+    )
+    byte_range = None
+    if method == "GET" and _if_range_matches(request_headers.get("if-range"), etag, last_modified):
+        try:
+            byte_range = parse_range(request_headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return MediaFileResponse(path, stat_result, 200, headers, send_body=method == "GET")
+
+    start, end = byte_range
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return MediaFileResponse(path, stat_result, 206, headers, byte_range)
@@ -0,0 +1,91 @@
+"""
+键集分页工具
+游标为排序键的 base64 编码，下一页从上一页最后一行之后继续查询，
+不受 OFFSET 扫描和并发插入影响；总数按上限截断统计，返回近似值
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+# 总数统计最多扫描的行数，超过时返回近似值
+TOTAL_COUNT_CAP = 10000
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_APPROXIMATE_HEADER = "X-Total-Count-Approximate"
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """将排序键编码为游标"""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """解析游标，格式无效时返回400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, dict):
+            raise ValueError
+        return values
+    except (ValueError, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+async def fetch_keyset_page(
+    db: AsyncSession,
+    query: Select,
+    key_column,
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    """按键列倒序取一页数据，返回 (本页对象, 下一页游标)"""
+    if cursor:
+        last_key = decode_cursor(cursor).get("id")
+        if not isinstance(last_key, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的分页游标"
+            )
+        query = query.where(key_column < last_key)
+
+    # 多取一行判断是否还有下一页
+    result = await db.execute(query.order_by(key_column.desc()).limit(limit + 1))
+    items = list(result.scalars().all())
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    return items, encode_cursor({"id": getattr(items[-1], key_column.key)})
+
+
+async def approximate_count(db: AsyncSession, query: Select, cap: int = TOTAL_COUNT_CAP) -> Tuple[int, bool]:
+    """统计查询结果数，最多统计 cap 行；返回 (数量, 是否为近似值)"""
+    limited = query.with_only_columns(literal(1), maintain_column_froms=True).order_by(None).limit(cap + 1).subquery()
+    count = await db.scalar(select(func.count()).select_from(limited))
+    return min(count, cap), count > cap
+
+
+def set_pagination_headers(
+    response: Response,
+    next_cursor: Optional[str],
+    total: Optional[int] = None,
+    approximate: bool = False
+):
+    """在响应头中返回下一页游标和总数"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+        if approximate:
+            response.headers[TOTAL_APPROXIMATE_HEADER] = "true"
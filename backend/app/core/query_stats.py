@@ -0,0 +1,102 @@
+"""
+请求级数据库查询统计
+通过 SQLAlchemy 游标事件把查询次数和耗时归属到当前请求，
+并按语句形状统计重复次数，用于发现 N+1 查询
+"""
+
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_WHITESPACE = re.compile(r"\s+")
+# 字面量替换为占位符，使只有参数不同的语句归为同一形状
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+class QueryStats:
+    """单个请求的查询统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # 秒
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float):
+        """记录一次查询"""
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """返回重复次数达到阈值的语句形状"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        """生成 Server-Timing 头的值"""
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    """规范化 SQL 语句，去掉字面量和空白差异"""
+    shape = _LITERALS.sub("?", statement)
+    shape = _WHITESPACE.sub(" ", shape).strip()
+    return _IN_LIST.sub("(?)", shape)
+
+
+def begin_request_stats() -> QueryStats:
+    """为当前请求开始统计"""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def get_request_stats() -> Optional[QueryStats]:
+    """获取当前请求的统计，不在请求中时返回 None"""
+    return _current_stats.get()
+
+
+def install_query_listeners(engine: Engine):
+    """在引擎上注册游标事件监听器（异步引擎请传入 sync_engine）"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    stats.record(statement, time.perf_counter() - start_times.pop())
+
+
+def _handle_error(exception_context):
+    # 语句执行失败时不会触发 after_cursor_execute，需取出开始时间，否则连接归还连接池后后续语句会配对到错误的开始时间
+    conn = exception_context.connection
+    if conn is None or exception_context.statement is None:
+        return
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(exception_context.statement, elapsed)
@@ -0,0 +1,80 @@
+"""
+参考数据缓存
+练习模式、课程主题、评估重点等很少变化的数据按键缓存为预序列化的响应体和 ETag；
+写操作提交后整体失效（版本号递增），加载期间发生失效的结果不会写回缓存
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+class ReferenceDataCache:
+    """带版本号的参考数据缓存"""
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[bytes, str, float]] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        """当前版本号，每次失效递增"""
+        return self._version
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """读取 (响应体, ETag)，不存在或过期时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl_seconds > 0 and entry[2] <= time.monotonic()):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def set(self, key: str, data: Any, version: int) -> Tuple[bytes, str]:
+        """序列化并写入缓存；加载开始后缓存已失效时只返回结果不写入"""
+        body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (body, etag, time.monotonic() + self.ttl_seconds)
+        return body, etag
+
+    def invalidate(self, *keys: str):
+        """失效指定键（不指定时失效全部），并递增版本号"""
+        with self._lock:
+            self._version += 1
+            if keys:
+                for key in keys:
+                    self._entries.pop(key, None)
+            else:
+                self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                "version": self._version,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """返回预序列化的 JSON 响应，客户端 ETag 一致时返回 304"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,72 @@
+"""
+令牌声明吊销列表
+记录用户资料变更或停用的时间点，令牌中早于该时间点签发的声明视为过期。
+进程内列表只是共享表 claim_revocations 的副本，每个工作进程定期从表中同步
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+class ClaimRevocationList:
+    """紧凑的用户声明版本列表（进程内副本）"""
+
+    def __init__(self, retention_seconds: float, sync_interval_seconds: float = 5):
+        # 保留时长不短于访问令牌有效期，超过后旧令牌已全部过期，可安全清理
+        self.retention_seconds = retention_seconds
+        self.sync_interval_seconds = sync_interval_seconds
+        self._revoked_at: Dict[int, float] = {}
+        self._deactivated: Set[int] = set()
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def revoke(self, user_id: int, deactivated: bool = False, revoked_at: Optional[float] = None):
+        """标记用户声明失效；停用用户时同时拒绝其所有现有令牌"""
+        with self._lock:
+            self._mark(user_id, revoked_at or time.time(), deactivated)
+            self._prune()
+
+    def load(self, entries: Iterable[Tuple[int, float, bool]]):
+        """合并从共享表读取的记录 (用户ID, 吊销时间, 是否停用)"""
+        with self._lock:
+            for user_id, revoked_at, deactivated in entries:
+                self._mark(user_id, revoked_at, deactivated)
+            self._prune()
+
+    def claim_sync(self) -> bool:
+        """距上次同步超过同步间隔时返回 True 并记下同步时间，并发请求中只有一个执行同步"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._synced_at < self.sync_interval_seconds:
+                return False
+            self._synced_at = now
+            return True
+
+    def is_deactivated(self, user_id: int) -> bool:
+        """用户是否已被停用"""
+        return user_id in self._deactivated
+
+    def is_stale(self, user_id: int, issued_at: Optional[float]) -> bool:
+        """令牌声明是否早于最近一次变更"""
+        revoked_at = self._revoked_at.get(user_id)
+        if revoked_at is None:
+            return False
+        return issued_at is None or issued_at < revoked_at
+
+    def _mark(self, user_id: int, revoked_at: float, deactivated: bool):
+        if revoked_at >= self._revoked_at.get(user_id, 0):
+            self._revoked_at[user_id] = revoked_at
+        if deactivated:
+            self._deactivated.add(user_id)
+
+    def _prune(self):
+        """清理已超过令牌有效期的记录"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [user_id for user_id, revoked_at in self._revoked_at.items() if revoked_at < cutoff]
+        for user_id in expired:
+            del self._revoked_at[user_id]
+            self._deactivated.discard(user_id)
+
+    def __len__(self) -> int:
+        return len(self._revoked_at)
@@ -1,13 +1,28 @@
+import copy
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.hashing import PasswordHashExecutor
+from app.core.cache import TTLCache
 
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# 密码哈希执行器（请求处理中的哈希计算统一经由此执行器）
+hash_executor = PasswordHashExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    kind=settings.PASSWORD_HASH_EXECUTOR
+)
+
+# 已验证令牌缓存：令牌摘要 -> 解码结果，有效期截止到令牌的 exp，两个认证路由共用
+jwt_cache = TTLCache(max_size=settings.JWT_CACHE_MAX_SIZE)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
@@ -29,6 +44,16 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在哈希执行器中验证密码"""
+    return await hash_executor.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在哈希执行器中获取密码哈希"""
+    return await hash_executor.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌"""
     to_encode = data.copy()
@@ -37,15 +62,30 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str) -> dict:
+def _token_digest(token: str) -> str:
+    """计算令牌摘要作为缓存键"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def verify_token(token: str, use_cache: bool = True) -> dict:
     """验证令牌"""
+    use_cache = use_cache and settings.JWT_CACHE_ENABLED
+    if use_cache:
+        digest = _token_digest(token)
+        payload = jwt_cache.get(digest)
+        if payload is not None:
+            # 返回深拷贝，调用方修改嵌套的 usr 等字段不会影响缓存条目
+            return copy.deepcopy(payload)
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        if use_cache and payload.get("exp") is not None:
+            jwt_cache.set(digest, copy.deepcopy(payload), ttl_seconds=payload["exp"] - time.time())
         return payload
     except JWTError:
         raise HTTPException(
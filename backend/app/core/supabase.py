@@ -50,6 +50,7 @@ class Tables:
     PRACTICE_SESSIONS = "practice_sessions"
     FEEDBACK = "feedback"
     LEARNING_PROGRESS = "learning_progress"
+    USER_STATISTICS = "user_statistics"
 
 # 用户角色常量
 class UserRoles:
@@ -0,0 +1,95 @@
+"""
+文件上传工具
+上传文件按块异步写入磁盘，写入时累计大小（超过上限立即中止）并计算 SHA-256；
+先写入目标目录下的临时文件，由调用方按哈希决定最终位置（同目录重命名，不复制数据）。
+并发上传数受信号量限制，写入前检查磁盘剩余空间
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException, UploadFile, status
+
+from app.core.config import settings
+
+# 限制同时写入磁盘的上传数量
+upload_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_UPLOADS)
+
+
+class StoredUpload:
+    """已保存的上传文件"""
+
+    def __init__(self, path: Path, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+
+def format_size_limit(size: int) -> str:
+    """格式化大小上限（如 100MB）"""
+    return f"{size // (1024 * 1024)}MB"
+
+
+def ensure_disk_space(directory: Path, required_bytes: int):
+    """检查目录所在磁盘的剩余空间，写入后仍需保留 UPLOAD_MIN_FREE_DISK_BYTES"""
+    free = shutil.disk_usage(directory).free
+    if free - required_bytes < settings.UPLOAD_MIN_FREE_DISK_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail="服务器存储空间不足，请联系管理员"
+        )
+
+
+def check_content_length(content_length: Optional[str], max_size: int):
+    """根据请求头 Content-Length 提前拒绝超出上限的上传（multipart 开销按 1MB 预留）"""
+    if not content_length or not content_length.isdigit():
+        return
+    if int(content_length) > max_size + 1024 * 1024:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"文件大小不能超过 {format_size_limit(max_size)}"
+        )
+
+
+async def save_upload(upload: UploadFile, directory: Path, max_size: int) -> StoredUpload:
+    """按块将上传文件保存为 directory 下的临时文件，同时统计大小和 SHA-256；
+    超过上限或写入失败时删除临时文件，成功时由调用方移动或删除返回的文件"""
+    if upload.size and upload.size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"文件大小不能超过 {format_size_limit(max_size)}"
+        )
+
+    directory.mkdir(parents=True, exist_ok=True)
+    temp_path = directory / f".{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+
+    async with upload_semaphore:
+        ensure_disk_space(directory, upload.size or max_size)
+        try:
+            async with aiofiles.open(temp_path, "wb") as output:
+                while True:
+                    chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"文件大小不能超过 {format_size_limit(max_size)}"
+                        )
+                    digest.update(chunk)
+                    await output.write(chunk)
+        except BaseException:
+            if temp_path.exists():
+                os.unlink(temp_path)
+            raise
+
+    return StoredUpload(temp_path, size, digest.hexdigest())
@@ -1,13 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 # from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
+import asyncio
+import logging
 import os
 
 from app.api.auth import router as auth_router
 from app.api.teacher import router as teacher_router
 from app.api.manager import router as manager_router
 from app.api.learning_progress import router as learning_progress_router
+from app.api.media import router as media_router
 # Supabase API 路由
 from app.api.supabase_auth import router as supabase_auth_router
 from app.api.supabase_training import router as supabase_training_router
@@ -15,6 +18,23 @@ from app.api.supabase_practice import router as supabase_practice_router
 # 临时清理接口
 from app.api.cleanup import router as cleanup_router
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal, Base, async_engine
+from app import models  # noqa: F401  注册全部模型，供启动时建表
+from app.core.query_stats import begin_request_stats
+from app.core.security import hash_executor
+from app.core.uploads import check_content_length
+from app.services.dashboard_counter_service import DashboardCounterService
+from app.services.reference_data_service import ReferenceDataService
+from app.services.activity_service import ActivityService
+from app.services.analytics_service import AnalyticsService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.media_processing_service import media_queue
+from app.services.resumable_upload_service import resumable_uploads
+from app.services.refresh_token_service import purge_expired_periodically
+from app.services.teacher_search_service import ensure_user_search_index
+from app.services.material_search_service import MaterialSearchService, ensure_material_search_index
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="AI教师培训平台 API",
@@ -24,12 +44,29 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# 上传大小预检中间件：Content-Length 超出上限时在读取请求体之前拒绝（定义在 CORS 之前，错误响应仍带 CORS 头）
+UPLOAD_SIZE_LIMITS = {
+    "/api/manager/materials": settings.MATERIAL_MAX_UPLOAD_SIZE,
+}
+
+
+@app.middleware("http")
+async def upload_size_middleware(request: Request, call_next):
+    max_size = UPLOAD_SIZE_LIMITS.get(request.url.path) if request.method == "POST" else None
+    if max_size is not None:
+        try:
+            check_content_length(request.headers.get("content-length"), max_size)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+    return await call_next(request)
+
+
 # CORS中间件配置
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"],
     allow_headers=[
         "Accept",
         "Accept-Language",
@@ -38,21 +75,51 @@ app.add_middleware(
         "Authorization",
         "X-Requested-With",
         "X-CSRF-Token",
+        # 断点续传上传
+        "Tus-Resumable",
+        "Upload-Length",
+        "Upload-Offset",
+        # 媒体分段下载
+        "Range",
+        "If-Range",
+    ],
+    # 携带凭据的跨域请求不支持通配符，分页和断点续传相关响应头需显式列出
+    expose_headers=[
+        "*", "X-Next-Cursor", "X-Total-Count", "X-Total-Count-Approximate",
+        "Location", "Tus-Resumable", "Upload-Offset", "Upload-Length", "Upload-Expires",
+        "Accept-Ranges", "Content-Range", "Content-Length", "ETag", "Server-Timing",
     ],
-    expose_headers=["*"],
 )
 
+# 请求级查询统计中间件：输出 Server-Timing 头并记录疑似 N+1 查询
+if settings.QUERY_STATS_ENABLED:
+    @app.middleware("http")
+    async def query_stats_middleware(request: Request, call_next):
+        stats = begin_request_stats()
+        response = await call_next(request)
+
+        if stats.count:
+            response.headers.append("Server-Timing", stats.server_timing())
+
+            for shape, count in stats.repeated_shapes(settings.QUERY_N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    f"疑似N+1查询: {request.method} {request.url.path} "
+                    f"同一语句执行{count}次（共{stats.count}次查询）: {shape[:200]}"
+                )
+
+        return response
+
 # 可信主机中间件 (开发环境中暂时禁用)
 # app.add_middleware(
 #     TrustedHostMiddleware,
 #     allowed_hosts=settings.ALLOWED_HOSTS
 # )
 
-# 静态文件服务
-uploads_dir = "uploads"
+# 上传文件服务（支持 Range 分段下载、ETag 校验，哈希或 uuid 命名的文件长期缓存）
+uploads_dir = settings.UPLOAD_DIR
 if not os.path.exists(uploads_dir):
     os.makedirs(uploads_dir)
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
+app.include_router(media_router, prefix="/uploads", tags=["上传文件"])
 
 # 路由注册
 app.include_router(auth_router, prefix="/api/auth", tags=["认证"])
@@ -68,6 +135,85 @@ app.include_router(supabase_practice_router, prefix="/api/supabase-practice", ta
 # 临时清理接口 (⚠️ 仅用于开发和测试环境)
 app.include_router(cleanup_router, prefix="/api/cleanup", tags=["临时清理接口"])
 
+# 启动时创建的周期性后台任务，关闭时取消
+background_tasks = []
+
+@app.on_event("startup")
+async def startup_event():
+    """启动时创建缺失的表和搜索索引、重建管理端统计计数（修正离线脚本等绕过 ORM 的写入造成的偏差）并预热参考数据缓存"""
+    try:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(ensure_user_search_index)
+            await conn.run_sync(ensure_material_search_index)
+        async with AsyncSessionLocal() as db:
+            await DashboardCounterService(db).reconcile()
+    except Exception as e:
+        logger.error(f"重建统计计数失败: {e}")
+    
+    # 预热参考数据缓存
+    try:
+        async with AsyncSessionLocal() as db:
+            await ReferenceDataService(db).prewarm()
+    except Exception as e:
+        logger.error(f"参考数据缓存预热失败: {e}")
+    
+    # 重建教师排行榜（修正绕过 ORM 的评分写入造成的偏差）
+    try:
+        async with AsyncSessionLocal() as db:
+            await LeaderboardService(db).rebuild()
+    except Exception as e:
+        logger.error(f"重建教师排行榜失败: {e}")
+    
+    # 清理过期的断点续传上传
+    try:
+        resumable_uploads.purge_expired()
+    except Exception as e:
+        logger.error(f"清理过期上传失败: {e}")
+    
+    # 定期清理过期的刷新令牌（不在登录请求中执行）
+    background_tasks.append(asyncio.create_task(
+        purge_expired_periodically(settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS)
+    ))
+    
+    # 启动媒体处理队列（重新排队未完成的任务）
+    if settings.MEDIA_PROCESSING_ENABLED:
+        try:
+            await media_queue.start()
+        except Exception as e:
+            logger.error(f"启动媒体处理队列失败: {e}")
+    
+    # 为尚未提取正文的资料文件排队提取
+    try:
+        async with AsyncSessionLocal() as db:
+            await MaterialSearchService(db).backfill_texts()
+    except Exception as e:
+        logger.error(f"排队提取资料正文失败: {e}")
+    
+    # 活动事件表为空时从历史数据回填
+    try:
+        async with AsyncSessionLocal() as db:
+            await ActivityService(db).backfill_if_empty()
+    except Exception as e:
+        logger.error(f"回填活动事件失败: {e}")
+    
+    # 分析事件表为空时从历史数据回填（依赖活动事件中的练习完成时间）
+    try:
+        async with AsyncSessionLocal() as db:
+            await AnalyticsService(db).backfill_if_empty()
+    except Exception as e:
+        logger.error(f"回填分析事件失败: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """停止后台任务，关闭密码哈希执行器和媒体处理队列"""
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    hash_executor.shutdown()
+    await media_queue.stop()
+
 @app.get("/")
 async def root():
     return {"message": "AI教师培训平台 API", "version": "1.0.0"}
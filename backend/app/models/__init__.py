@@ -1,6 +1,13 @@
 from .user import User, UserRole, TrainingStatus
 from .training import TrainingMaterial, PracticeSession, Feedback, MaterialType, PracticeStatus
 from .sync import MaterialSyncRecord, SyncLog, MaterialVersion, SyncOperation, SyncStatus
+from .refresh_token import RefreshToken, ClaimRevocation
+from .learning_progress import LearningProgress
+from .dashboard_counter import DashboardCounter
+from .activity import ActivityEvent
+from .analytics import AnalyticsRollup, AnalyticsEvent
+from .leaderboard import TeacherLeaderboard, TeacherDailyScore
+from .blob import MaterialBlob, MediaAsset, MaterialText
 
 __all__ = [
     "User",
@@ -15,5 +22,17 @@ __all__ = [
     "SyncLog",
     "MaterialVersion",
     "SyncOperation",
-    "SyncStatus"
+    "SyncStatus",
+    "RefreshToken",
+    "ClaimRevocation",
+    "LearningProgress",
+    "DashboardCounter",
+    "ActivityEvent",
+    "AnalyticsRollup",
+    "AnalyticsEvent",
+    "TeacherLeaderboard",
+    "TeacherDailyScore",
+    "MaterialBlob",
+    "MediaAsset",
+    "MaterialText"
 ]
\ No newline at end of file
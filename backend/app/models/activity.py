@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.core.database import Base
+
+
+class ActivityEvent(Base):
+    """活动事件表（只追加，不修改）"""
+    __tablename__ = "activity_events"
+    __table_args__ = (
+        # 活动流按 (created_at, id) 倒序键集分页
+        Index("ix_activity_events_created_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)  # login, registration, practice_started, practice_completed, review, material_upload
+    
+    # 事件主体（不设外键，删除用户后历史事件仍保留）
+    actor_id = Column(Integer, index=True)  # 触发事件的用户ID
+    actor_name = Column(String)
+    subject_type = Column(String)  # practice_session, training_material, user
+    subject_id = Column(Integer)
+    
+    # 展示内容
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    
+    # 统一使用应用端 UTC 时间，保证排序精度一致
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,45 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class AnalyticsRollup(Base):
+    """数据分析汇总表（按天/按周分桶，历史桶计算后不再重算）"""
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        # 每个粒度的每个时间桶只有一行，同时覆盖按粒度的时间范围查询
+        Index("uq_analytics_rollups_granularity_bucket", "granularity", "bucket_start", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String, nullable=False)  # day, week
+    bucket_start = Column(Date, nullable=False)  # 时间桶起始日期（UTC，周桶从周一开始）
+
+    # 指标
+    active_teachers = Column(Integer, nullable=False, default=0)  # 有练习、学习或登录记录的教师数
+    completed_sessions = Column(Integer, nullable=False, default=0)
+    scored_sessions = Column(Integer, nullable=False, default=0)
+    average_score = Column(Float)
+    study_minutes = Column(Float, nullable=False, default=0)  # 资料学习和练习时长合计
+    practice_minutes = Column(Float, nullable=False, default=0)
+
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class AnalyticsEvent(Base):
+    """数据分析事件表（只追加，不修改）：学习时长增量、练习完成和评分，按发生时间计入时间桶"""
+    __tablename__ = "analytics_events"
+    __table_args__ = (
+        # 汇总按发生时间范围读取
+        Index("ix_analytics_events_occurred_at", "occurred_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # study, practice, completion, score
+    user_id = Column(Integer, index=True)  # 不设外键，删除用户后历史汇总仍可重建
+    amount = Column(Float, nullable=False, default=0)  # study、practice: 新增时长秒数；score: 评分
+    count = Column(Integer, nullable=False, default=0)  # completion、score: 次数
+
+    # 统一使用应用端 UTC 时间
+    occurred_at = Column(DateTime, default=datetime.utcnow, nullable=False)
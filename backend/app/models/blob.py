@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class MaterialBlob(Base):
+    """资料文件内容表（按 SHA-256 内容寻址，相同内容只保存一份，按引用计数删除）"""
+    __tablename__ = "material_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False, unique=True)  # 本地文件路径，与 TrainingMaterial.file_path 一致
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # 引用该文件的资料数
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class MediaAsset(Base):
+    """音视频文件的处理结果（按内容哈希保存，相同文件只处理一次）"""
+    __tablename__ = "media_assets"
+
+    sha256 = Column(String(64), primary_key=True)
+    status = Column(String, nullable=False, default="pending", index=True)  # 状态：pending, processing, ready, failed
+    duration_seconds = Column(Float)
+    media_metadata = Column(Text)  # JSON格式存储编码、分辨率等媒体信息
+    poster_url = Column(String)  # 封面图URL
+    hls_url = Column(String)  # HLS 播放列表URL
+    error_message = Column(Text)  # 错误信息
+    attempts = Column(Integer, nullable=False, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    processed_at = Column(DateTime(timezone=True))
+
+
+class MaterialText(Base):
+    """资料文件中提取的文本（按内容哈希保存，供全文搜索）"""
+    __tablename__ = "material_texts"
+
+    sha256 = Column(String(64), primary_key=True)
+    content = Column(Text)  # 提取的文本，无法提取时为空
+    char_count = Column(Integer, nullable=False, default=0)
+    error_message = Column(Text)  # 提取失败原因
+    
+    extracted_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class DashboardCounter(Base):
+    """管理端统计计数表（单行，随用户和练习状态变化增量维护）"""
+    __tablename__ = "dashboard_counters"
+
+    id = Column(Integer, primary_key=True)  # 固定为1
+    
+    # 教师培训统计
+    total_teachers = Column(Integer, nullable=False, default=0)
+    completed_training = Column(Integer, nullable=False, default=0)
+    in_progress_training = Column(Integer, nullable=False, default=0)
+    
+    # 练习统计
+    pending_reviews = Column(Integer, nullable=False, default=0)  # 已完成待评审的练习
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class TeacherLeaderboard(Base):
+    """教师排行榜（每位教师一行，练习评分变化时增量维护累计分数和次数）"""
+    __tablename__ = "teacher_leaderboard"
+    __table_args__ = (
+        # 排行榜前N名和名次查询直接按索引顺序读取
+        Index("ix_teacher_leaderboard_average_user", "average_score", "user_id"),
+    )
+
+    user_id = Column(Integer, primary_key=True)  # 不设外键，与 activity_events 一致
+    score_sum = Column(Float, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)
+    average_score = Column(Float)  # score_sum / score_count，没有评分时为空
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class TeacherDailyScore(Base):
+    """教师每日评分汇总（按练习创建日期，用于最近N天的排行榜）"""
+    __tablename__ = "teacher_daily_scores"
+    __table_args__ = (
+        # 时间窗口查询按日期范围扫描后按教师分组
+        Index("ix_teacher_daily_scores_day_user", "day", "user_id"),
+    )
+
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC 日期
+    score_sum = Column(Float, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -7,6 +7,10 @@ from app.core.database import Base
 class LearningProgress(Base):
     """学习进度记录表"""
     __tablename__ = "learning_progress"
+    __table_args__ = (
+        # 每个用户对每个资料只能有一条进度记录，同时覆盖 (user_id, material_id) 查询
+        Index("uq_learning_progress_user_material", "user_id", "material_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class RefreshToken(Base):
+    """刷新令牌记录表（仅保存令牌哈希）"""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 十六进制摘要
+    family_id = Column(String(32), index=True, nullable=False)  # 同一次登录轮换出的令牌属于同一家族
+    
+    # 令牌归属
+    realm = Column(String, nullable=False)  # local: 本地认证, supabase: Supabase认证
+    subject = Column(String, nullable=False)  # 本地为邮箱，Supabase为用户ID
+    
+    # 状态
+    expires_at = Column(DateTime, index=True, nullable=False)
+    used_at = Column(DateTime)  # 已轮换时间，再次使用即视为重放
+    revoked = Column(Boolean, default=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ClaimRevocation(Base):
+    """用户声明吊销记录表：资料变更或停用的时间点，供多个工作进程共享"""
+    __tablename__ = "claim_revocations"
+
+    user_id = Column(Integer, primary_key=True)  # Supabase 用户ID
+    revoked_at = Column(Float, index=True, nullable=False)  # Unix 时间戳，与令牌 iat 比较
+    deactivated = Column(Boolean, default=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -55,6 +55,9 @@ class MaterialSyncRecord(Base):
 class SyncLog(Base):
     """同步操作日志表"""
     __tablename__ = "sync_logs"
+    __table_args__ = (
+        Index("ix_sync_logs_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     operation = Column(Enum(SyncOperation), nullable=False)
@@ -81,6 +84,9 @@ class SyncLog(Base):
 class MaterialVersion(Base):
     """培训资料版本控制表"""
     __tablename__ = "material_versions"
+    __table_args__ = (
+        Index("ix_material_versions_material_current", "material_id", "is_current"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     material_id = Column(Integer, ForeignKey("training_materials.id"), nullable=False)
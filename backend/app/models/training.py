@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -21,6 +21,19 @@ class PracticeStatus(PyEnum):
 
 class TrainingMaterial(Base):
     __tablename__ = "training_materials"
+    __table_args__ = (
+        Index("ix_training_materials_status_order", "status", "order_index"),
+        # 管理端资料列表：按类别、状态筛选后按 id 键集分页，每种筛选组合的索引都以 id 结尾，翻页无需排序
+        Index("ix_training_materials_category_id", "category", "id"),
+        Index("ix_training_materials_status_id", "status", "id"),
+        Index("ix_training_materials_category_status_id", "category", "status", "id"),
+        # 部分索引：教师端只查询已发布资料并按排序索引排列
+        Index(
+            "ix_training_materials_published_order", "order_index",
+            sqlite_where=text("status = 'published'"),
+            postgresql_where=text("status = 'published'")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -44,6 +57,15 @@ class TrainingMaterial(Base):
 
 class PracticeSession(Base):
     __tablename__ = "practice_sessions"
+    __table_args__ = (
+        Index("ix_practice_sessions_user_created", "user_id", "created_at"),
+        # 部分索引：待评审（已完成未评审）的练习按时间查询
+        Index(
+            "ix_practice_sessions_completed_created", "created_at",
+            sqlite_where=text("status = 'COMPLETED'"),
+            postgresql_where=text("status = 'COMPLETED'")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
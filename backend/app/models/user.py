@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -18,6 +18,11 @@ class TrainingStatus(PyEnum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # 管理端教师列表：按角色（及培训状态）筛选后按 id 键集分页，每种筛选组合的索引都以 id 结尾，翻页无需排序
+        Index("ix_users_role_id", "role", "id"),
+        Index("ix_users_role_training_status_id", "role", "training_status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -0,0 +1,230 @@
+"""
+活动事件服务
+登录、注册、练习、评审、资料上传等操作追加写入 activity_events 表，
+管理端活动流按 (created_at, id) 倒序键集分页读取，一次索引范围扫描即可完成
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, insert, inspect, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.activity import ActivityEvent
+from app.models.training import PracticeSession, PracticeStatus
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# 事件类型
+LOGIN = "login"
+REGISTRATION = "registration"
+PRACTICE_STARTED = "practice_started"
+PRACTICE_COMPLETED = "practice_completed"
+REVIEW = "review"
+MATERIAL_UPLOAD = "material_upload"
+
+
+def format_relative_time(created_at: datetime, now: Optional[datetime] = None) -> str:
+    """格式化为相对时间（如“3小时前”），created_at 为 UTC 时间"""
+    now = now or datetime.utcnow()
+    if created_at.tzinfo is not None:
+        created_at = created_at.replace(tzinfo=None) - created_at.utcoffset()
+    seconds = max(0, int((now - created_at).total_seconds()))
+    if seconds >= 86400:
+        return f"{seconds // 86400}天前"
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时前"
+    if seconds >= 60:
+        return f"{seconds // 60}分钟前"
+    return "刚刚"
+
+
+def registration_event(user_id: Optional[int], name: str, email: str, role=UserRole.TEACHER) -> Dict[str, Any]:
+    """生成用户注册事件"""
+    role_name = "教师" if role in (UserRole.TEACHER, UserRole.TEACHER.value) else "管理员"
+    return {
+        "event_type": REGISTRATION,
+        "actor_id": user_id,
+        "actor_name": name,
+        "subject_type": "user",
+        "subject_id": user_id,
+        "title": f"新{role_name}{name}注册了账户",
+        "description": f"邮箱: {email}",
+    }
+
+
+def _practice_event(event_type: str, practice: PracticeSession, actor_name: Optional[str]) -> Dict[str, Any]:
+    """生成练习相关事件"""
+    name = actor_name or "教师"
+    titles = {
+        PRACTICE_STARTED: f"{name}开始了试讲练习",
+        PRACTICE_COMPLETED: f"{name}完成了试讲练习",
+        REVIEW: f"{name}的试讲练习已评审",
+    }
+    score = f", 评分: {practice.overall_score}" if practice.overall_score is not None else ""
+    return {
+        "event_type": event_type,
+        "actor_id": practice.user_id,
+        "actor_name": actor_name,
+        "subject_type": "practice_session",
+        "subject_id": practice.id,
+        "title": titles[event_type],
+        "description": f"练习: {practice.title}{score}",
+    }
+
+
+def _status_change(obj, attr: str):
+    """返回 (修改前, 修改后) 的值；未修改时返回 None"""
+    history = inspect(obj).attrs[attr].history
+    if not history.has_changes():
+        return None
+    return (history.deleted[0] if history.deleted else None), getattr(obj, attr)
+
+
+def collect_flush_events(session: Session) -> List[Dict[str, Any]]:
+    """从本次 flush 的新增和修改对象中提取活动事件"""
+    events = []
+    practices = []
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            events.append(registration_event(obj.id, obj.name, obj.email, obj.role))
+        elif isinstance(obj, PracticeSession):
+            practices.append((PRACTICE_STARTED, obj))
+
+    for obj in session.dirty:
+        if isinstance(obj, PracticeSession):
+            change = _status_change(obj, "status")
+            if change is None:
+                continue
+            if change[1] in (PracticeStatus.COMPLETED, PracticeStatus.COMPLETED.value):
+                practices.append((PRACTICE_COMPLETED, obj))
+            elif change[1] in (PracticeStatus.REVIEWED, PracticeStatus.REVIEWED.value):
+                practices.append((REVIEW, obj))
+
+    if practices:
+        # 一次查询取出涉及的教师姓名
+        user_ids = {practice.user_id for _, practice in practices}
+        names = dict(session.connection().execute(
+            select(User.id, User.name).where(User.id.in_(user_ids))
+        ).all())
+        events.extend(
+            _practice_event(event_type, practice, names.get(practice.user_id))
+            for event_type, practice in practices
+        )
+
+    return events
+
+
+@event.listens_for(Session, "after_flush")
+def _append_flush_events(session: Session, flush_context):
+    """在 flush 所在的事务中追加活动事件"""
+    events = collect_flush_events(session)
+    if events:
+        session.connection().execute(insert(ActivityEvent.__table__), events)
+
+
+class ActivityService:
+    """活动事件服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def record(self, event_type: str, title: str, description: str = None,
+               actor: Optional[User] = None, subject_type: str = None, subject_id: int = None):
+        """追加一条活动事件（随调用方的事务一起提交）"""
+        self.db.add(ActivityEvent(
+            event_type=event_type,
+            actor_id=actor.id if actor else None,
+            actor_name=actor.name if actor else None,
+            subject_type=subject_type,
+            subject_id=subject_id,
+            title=title,
+            description=description
+        ))
+
+    async def record_many(self, events: Iterable[Dict[str, Any]]):
+        """批量追加活动事件（随调用方的事务一起提交）"""
+        events = list(events)
+        if events:
+            await self.db.execute(insert(ActivityEvent), events)
+
+    async def feed(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        event_types: Optional[List[str]] = None
+    ) -> Tuple[List[ActivityEvent], Optional[str]]:
+        """按时间倒序读取活动流，返回 (本页事件, 下一页游标)"""
+        query = select(ActivityEvent)
+        if event_types:
+            query = query.where(ActivityEvent.event_type.in_(event_types))
+        if cursor:
+            values = decode_cursor(cursor)
+            try:
+                last_time = datetime.fromisoformat(values["t"])
+                last_id = int(values["id"])
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="无效的分页游标"
+                )
+            query = query.where(tuple_(ActivityEvent.created_at, ActivityEvent.id) < (last_time, last_id))
+
+        result = await self.db.execute(
+            query.order_by(ActivityEvent.created_at.desc(), ActivityEvent.id.desc()).limit(limit + 1)
+        )
+        events = list(result.scalars().all())
+        if len(events) <= limit:
+            return events, None
+
+        events = events[:limit]
+        last = events[-1]
+        return events, encode_cursor({"t": last.created_at.isoformat(), "id": last.id})
+
+    async def backfill_if_empty(self) -> int:
+        """事件表为空时，从已有的教师和练习记录生成历史事件，返回生成数量"""
+        if await self.db.scalar(select(func.count()).select_from(ActivityEvent)):
+            return 0
+
+        events = []
+        teachers = (await self.db.execute(
+            select(User).where(User.role == UserRole.TEACHER)
+        )).scalars().all()
+        for teacher in teachers:
+            events.append({
+                **registration_event(teacher.id, teacher.name, teacher.email),
+                "created_at": _utc(teacher.created_at),
+            })
+
+        practices = (await self.db.execute(
+            select(PracticeSession, User.name).join(User, PracticeSession.user_id == User.id)
+        )).all()
+        for practice, name in practices:
+            event_type = PRACTICE_COMPLETED if practice.status == PracticeStatus.COMPLETED else (
+                REVIEW if practice.status == PracticeStatus.REVIEWED else PRACTICE_STARTED
+            )
+            events.append({
+                **_practice_event(event_type, practice, name),
+                "created_at": _utc(practice.updated_at or practice.created_at),
+            })
+
+        await self.record_many(events)
+        await self.db.commit()
+        if events:
+            logger.info(f"已从历史数据生成活动事件: {len(events)} 条")
+        return len(events)
+
+
+def _utc(value: Optional[datetime]) -> datetime:
+    """转换为不带时区的 UTC 时间"""
+    if value is None:
+        return datetime.utcnow()
+    if value.tzinfo is not None:
+        return value.replace(tzinfo=None) - value.utcoffset()
+    return value
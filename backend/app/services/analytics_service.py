@@ -0,0 +1,375 @@
+"""
+数据分析服务
+学习时长增量、练习完成和评分在发生时追加写入 analytics_events 表，
+按天/按周分桶统计活跃教师、完成练习、平均评分和学习时长；
+结果写入 analytics_rollups 汇总表，之后每次只重算最近一个已存桶及其之后的桶，
+已经结束的历史桶不再重算（事件按发生时间入桶，不会再落入历史桶）。时间桶按 UTC 划分，周桶从周一开始
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Date, cast, delete, distinct, event, func, insert, inspect, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.activity import ActivityEvent
+from app.models.analytics import AnalyticsEvent, AnalyticsRollup
+from app.models.learning_progress import LearningProgress
+from app.models.training import PracticeSession, PracticeStatus
+from app.models.user import User, UserRole
+from app.services.activity_service import LOGIN, PRACTICE_COMPLETED, REVIEW
+
+logger = logging.getLogger(__name__)
+
+DAY = "day"
+WEEK = "week"
+GRANULARITIES = (DAY, WEEK)
+
+# 分析事件类型
+STUDY = "study"  # 资料学习时长
+PRACTICE = "practice"  # 练习时长
+COMPLETION = "completion"
+SCORE = "score"
+
+# 已完成的练习（评审后的练习同样计为已完成）
+COMPLETED_STATUSES = (PracticeStatus.COMPLETED, PracticeStatus.REVIEWED)
+
+
+def _utc(value) -> datetime:
+    """转换为不带时区的 UTC 时间"""
+    if value is None:
+        return datetime.utcnow()
+    if value.tzinfo is not None:
+        return value.replace(tzinfo=None) - value.utcoffset()
+    return value
+
+
+def _is_completed(status) -> bool:
+    """判断练习状态是否为已完成（兼容枚举和字符串）"""
+    return status in COMPLETED_STATUSES or status in tuple(item.value for item in COMPLETED_STATUSES)
+
+
+def _previous(obj, attr: str):
+    """取属性修改前的值（未修改时为当前值）"""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return None
+    return getattr(obj, attr)
+
+
+def _changed(obj, attr: str) -> bool:
+    """属性在本次 flush 中是否被修改"""
+    return inspect(obj).attrs[attr].history.has_changes()
+
+
+def _study_event(user_id: Optional[int], seconds, kind: str = STUDY) -> Dict[str, Any]:
+    """学习或练习时长增量事件（只增不减，0 秒的事件仅标记教师活跃）"""
+    return {"kind": kind, "user_id": user_id, "amount": max(0.0, float(seconds or 0)), "count": 0}
+
+
+def collect_analytics_events(session: Session) -> List[Dict[str, Any]]:
+    """从本次 flush 的新增和修改对象中提取分析事件"""
+    events = []
+
+    for obj in session.new:
+        if isinstance(obj, LearningProgress):
+            if obj.total_study_seconds or obj.last_active_time is not None:
+                events.append(_study_event(obj.user_id, obj.total_study_seconds))
+        elif isinstance(obj, PracticeSession):
+            if obj.duration_seconds:
+                events.append(_study_event(obj.user_id, obj.duration_seconds, PRACTICE))
+            if _is_completed(obj.status):
+                events.append({"kind": COMPLETION, "user_id": obj.user_id, "amount": 0.0, "count": 1})
+            if obj.overall_score is not None:
+                events.append({"kind": SCORE, "user_id": obj.user_id, "amount": float(obj.overall_score), "count": 1})
+
+    for obj in session.dirty:
+        if isinstance(obj, LearningProgress):
+            if _changed(obj, "total_study_seconds") or _changed(obj, "last_active_time"):
+                delta = (obj.total_study_seconds or 0) - (_previous(obj, "total_study_seconds") or 0)
+                events.append(_study_event(obj.user_id, delta))
+        elif isinstance(obj, PracticeSession):
+            if _changed(obj, "duration_seconds"):
+                delta = (obj.duration_seconds or 0) - (_previous(obj, "duration_seconds") or 0)
+                if delta > 0:
+                    events.append(_study_event(obj.user_id, delta, PRACTICE))
+            if _changed(obj, "status") and _is_completed(obj.status) and not _is_completed(_previous(obj, "status")):
+                events.append({"kind": COMPLETION, "user_id": obj.user_id, "amount": 0.0, "count": 1})
+            if _changed(obj, "overall_score") and obj.overall_score is not None:
+                events.append({"kind": SCORE, "user_id": obj.user_id, "amount": float(obj.overall_score), "count": 1})
+
+    return events
+
+
+@event.listens_for(PracticeSession.status, "set", active_history=True)
+@event.listens_for(PracticeSession.duration_seconds, "set", active_history=True)
+@event.listens_for(LearningProgress.total_study_seconds, "set", active_history=True)
+def _load_previous_value(target, value, oldvalue, initiator):
+    """修改状态和时长时先加载旧值（提交后属性已过期），以便 flush 时计算增量"""
+
+
+@event.listens_for(Session, "after_flush")
+def _append_analytics_events(session: Session, flush_context):
+    """在 flush 所在的事务中追加分析事件"""
+    events = collect_analytics_events(session)
+    if events:
+        session.connection().execute(insert(AnalyticsEvent.__table__), events)
+
+
+def bucket_start_of(value: date, granularity: str) -> date:
+    """计算日期所在时间桶的起始日期"""
+    if granularity == WEEK:
+        return value - timedelta(days=value.weekday())
+    return value
+
+
+def _step(granularity: str) -> timedelta:
+    """相邻时间桶的间隔"""
+    return timedelta(weeks=1) if granularity == WEEK else timedelta(days=1)
+
+
+def _to_date(value) -> Optional[date]:
+    """将数据库返回的桶值（SQLite 为字符串）转换为日期"""
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+class AnalyticsService:
+    """数据分析服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    def bucket_expression(self, column, granularity: str):
+        """生成将时间列截断到时间桶起始日期的表达式"""
+        if self.dialect == "sqlite":
+            if granularity == WEEK:
+                # 先跳到本周日再回退6天，得到本周一
+                return func.date(column, "weekday 0", "-6 days")
+            return func.date(column)
+        return cast(func.date_trunc(granularity, column), Date)
+
+    async def get_buckets(self, granularity: str = DAY, periods: int = 30, now: datetime = None) -> List[Dict[str, Any]]:
+        """刷新当前时间桶后读取最近 periods 个时间桶，无数据的桶补零"""
+        now = now or datetime.utcnow()
+        await self.refresh(granularity, now)
+
+        step = _step(granularity)
+        current = bucket_start_of(now.date(), granularity)
+        first = current - step * (periods - 1)
+        result = await self.db.execute(
+            select(AnalyticsRollup).where(
+                AnalyticsRollup.granularity == granularity,
+                AnalyticsRollup.bucket_start >= first
+            ).order_by(AnalyticsRollup.bucket_start)
+        )
+        rows = {row.bucket_start: row for row in result.scalars().all()}
+
+        buckets = []
+        for index in range(periods):
+            bucket = first + step * index
+            row = rows.get(bucket)
+            buckets.append({
+                "bucketStart": bucket.isoformat(),
+                "activeTeachers": row.active_teachers if row else 0,
+                "completedSessions": row.completed_sessions if row else 0,
+                "averageScore": round(row.average_score, 1) if row and row.average_score is not None else None,
+                "studyMinutes": round(row.study_minutes, 1) if row else 0.0,
+            })
+        return buckets
+
+    async def refresh(self, granularity: str, now: datetime = None, rebuild: bool = False) -> int:
+        """重算最近一个已存桶到当前桶的汇总行（rebuild 时全部重算），返回写入行数"""
+        now = now or datetime.utcnow()
+        current = bucket_start_of(now.date(), granularity)
+
+        since = None
+        if not rebuild:
+            since = await self.db.scalar(
+                select(func.max(AnalyticsRollup.bucket_start)).where(AnalyticsRollup.granularity == granularity)
+            )
+        since_time = datetime.combine(since, time.min) if since else None
+
+        rows: Dict[date, Dict[str, Any]] = {}
+
+        def row_for(bucket) -> Dict[str, Any]:
+            bucket = _to_date(bucket)
+            return rows.setdefault(bucket, {
+                "granularity": granularity,
+                "bucket_start": bucket,
+                "active_teachers": 0,
+                "completed_sessions": 0,
+                "scored_sessions": 0,
+                "average_score": None,
+                "study_minutes": 0.0,
+                "practice_minutes": 0.0,
+            })
+
+        # 当前桶即使没有数据也写入一行，作为下次增量刷新的起点
+        row_for(current)
+
+        for bucket, count in await self._active_teachers(granularity, since_time):
+            row_for(bucket)["active_teachers"] = count
+        for bucket, kind, amount, count in await self._event_totals(granularity, since_time):
+            row = row_for(bucket)
+            if kind == COMPLETION:
+                row["completed_sessions"] = count or 0
+            elif kind == SCORE:
+                row["scored_sessions"] = count or 0
+                row["average_score"] = float(amount) / count if count else None
+            elif kind == STUDY:
+                row["study_minutes"] += float(amount or 0) / 60
+            elif kind == PRACTICE:
+                # 练习时长同时计入学习时长
+                row["practice_minutes"] = float(amount or 0) / 60
+                row["study_minutes"] += row["practice_minutes"]
+
+        stale = delete(AnalyticsRollup).where(AnalyticsRollup.granularity == granularity)
+        if since:
+            stale = stale.where(AnalyticsRollup.bucket_start >= since)
+        try:
+            await self.db.execute(stale)
+            await self.db.execute(insert(AnalyticsRollup), list(rows.values()))
+            await self.db.commit()
+        except IntegrityError:
+            # 并发请求已经完成了同一次刷新
+            await self.db.rollback()
+            logger.info(f"分析汇总已由其他请求刷新: {granularity}")
+            return 0
+        return len(rows)
+
+    async def _active_teachers(self, granularity: str, since: Optional[datetime]):
+        """按桶统计有练习、学习或登录记录的教师数"""
+        sources = [
+            (PracticeSession.user_id, PracticeSession.created_at, None),
+            (AnalyticsEvent.user_id, AnalyticsEvent.occurred_at, None),
+            (ActivityEvent.actor_id, ActivityEvent.created_at, ActivityEvent.event_type == LOGIN),
+        ]
+        selects = []
+        for user_column, time_column, condition in sources:
+            query = select(user_column.label("user_id"), time_column.label("ts")).where(time_column.isnot(None))
+            if condition is not None:
+                query = query.where(condition)
+            if since:
+                query = query.where(time_column >= since)
+            selects.append(query)
+        activity = union_all(*selects).subquery()
+
+        bucket = self.bucket_expression(activity.c.ts, granularity)
+        result = await self.db.execute(
+            select(bucket, func.count(distinct(activity.c.user_id)))
+            .join(User, User.id == activity.c.user_id)
+            .where(User.role == UserRole.TEACHER)
+            .group_by(bucket)
+        )
+        return result.all()
+
+    async def _event_totals(self, granularity: str, since: Optional[datetime]):
+        """按桶和事件类型汇总分析事件的数值和次数"""
+        bucket = self.bucket_expression(AnalyticsEvent.occurred_at, granularity)
+        query = select(
+            bucket,
+            AnalyticsEvent.kind,
+            func.sum(AnalyticsEvent.amount),
+            func.sum(AnalyticsEvent.count)
+        )
+        if since:
+            query = query.where(AnalyticsEvent.occurred_at >= since)
+        result = await self.db.execute(query.group_by(bucket, AnalyticsEvent.kind))
+        return result.all()
+
+    async def backfill_if_empty(self) -> int:
+        """事件表为空时，从已有的学习进度和练习记录生成历史分析事件并重建汇总，返回生成数量"""
+        if await self.db.scalar(select(func.count()).select_from(AnalyticsEvent)):
+            return 0
+
+        events = []
+        progresses = (await self.db.execute(
+            select(LearningProgress.user_id, LearningProgress.total_study_seconds,
+                   LearningProgress.last_active_time, LearningProgress.created_at)
+        )).all()
+        for user_id, seconds, last_active, created in progresses:
+            if seconds or last_active is not None:
+                events.append({**_study_event(user_id, seconds), "occurred_at": _utc(last_active or created)})
+
+        # 完成时间取最早的完成或评审活动事件，没有时取最后修改时间
+        completed_at = dict((await self.db.execute(
+            select(ActivityEvent.subject_id, func.min(ActivityEvent.created_at)).where(
+                ActivityEvent.subject_type == "practice_session",
+                ActivityEvent.event_type.in_((PRACTICE_COMPLETED, REVIEW))
+            ).group_by(ActivityEvent.subject_id)
+        )).all())
+        practices = (await self.db.execute(
+            select(PracticeSession.id, PracticeSession.user_id, PracticeSession.status,
+                   PracticeSession.overall_score, PracticeSession.duration_seconds,
+                   PracticeSession.created_at, PracticeSession.updated_at)
+        )).all()
+        for practice_id, user_id, practice_status, score, duration, created, updated in practices:
+            done = _utc(completed_at.get(practice_id) or updated or created)
+            if duration:
+                events.append({**_study_event(user_id, duration, PRACTICE), "occurred_at": done})
+            if _is_completed(practice_status):
+                events.append({"kind": COMPLETION, "user_id": user_id, "amount": 0.0, "count": 1, "occurred_at": done})
+            if score is not None:
+                events.append({"kind": SCORE, "user_id": user_id, "amount": float(score), "count": 1, "occurred_at": done})
+
+        if not events:
+            return 0
+        await self.db.execute(insert(AnalyticsEvent), events)
+        await self.db.commit()
+        logger.info(f"已从历史数据生成分析事件: {len(events)} 条")
+        for granularity in GRANULARITIES:
+            await self.refresh(granularity, rebuild=True)
+        return len(events)
+
+    async def get_summary(self, days: int = 30, now: datetime = None) -> Dict[str, Any]:
+        """由最近 days 个按天汇总行统计完成练习数、平均评分和平均练习时长，活跃教师跨天去重"""
+        now = now or datetime.utcnow()
+        await self.refresh(DAY, now)
+        first = bucket_start_of(now.date(), DAY) - timedelta(days=days - 1)
+        active = await self._active_teachers_since(datetime.combine(first, time.min))
+
+        completed, score_sum, scored, practice_minutes = (await self.db.execute(
+            select(
+                func.sum(AnalyticsRollup.completed_sessions),
+                func.sum(AnalyticsRollup.average_score * AnalyticsRollup.scored_sessions),
+                func.sum(AnalyticsRollup.scored_sessions),
+                func.sum(AnalyticsRollup.practice_minutes)
+            ).where(
+                AnalyticsRollup.granularity == DAY,
+                AnalyticsRollup.bucket_start >= first
+            )
+        )).one()
+        completed = completed or 0
+
+        return {
+            "activeTeachers": active,
+            "completedLectures": completed,
+            "averageScore": round(float(score_sum) / scored, 1) if scored else 0,
+            "averageDuration": round(float(practice_minutes or 0) / completed, 1) if completed else 0,
+        }
+
+    async def _active_teachers_since(self, since: datetime) -> int:
+        """统计某时间之后有活动的教师数（跨桶去重，不能由桶内计数相加得到）"""
+        activity = union_all(
+            select(PracticeSession.user_id.label("user_id")).where(PracticeSession.created_at >= since),
+            select(AnalyticsEvent.user_id).where(AnalyticsEvent.occurred_at >= since),
+            select(ActivityEvent.actor_id).where(
+                ActivityEvent.event_type == LOGIN,
+                ActivityEvent.created_at >= since
+            ),
+        ).subquery()
+        return await self.db.scalar(
+            select(func.count(distinct(activity.c.user_id)))
+            .join(User, User.id == activity.c.user_id)
+            .where(User.role == UserRole.TEACHER)
+        ) or 0
@@ -0,0 +1,63 @@
+"""
+用户声明吊销服务
+吊销记录写入共享表 claim_revocations，各工作进程按同步间隔把表中记录合并到进程内列表；
+因此一个进程中停用用户或修改资料后，其他进程最迟在一个同步间隔后拒绝旧令牌中的声明
+"""
+
+import logging
+import time
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.revocation import ClaimRevocationList
+from app.models.refresh_token import ClaimRevocation
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimRevocationService:
+    """用户声明吊销服务类"""
+
+    def __init__(self, db: AsyncSession, revocations: ClaimRevocationList):
+        self.db = db
+        self.revocations = revocations
+
+    async def revoke(self, user_id: int, deactivated: bool = False):
+        """记录吊销并提交，同时更新本进程的列表"""
+        revoked_at = time.time()
+        insert = postgresql.insert if self.db.bind.dialect.name == "postgresql" else sqlite.insert
+        statement = insert(ClaimRevocation.__table__).values(
+            user_id=user_id, revoked_at=revoked_at, deactivated=deactivated
+        )
+        set_ = {"revoked_at": statement.excluded.revoked_at}
+        if deactivated:
+            set_["deactivated"] = True
+        await self.db.execute(statement.on_conflict_do_update(index_elements=["user_id"], set_=set_))
+        await self.db.commit()
+        self.revocations.revoke(user_id, deactivated=deactivated, revoked_at=revoked_at)
+
+    async def sync(self):
+        """从共享表加载保留期内的记录，并清理已过期的记录"""
+        cutoff = time.time() - self.revocations.retention_seconds
+        rows = (await self.db.execute(
+            select(ClaimRevocation.user_id, ClaimRevocation.revoked_at, ClaimRevocation.deactivated)
+            .where(ClaimRevocation.revoked_at >= cutoff)
+        )).all()
+        self.revocations.load((user_id, revoked_at, bool(deactivated)) for user_id, revoked_at, deactivated in rows)
+
+        await self.db.execute(delete(ClaimRevocation).where(ClaimRevocation.revoked_at < cutoff))
+        await self.db.commit()
+
+
+async def sync_claim_revocations(revocations: ClaimRevocationList):
+    """到达同步间隔时从共享表同步；同步失败时沿用进程内列表，下次请求重试"""
+    if not revocations.claim_sync():
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await ClaimRevocationService(db, revocations).sync()
+    except Exception as e:
+        logger.warning(f"同步用户声明吊销列表失败: {e}")
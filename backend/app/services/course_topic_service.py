@@ -0,0 +1,136 @@
+"""
+课程主题批量同步服务
+将提交的主题列表与现有记录比较，只插入新增、删除移除、重命名修改的主题，未变化的主题保留 id；
+插入、更新、删除分别以一次 executemany 在同一事务中执行
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.training import CourseTopic
+
+logger = logging.getLogger(__name__)
+
+# 提交的主题：名称，或 {"id": 已有主题 id, "name": 新名称}（重命名）
+TopicItem = Union[str, Dict[str, object]]
+
+
+@dataclass
+class TopicDiff:
+    """主题列表差异"""
+    inserts: List[str] = field(default_factory=list)
+    renames: List[Tuple[int, str]] = field(default_factory=list)
+    deletes: List[int] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)  # 同步后的主题名称（按提交顺序）
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserts or self.renames or self.deletes)
+
+
+def _normalize(items: Sequence[TopicItem]) -> List[Tuple[Optional[int], str]]:
+    """去掉空名称和重复名称（保留第一次出现），返回 (id, 名称)"""
+    seen = set()
+    normalized = []
+    for item in items:
+        if isinstance(item, str):
+            topic_id, name = None, item
+        else:
+            topic_id, name = item.get("id"), item.get("name") or ""
+        name = name.strip()
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        normalized.append((topic_id, name))
+    return normalized
+
+
+def diff_topics(current: Sequence[Tuple[int, str]], items: Sequence[TopicItem]) -> TopicDiff:
+    """计算从现有主题（按显示顺序的 (id, 名称)）到提交列表的插入、重命名和删除
+
+    名称已存在的主题保持不变；带 id 的项按 id 重命名；只提交名称时，
+    如果某个位置上原有的主题被移除、同一位置出现了新名称，视为在原位修改名称（保留 id）
+    """
+    desired = _normalize(items)
+    current_by_id = dict(current)
+    current_by_name = {name: topic_id for topic_id, name in current}
+    diff = TopicDiff(names=[name for _, name in desired])
+
+    kept = set()
+    pending = []  # (位置, 名称)：尚未对应到现有主题的名称
+    for position, (topic_id, name) in enumerate(desired):
+        if topic_id in current_by_id and topic_id not in kept:
+            kept.add(topic_id)
+            if current_by_id[topic_id] != name:
+                diff.renames.append((topic_id, name))
+        elif name in current_by_name and current_by_name[name] not in kept:
+            kept.add(current_by_name[name])
+        else:
+            pending.append((position, name))
+
+    # 原位修改名称：同一位置上原主题已被移除
+    removed_at = {
+        position: topic_id
+        for position, (topic_id, _) in enumerate(current)
+        if topic_id not in kept
+    }
+    for position, name in pending:
+        topic_id = removed_at.pop(position, None)
+        if topic_id is not None:
+            kept.add(topic_id)
+            diff.renames.append((topic_id, name))
+        else:
+            diff.inserts.append(name)
+
+    diff.deletes = [topic_id for topic_id, _ in current if topic_id not in kept]
+    return diff
+
+
+class CourseTopicService:
+    """课程主题服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def current(self) -> List[Tuple[int, str]]:
+        """现有主题（与管理端显示顺序一致）"""
+        result = await self.db.execute(
+            select(CourseTopic.id, CourseTopic.name).order_by(CourseTopic.created_at, CourseTopic.id)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def sync(self, items: Sequence[TopicItem]) -> Tuple[TopicDiff, List[Dict[str, object]]]:
+        """将课程主题同步为提交的列表并提交事务，返回差异和同步后的主题（含 id，按提交顺序）"""
+        diff = diff_topics(await self.current(), items)
+        if diff.changed:
+            if diff.deletes:
+                await self.db.execute(delete(CourseTopic).where(CourseTopic.id.in_(diff.deletes)))
+            if diff.renames:
+                # 名称唯一：互换名称等情况先改为临时名称，避免中间状态冲突
+                current_names = {name for _, name in await self.current()}
+                if any(name in current_names for _, name in diff.renames):
+                    await self.db.execute(
+                        update(CourseTopic),
+                        [{"id": topic_id, "name": f"\x00{topic_id}"} for topic_id, _ in diff.renames]
+                    )
+                await self.db.execute(
+                    update(CourseTopic),
+                    [{"id": topic_id, "name": name} for topic_id, name in diff.renames]
+                )
+            if diff.inserts:
+                await self.db.execute(insert(CourseTopic), [{"name": name} for name in diff.inserts])
+            await self.db.commit()
+            logger.info(
+                f"课程主题已同步: 新增 {len(diff.inserts)}, 重命名 {len(diff.renames)}, 删除 {len(diff.deletes)}"
+            )
+
+        ids = dict(
+            (await self.db.execute(
+                select(CourseTopic.name, CourseTopic.id).where(CourseTopic.name.in_(diff.names))
+            )).all()
+        ) if diff.names else {}
+        return diff, [{"id": ids[name], "name": name} for name in diff.names]
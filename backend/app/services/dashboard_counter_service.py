@@ -0,0 +1,177 @@
+"""
+管理端统计计数服务
+在 ORM flush 时根据用户培训状态和练习状态的变化增量更新计数表，
+统计接口只读一行；计数出现偏差时可通过 reconcile 从源表重建
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.dashboard_counter import DashboardCounter
+from app.models.training import PracticeSession, PracticeStatus
+from app.models.user import User, UserRole, TrainingStatus
+
+logger = logging.getLogger(__name__)
+
+COUNTER_ROW_ID = 1
+COUNTER_FIELDS = ("total_teachers", "completed_training", "in_progress_training", "pending_reviews")
+
+
+def _coerce(enum_cls, value):
+    """将字符串形式的枚举值统一转换为枚举成员"""
+    if value is None or isinstance(value, enum_cls):
+        return value
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return enum_cls[value] if value in enum_cls.__members__ else None
+
+
+def user_counters(role, training_status) -> Counter:
+    """计算单个用户对各计数的贡献"""
+    counters = Counter()
+    if _coerce(UserRole, role) != UserRole.TEACHER:
+        return counters
+
+    counters["total_teachers"] += 1
+    training_status = _coerce(TrainingStatus, training_status)
+    if training_status == TrainingStatus.COMPLETED:
+        counters["completed_training"] += 1
+    elif training_status == TrainingStatus.IN_PROGRESS:
+        counters["in_progress_training"] += 1
+    return counters
+
+
+def session_counters(status) -> Counter:
+    """计算单个练习对各计数的贡献"""
+    counters = Counter()
+    if _coerce(PracticeStatus, status) == PracticeStatus.COMPLETED:
+        counters["pending_reviews"] += 1
+    return counters
+
+
+def counter_update_statement(deltas: Dict[str, int]):
+    """生成按增量更新计数行的语句，没有变化时返回 None"""
+    values = {
+        name: getattr(DashboardCounter.__table__.c, name) + delta
+        for name, delta in deltas.items()
+        if delta and name in COUNTER_FIELDS
+    }
+    if not values:
+        return None
+    return (
+        update(DashboardCounter.__table__)
+        .where(DashboardCounter.__table__.c.id == COUNTER_ROW_ID)
+        .values(**values)
+    )
+
+
+def _old_value(obj, attr: str):
+    """取属性修改前的值（未修改时为当前值）"""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def _contribution(obj, old: bool = False) -> Counter:
+    """计算对象（修改前或修改后）对计数的贡献"""
+    value = _old_value if old else getattr
+    if isinstance(obj, User):
+        return user_counters(value(obj, "role"), value(obj, "training_status"))
+    if isinstance(obj, PracticeSession):
+        return session_counters(value(obj, "status"))
+    return Counter()
+
+
+def collect_flush_deltas(session: Session) -> Counter:
+    """根据本次 flush 中的新增、修改、删除对象计算计数增量"""
+    deltas = Counter()
+    for obj in session.new:
+        deltas.update(_contribution(obj))
+    for obj in session.dirty:
+        if isinstance(obj, (User, PracticeSession)) and session.is_modified(obj, include_collections=False):
+            deltas.update(_contribution(obj))
+            deltas.subtract(_contribution(obj, old=True))
+    for obj in session.deleted:
+        deltas.subtract(_contribution(obj, old=True))
+    return deltas
+
+
+def user_records_counters(records: Iterable[Dict[str, Any]]) -> Counter:
+    """计算一批用户记录（字典）对计数的贡献"""
+    deltas = Counter()
+    for record in records:
+        deltas.update(user_counters(record.get("role"), record.get("training_status")))
+    return deltas
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_flush_deltas(session: Session, flush_context):
+    """在 flush 所在的事务中更新计数，与业务数据一起提交或回滚"""
+    statement = counter_update_statement(collect_flush_deltas(session))
+    if statement is not None:
+        session.connection().execute(statement)
+
+
+class DashboardCounterService:
+    """管理端统计计数服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_counters(self) -> Dict[str, int]:
+        """读取计数行；计数行不存在时直接从源表统计"""
+        row = await self.db.get(DashboardCounter, COUNTER_ROW_ID)
+        if row is None:
+            return await self.count_from_source()
+        return {name: getattr(row, name) for name in COUNTER_FIELDS}
+
+    async def count_from_source(self) -> Dict[str, int]:
+        """从用户表和练习表重新统计"""
+        teachers = (await self.db.execute(
+            select(User.training_status, func.count())
+            .where(User.role == UserRole.TEACHER)
+            .group_by(User.training_status)
+        )).all()
+        pending_reviews = await self.db.scalar(
+            select(func.count()).select_from(PracticeSession).where(
+                PracticeSession.status == PracticeStatus.COMPLETED
+            )
+        )
+
+        counters = Counter()
+        for training_status, count in teachers:
+            for name, value in user_counters(UserRole.TEACHER, training_status).items():
+                counters[name] += value * count
+        counters["pending_reviews"] = pending_reviews or 0
+        return {name: counters[name] for name in COUNTER_FIELDS}
+
+    async def reconcile(self) -> Dict[str, int]:
+        """从源表重建计数行，返回重建后的计数"""
+        counters = await self.count_from_source()
+
+        row = await self.db.get(DashboardCounter, COUNTER_ROW_ID, populate_existing=True, with_for_update=True)
+        if row is None:
+            self.db.add(DashboardCounter(id=COUNTER_ROW_ID, **counters))
+        else:
+            drift = {name: getattr(row, name) - counters[name] for name in COUNTER_FIELDS if getattr(row, name) != counters[name]}
+            if drift:
+                logger.warning(f"统计计数存在偏差，已重建: {drift}")
+            for name, value in counters.items():
+                setattr(row, name, value)
+        await self.db.commit()
+
+        return counters
+
+    async def apply_deltas(self, deltas: Dict[str, int]):
+        """在当前事务中应用计数增量（用于绕过 ORM flush 的批量写入）"""
+        statement = counter_update_statement(deltas)
+        if statement is not None:
+            await self.db.execute(statement)
+
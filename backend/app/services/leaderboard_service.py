@@ -0,0 +1,266 @@
+"""
+教师排行榜服务
+在 ORM flush 时根据练习评分的变化增量更新每位教师的累计分数和次数（总榜）
+以及按日汇总（时间窗口榜）；前N名和名次查询按平均分索引读取，不再扫描练习表。
+总榜出现偏差时可通过 rebuild 从练习表重建
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, exists, func, inspect, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.models.leaderboard import TeacherDailyScore, TeacherLeaderboard
+from app.models.training import PracticeSession
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# (user_id, 日期) -> [分数增量, 次数增量]
+ScoreDeltas = Dict[Tuple[int, date], List[float]]
+
+
+def _to_day(value) -> date:
+    """将练习创建时间转换为 UTC 日期"""
+    if value is None:
+        return datetime.utcnow().date()
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return value.date()
+
+
+def _old_score(obj) -> Optional[float]:
+    """取评分修改前的值（未修改时为当前值）"""
+    history = inspect(obj).attrs["overall_score"].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return None
+    return obj.overall_score
+
+
+def _add(deltas: ScoreDeltas, user_id: int, day: date, score: Optional[float], sign: int):
+    """累加一次评分对 (教师, 日期) 的贡献"""
+    if score is None or user_id is None:
+        return
+    delta = deltas[(user_id, day)]
+    delta[0] += sign * score
+    delta[1] += sign
+
+
+def collect_score_deltas(session: Session) -> ScoreDeltas:
+    """根据本次 flush 中新增、修改、删除的练习计算评分增量"""
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, PracticeSession):
+            changes.append((obj, None, obj.overall_score))
+    for obj in session.dirty:
+        if isinstance(obj, PracticeSession) and inspect(obj).attrs["overall_score"].history.has_changes():
+            changes.append((obj, _old_score(obj), obj.overall_score))
+    for obj in session.deleted:
+        if isinstance(obj, PracticeSession):
+            changes.append((obj, _old_score(obj), None))
+    if not changes:
+        return {}
+
+    # 已过期的旧记录补查创建时间
+    created = {}
+    missing = [obj.id for obj, _, _ in changes if obj.id is not None and "created_at" not in inspect(obj).dict]
+    if missing:
+        created = dict(session.connection().execute(
+            select(PracticeSession.id, PracticeSession.created_at).where(PracticeSession.id.in_(missing))
+        ).all())
+
+    deltas: ScoreDeltas = defaultdict(lambda: [0.0, 0])
+    for obj, old, new in changes:
+        day = _to_day(inspect(obj).dict.get("created_at", created.get(obj.id)))
+        _add(deltas, obj.user_id, day, old, -1)
+        _add(deltas, obj.user_id, day, new, 1)
+    return {key: value for key, value in deltas.items() if value[0] or value[1]}
+
+
+def _upsert(dialect: str, model, key_columns: List[str], values: Dict[str, Any], extra: Dict[str, Any] = None):
+    """生成“插入或累加”语句：score_sum、score_count 在已有行上累加"""
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(model.__table__).values(**values)
+    table = model.__table__
+    set_ = {
+        "score_sum": table.c.score_sum + statement.excluded.score_sum,
+        "score_count": table.c.score_count + statement.excluded.score_count,
+    }
+    set_.update(extra or {})
+    return statement.on_conflict_do_update(index_elements=key_columns, set_=set_)
+
+
+def score_update_statements(deltas: ScoreDeltas, dialect: str) -> list:
+    """生成按增量更新总榜和每日汇总的语句"""
+    statements = []
+    totals: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0])
+    table = TeacherLeaderboard.__table__
+
+    for (user_id, day), (score_sum, score_count) in deltas.items():
+        totals[user_id][0] += score_sum
+        totals[user_id][1] += score_count
+        statements.append(_upsert(
+            dialect, TeacherDailyScore, ["user_id", "day"],
+            {"user_id": user_id, "day": day, "score_sum": score_sum, "score_count": score_count}
+        ))
+
+    for user_id, (score_sum, score_count) in totals.items():
+        new_sum = table.c.score_sum + score_sum
+        new_count = table.c.score_count + score_count
+        statements.append(_upsert(
+            dialect, TeacherLeaderboard, ["user_id"],
+            {
+                "user_id": user_id,
+                "score_sum": score_sum,
+                "score_count": score_count,
+                "average_score": score_sum / score_count if score_count > 0 else None,
+            },
+            {"average_score": new_sum / func.nullif(new_count, 0), "updated_at": func.now()}
+        ))
+    return statements
+
+
+@event.listens_for(PracticeSession.overall_score, "set", active_history=True)
+def _load_previous_score(target, value, oldvalue, initiator):
+    """修改评分时先加载旧值（提交后属性已过期），以便 flush 时计算增量"""
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_score_deltas(session: Session, flush_context):
+    """在 flush 所在的事务中更新排行榜，与练习评分一起提交或回滚"""
+    deltas = collect_score_deltas(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    for statement in score_update_statements(deltas, connection.dialect.name):
+        connection.execute(statement)
+
+
+def _entry(rank: int, user_id: int, name: str, email: str, average_score, score_count) -> Dict[str, Any]:
+    """排行榜条目"""
+    return {
+        "id": user_id,
+        "name": name,
+        "email": email,
+        "rank": rank,
+        "score": round(float(average_score or 0), 1),
+        "lectureCount": score_count,
+    }
+
+
+class LeaderboardService:
+    """教师排行榜服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def top(self, limit: int = 5, days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按平均分取前 limit 名教师；指定 days 时只统计最近 days 天创建的练习"""
+        if days:
+            return await self._top_window(limit, days)
+
+        teacher = aliased(User)
+        result = await self.db.execute(
+            select(
+                TeacherLeaderboard.user_id, User.name, User.email,
+                TeacherLeaderboard.average_score, TeacherLeaderboard.score_count
+            ).join(
+                User, User.id == TeacherLeaderboard.user_id
+            ).where(
+                TeacherLeaderboard.average_score.isnot(None),
+                # 角色条件写成关联子查询，让查询按平均分索引顺序读取、取满 limit 行即停止
+                exists().where(teacher.id == TeacherLeaderboard.user_id, teacher.role == UserRole.TEACHER)
+            ).order_by(
+                TeacherLeaderboard.average_score.desc(), TeacherLeaderboard.user_id.desc()
+            ).limit(limit)
+        )
+        return [_entry(index + 1, *row) for index, row in enumerate(result.all())]
+
+    async def _top_window(self, limit: int, days: int) -> List[Dict[str, Any]]:
+        """时间窗口排行：按日期范围汇总每日评分（每位教师最多 days 行）"""
+        window = self._window_query(days).subquery()
+        result = await self.db.execute(
+            select(
+                window.c.user_id, User.name, User.email,
+                window.c.average_score, window.c.score_count
+            ).join(
+                User, User.id == window.c.user_id
+            ).where(
+                User.role == UserRole.TEACHER
+            ).order_by(
+                window.c.average_score.desc(), window.c.user_id.desc()
+            ).limit(limit)
+        )
+        return [_entry(index + 1, *row) for index, row in enumerate(result.all())]
+
+    def _window_query(self, days: int):
+        """最近 days 天（含今天）每位教师的评分汇总"""
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        score_count = func.sum(TeacherDailyScore.score_count)
+        return select(
+            TeacherDailyScore.user_id,
+            (func.sum(TeacherDailyScore.score_sum) / func.nullif(score_count, 0)).label("average_score"),
+            score_count.label("score_count")
+        ).where(
+            TeacherDailyScore.day >= since
+        ).group_by(
+            TeacherDailyScore.user_id
+        ).having(score_count > 0)
+
+    async def rank_of(self, user_id: int, days: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """查询教师的名次，没有评分时返回 None"""
+        if days:
+            board = self._window_query(days).subquery()
+        else:
+            board = select(
+                TeacherLeaderboard.user_id, TeacherLeaderboard.average_score, TeacherLeaderboard.score_count
+            ).where(TeacherLeaderboard.average_score.isnot(None)).subquery()
+
+        teacher = (await self.db.execute(
+            select(board.c.average_score, board.c.score_count, User.name, User.email)
+            .join(User, User.id == board.c.user_id)
+            .where(board.c.user_id == user_id)
+        )).first()
+        if teacher is None:
+            return None
+
+        # 名次 = 排在前面的教师数 + 1（同分时 user_id 大的在前，与索引倒序一致）
+        ahead = await self.db.scalar(
+            select(func.count()).select_from(board).where(
+                exists().where(User.id == board.c.user_id, User.role == UserRole.TEACHER),
+                or_(
+                    board.c.average_score > teacher.average_score,
+                    and_(board.c.average_score == teacher.average_score, board.c.user_id > user_id)
+                )
+            )
+        )
+        return _entry(ahead + 1, user_id, teacher.name, teacher.email, teacher.average_score, teacher.score_count)
+
+    async def rebuild(self) -> int:
+        """从练习表重建排行榜和每日汇总，返回有评分的教师数"""
+        scored = (await self.db.execute(
+            select(PracticeSession.user_id, PracticeSession.created_at, PracticeSession.overall_score)
+            .where(PracticeSession.overall_score.isnot(None))
+        )).all()
+
+        deltas: ScoreDeltas = defaultdict(lambda: [0.0, 0])
+        for user_id, created_at, score in scored:
+            _add(deltas, user_id, _to_day(created_at), score, 1)
+
+        await self.db.execute(delete(TeacherDailyScore))
+        await self.db.execute(delete(TeacherLeaderboard))
+        dialect = self.db.get_bind().dialect.name
+        for statement in score_update_statements(deltas, dialect):
+            await self.db.execute(statement)
+        await self.db.commit()
+
+        teachers = len({user_id for user_id, _ in deltas})
+        logger.info(f"教师排行榜已重建: {teachers} 位教师, {len(scored)} 次评分")
+        return teachers
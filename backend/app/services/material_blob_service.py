@@ -0,0 +1,133 @@
+"""
+资料文件内容寻址存储
+上传文件按 SHA-256 命名保存（uploads/materials/{sha256}{扩展名}），相同内容只保存一份；
+material_blobs 表记录每份文件被多少条资料引用，删除资料时引用数归零才删除文件。
+客户端已知文件哈希时可直接引用已有文件，不必再次上传
+"""
+
+import asyncio
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.blob import MaterialBlob
+
+logger = logging.getLogger(__name__)
+
+MATERIAL_DIR = Path("uploads/materials")
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+# 同一哈希的引用增减和文件移动/删除必须串行：按哈希分段加锁，锁数量固定
+_LOCK_STRIPES = 64
+_blob_locks = [asyncio.Lock() for _ in range(_LOCK_STRIPES)]
+
+
+def blob_lock(sha256: str) -> asyncio.Lock:
+    """取哈希对应的锁"""
+    return _blob_locks[int(sha256[:8], 16) % _LOCK_STRIPES]
+
+
+def normalize_sha256(value: str) -> str:
+    """校验并规范化十六进制 SHA-256"""
+    value = value.strip().lower()
+    if not _SHA256.match(value):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的 SHA-256")
+    return value
+
+
+def blob_url(path: str) -> str:
+    """文件访问 URL"""
+    return f"/uploads/materials/{Path(path).name}"
+
+
+class MaterialBlobService:
+    """资料文件引用计数服务类
+
+    acquire / release 需在持有 blob_lock(sha256) 时调用，并在释放锁之前提交事务
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, sha256: str) -> Optional[MaterialBlob]:
+        """按哈希查询文件"""
+        return await self.db.get(MaterialBlob, sha256)
+
+    async def find_by_path(self, path: Optional[str]) -> Optional[MaterialBlob]:
+        """按本地路径查询文件（内容寻址之前上传的文件没有记录）"""
+        if not path:
+            return None
+        return await self.db.scalar(select(MaterialBlob).where(MaterialBlob.path == path))
+
+    async def acquire(
+        self,
+        sha256: str,
+        size: int,
+        extension: str,
+        source: Optional[Path] = None
+    ) -> Tuple[MaterialBlob, bool]:
+        """增加一次引用，返回 (文件记录, 是否新建)
+
+        内容首次出现时将 source 移动到内容寻址路径；已存在时丢弃 source，不再写入。
+        source 为空表示按哈希引用已有文件，文件不存在时返回404
+        """
+        blob = await self.get(sha256)
+        created = False
+        if blob is None:
+            if source is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文件不存在，请上传")
+            # 其他进程同时写入同一内容时，等待其提交后改为引用已有记录，不再新建
+            dialect = self.db.get_bind().dialect.name
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            created = await self.db.scalar(
+                insert(MaterialBlob.__table__)
+                .values(sha256=sha256, path=str(MATERIAL_DIR / f"{sha256}{extension}"), size=size, ref_count=1)
+                .on_conflict_do_nothing(index_elements=["sha256"])
+                .returning(MaterialBlob.sha256)
+            ) is not None
+            blob = await self.get(sha256)
+
+        path = Path(blob.path)
+        if source is not None:
+            if path.exists():
+                source.unlink(missing_ok=True)
+            else:
+                # 同目录内重命名，不复制数据；记录存在但文件丢失时用本次上传恢复
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source, path)
+        elif not path.exists():
+            logger.error(f"资料文件丢失: {blob.path}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文件不存在，请上传")
+
+        if not created:
+            # 在数据库中自增，多进程部署下也不会丢失引用
+            await self.db.execute(
+                update(MaterialBlob)
+                .where(MaterialBlob.sha256 == sha256)
+                .values(ref_count=MaterialBlob.ref_count + 1)
+            )
+        return blob, created
+
+    async def release(self, sha256: str) -> Optional[Path]:
+        """减少一次引用；引用归零时删除记录并返回需要删除的文件（应在提交后删除）"""
+        ref_count = await self.db.scalar(
+            update(MaterialBlob)
+            .where(MaterialBlob.sha256 == sha256)
+            .values(ref_count=MaterialBlob.ref_count - 1)
+            .returning(MaterialBlob.ref_count)
+        )
+        if ref_count is None or ref_count > 0:
+            return None
+
+        blob = await self.get(sha256)
+        path = Path(blob.path)
+        await self.db.delete(blob)
+        return path
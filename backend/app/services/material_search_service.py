@@ -0,0 +1,367 @@
+"""
+培训资料全文搜索服务
+上传文档后在后台提取正文（按内容哈希保存到 material_texts），与标题、描述、类别一起写入
+SQLite FTS5 表 materials_fts（rowid 为资料 id），按 bm25 排名并返回命中片段。
+unicode61 分词器把连续的汉字当作一个词，因此索引和查询前在每个汉字两侧加空格，
+中文按单字切分后用短语查询匹配连续字符。资料增删改时在 flush 中同步索引；
+非 SQLite 数据库或未编译 FTS5 时退回 LIKE 查询
+"""
+
+import asyncio
+import html
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, event, inspect, or_, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.blob import MaterialBlob, MaterialText
+from app.models.training import TrainingMaterial
+from app.services.text_extraction import TEXT_EXTENSIONS, TextExtractionError, extract_text
+
+logger = logging.getLogger(__name__)
+
+MATERIALS_FTS_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS materials_fts USING fts5(
+    title, description, category, content,
+    tokenize='unicode61', prefix='1 2 3'
+)
+"""
+
+# 标题命中权重最高，其次描述、类别、正文（bm25 分数越小越相关）
+FTS_SEARCH_SQL = """
+SELECT m.id, m.title, m.description, m.category, m.type, m.file_url, m.duration_minutes,
+       snippet(materials_fts, -1, char(2), char(3), '…', 24) AS snippet,
+       bm25(materials_fts, 10.0, 4.0, 2.0, 1.0) AS rank
+FROM materials_fts
+JOIN training_materials m ON m.id = materials_fts.rowid
+WHERE materials_fts MATCH :match AND m.status = :status
+ORDER BY rank
+LIMIT :limit
+"""
+
+INDEX_FIELDS = ("title", "description", "category", "file_path")
+
+# 汉字、日文假名、韩文和全角标点
+_CJK_CLASS = (
+    "\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff"
+    "\uac00-\ud7af\uf900-\ufaff\uff00-\uffef"
+)
+_CJK = re.compile(f"([{_CJK_CLASS}])")
+# 前一个或后一个字符（跳过命中标记 \x02、\x03）是汉字的空格
+_SEGMENT_SPACE = re.compile(
+    f"(?:(?<=[{_CJK_CLASS}])|(?<=[{_CJK_CLASS}][\x02\x03])) | (?=[\x02\x03]?[{_CJK_CLASS}])"
+)
+_WHITESPACE = re.compile(r"\s+")
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# 本进程中 FTS5 表是否可用（启动时创建成功后置为 True）
+_fts_ready = False
+# 正在提取文本的后台任务（保留引用，避免任务被回收）
+_extraction_tasks: Set[asyncio.Task] = set()
+
+
+def segment_text(value: Optional[str]) -> str:
+    """在每个汉字（及日文假名、韩文）两侧加空格，使分词器按单字切分"""
+    if not value:
+        return ""
+    return _WHITESPACE.sub(" ", _CJK.sub(r" \1 ", value)).strip()
+
+
+def unsegment_text(value: str) -> str:
+    """去掉 segment_text 在汉字之间加入的空格"""
+    return _SEGMENT_SPACE.sub("", value)
+
+
+def build_match_query(keyword: str) -> str:
+    """将搜索词转换为 FTS5 查询：每个词（空格分隔）都需匹配，词内按短语匹配，最后一个字按前缀匹配"""
+    phrases = []
+    for word in keyword.split():
+        tokens = _TERM.findall(segment_text(word))
+        if tokens:
+            phrases.append(f'"{" ".join(tokens)}"*')
+    return " ".join(phrases)
+
+
+def format_snippet(snippet: Optional[str]) -> str:
+    """命中片段转为 HTML：转义原文，命中部分用 <mark> 标记"""
+    if not snippet:
+        return ""
+    escaped = html.escape(unsegment_text(snippet))
+    return escaped.replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def ensure_material_search_index(connection):
+    """创建 FTS5 资料搜索表（可重复执行），首次创建或行数不一致时重建；非 SQLite 数据库跳过"""
+    global _fts_ready
+    if connection.dialect.name != "sqlite":
+        return
+
+    try:
+        connection.execute(text(MATERIALS_FTS_DDL))
+    except OperationalError as e:
+        logger.warning(f"创建 FTS5 资料搜索表失败，资料搜索将使用 LIKE 查询: {e}")
+        return
+    _fts_ready = True
+
+    indexed = connection.execute(text("SELECT count(*) FROM materials_fts")).scalar()
+    materials = connection.execute(text("SELECT count(*) FROM training_materials")).scalar()
+    if indexed != materials:
+        connection.execute(text("DELETE FROM materials_fts"))
+        ids = connection.execute(text("SELECT id FROM training_materials")).scalars().all()
+        index_materials(connection, ids)
+        logger.info(f"已重建资料搜索索引 materials_fts: {len(ids)} 条资料")
+
+
+def index_materials(connection, material_ids: Iterable[int]):
+    """从数据库重新读取资料及其文件正文，写入 FTS 索引（已有的行先删除）"""
+    material_ids = list(material_ids)
+    for start in range(0, len(material_ids), 500):
+        batch = material_ids[start:start + 500]
+        connection.execute(
+            text("DELETE FROM materials_fts WHERE rowid IN (SELECT value FROM json_each(:ids))"),
+            {"ids": str(batch)}
+        )
+        rows = connection.execute(
+            select(
+                TrainingMaterial.id, TrainingMaterial.title, TrainingMaterial.description,
+                TrainingMaterial.category, MaterialText.content
+            ).outerjoin(
+                MaterialBlob, MaterialBlob.path == TrainingMaterial.file_path
+            ).outerjoin(
+                MaterialText, MaterialText.sha256 == MaterialBlob.sha256
+            ).where(TrainingMaterial.id.in_(batch))
+        ).all()
+        if rows:
+            connection.execute(
+                text(
+                    "INSERT INTO materials_fts(rowid, title, description, category, content) "
+                    "VALUES (:id, :title, :description, :category, :content)"
+                ),
+                [
+                    {
+                        "id": row[0],
+                        "title": segment_text(row[1]),
+                        "description": segment_text(row[2]),
+                        "category": segment_text(row[3]),
+                        "content": segment_text(row[4]),
+                    }
+                    for row in rows
+                ]
+            )
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_material_index(session: Session, flush_context):
+    """资料新增、删除或标题等字段修改时，在同一事务中更新搜索索引"""
+    if not _fts_ready:
+        return
+
+    changed = [
+        obj.id for obj in session.new if isinstance(obj, TrainingMaterial)
+    ] + [
+        obj.id for obj in session.dirty
+        if isinstance(obj, TrainingMaterial)
+        and any(inspect(obj).attrs[field].history.has_changes() for field in INDEX_FIELDS)
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, TrainingMaterial)]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    if deleted:
+        connection.execute(
+            text("DELETE FROM materials_fts WHERE rowid IN (SELECT value FROM json_each(:ids))"),
+            {"ids": str(deleted)}
+        )
+    if changed:
+        index_materials(connection, changed)
+
+
+def schedule_text_extraction(sha256: str, path: str):
+    """在后台提取文件正文（不阻塞上传响应），完成后更新引用该文件的资料的索引"""
+    if Path(path).suffix.lower() not in TEXT_EXTENSIONS:
+        return
+    task = asyncio.get_running_loop().create_task(_extract_and_index(sha256, path))
+    _extraction_tasks.add(task)
+    task.add_done_callback(_extraction_tasks.discard)
+
+
+async def wait_for_extractions():
+    """等待正在进行的文本提取完成"""
+    if _extraction_tasks:
+        await asyncio.gather(*list(_extraction_tasks), return_exceptions=True)
+
+
+async def _extract_and_index(sha256: str, path: str):
+    """提取文本、保存并重建相关资料的索引"""
+    error = None
+    try:
+        content = await run_in_threadpool(extract_text, Path(path), settings.MATERIAL_TEXT_MAX_CHARS)
+    except (TextExtractionError, OSError) as e:
+        content, error = None, str(e)[:2000]
+        logger.warning(f"资料文本提取失败: {path}: {e}")
+
+    try:
+        async with AsyncSessionLocal() as db:
+            # 提取期间文件已被删除
+            if await db.get(MaterialBlob, sha256) is None:
+                return
+            db.add(MaterialText(
+                sha256=sha256, content=content, char_count=len(content or ""), error_message=error
+            ))
+            try:
+                await db.flush()
+            except IntegrityError:
+                # 相同文件已由另一次上传提取
+                await db.rollback()
+                return
+            if _fts_ready and db.get_bind().dialect.name == "sqlite":
+                material_ids = (await db.scalars(
+                    select(TrainingMaterial.id).where(TrainingMaterial.file_path == path)
+                )).all()
+                await db.run_sync(lambda session: index_materials(session.connection(), material_ids))
+            await db.commit()
+    except Exception:
+        logger.exception(f"保存资料文本失败: {path}")
+
+
+def _escape_like(keyword: str) -> str:
+    """转义 LIKE 通配符"""
+    return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _plain_snippet(value: Optional[str], keyword: str, width: int = 40) -> str:
+    """LIKE 查询时在 Python 中截取命中片段"""
+    if not value:
+        return ""
+    position = value.lower().find(keyword.lower())
+    if position < 0:
+        return ""
+    start = max(position - width, 0)
+    end = min(position + len(keyword) + width, len(value))
+    return (
+        ("…" if start > 0 else "")
+        + html.escape(value[start:position])
+        + "<mark>" + html.escape(value[position:position + len(keyword)]) + "</mark>"
+        + html.escape(value[position + len(keyword):end])
+        + ("…" if end < len(value) else "")
+    )
+
+
+class MaterialSearchService:
+    """资料搜索服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(self, keyword: str, limit: int = 20, status: str = "published") -> List[Dict[str, Any]]:
+        """按标题、描述、类别和文件正文搜索资料，按相关度排序并返回命中片段"""
+        keyword = keyword.strip()
+        if not keyword:
+            return []
+
+        if _fts_ready and self.db.get_bind().dialect.name == "sqlite":
+            match = build_match_query(keyword)
+            if not match:
+                return []
+            try:
+                return await self._search_fts(match, limit, status)
+            except OperationalError as e:
+                logger.warning(f"FTS5 资料搜索失败，改用 LIKE 查询: {e}")
+
+        return await self._search_like(keyword, limit, status)
+
+    async def _search_fts(self, match: str, limit: int, status: str) -> List[Dict[str, Any]]:
+        """FTS5 查询，bm25 排名"""
+        result = await self.db.execute(
+            text(FTS_SEARCH_SQL), {"match": match, "status": status, "limit": limit}
+        )
+        return [
+            {
+                "id": row.id,
+                "title": row.title,
+                "description": row.description or "",
+                "category": row.category,
+                # text() 查询返回的是枚举名称
+                "type": row.type.lower() if row.type else "document",
+                "file_url": row.file_url,
+                "duration_minutes": row.duration_minutes or 0,
+                "snippet": format_snippet(row.snippet),
+                "score": round(-row.rank, 4),
+            }
+            for row in result.all()
+        ]
+
+    async def _search_like(self, keyword: str, limit: int, status: str) -> List[Dict[str, Any]]:
+        """LIKE 子串匹配（无全文索引时的兜底方案），标题命中优先"""
+        pattern = f"%{_escape_like(keyword)}%"
+        result = await self.db.execute(
+            select(TrainingMaterial, MaterialText.content).outerjoin(
+                MaterialBlob, MaterialBlob.path == TrainingMaterial.file_path
+            ).outerjoin(
+                MaterialText, MaterialText.sha256 == MaterialBlob.sha256
+            ).where(
+                TrainingMaterial.status == status,
+                or_(
+                    TrainingMaterial.title.ilike(pattern, escape="\\"),
+                    TrainingMaterial.description.ilike(pattern, escape="\\"),
+                    TrainingMaterial.category.ilike(pattern, escape="\\"),
+                    MaterialText.content.ilike(pattern, escape="\\"),
+                )
+            ).order_by(
+                TrainingMaterial.title.ilike(pattern, escape="\\").desc(), TrainingMaterial.id.desc()
+            ).limit(limit)
+        )
+        items = []
+        for material, content in result.all():
+            snippet = next(
+                (
+                    snippet for snippet in (
+                        _plain_snippet(value, keyword)
+                        for value in (material.title, material.description, content)
+                    ) if snippet
+                ),
+                ""
+            )
+            items.append({
+                "id": material.id,
+                "title": material.title,
+                "description": material.description or "",
+                "category": material.category,
+                "type": material.type.value if material.type else "document",
+                "file_url": material.file_url,
+                "duration_minutes": material.duration_minutes or 0,
+                "snippet": snippet,
+                "score": None,
+            })
+        return items
+
+    async def backfill_texts(self) -> int:
+        """为尚未提取正文的文档排队提取（启动时调用），返回排队数量"""
+        rows = (await self.db.execute(
+            select(MaterialBlob.sha256, MaterialBlob.path).outerjoin(
+                MaterialText, MaterialText.sha256 == MaterialBlob.sha256
+            ).where(MaterialText.sha256.is_(None))
+        )).all()
+        scheduled = 0
+        for sha256, path in rows:
+            if Path(path).suffix.lower() in TEXT_EXTENSIONS:
+                schedule_text_extraction(sha256, path)
+                scheduled += 1
+        if scheduled:
+            logger.info(f"排队提取资料正文: {scheduled} 个文件")
+        return scheduled
+
+    async def discard(self, sha256: str):
+        """文件被删除时删除提取的文本（不提交）"""
+        await self.db.execute(delete(MaterialText).where(MaterialText.sha256 == sha256))
@@ -0,0 +1,314 @@
+"""
+音视频资料后台处理队列
+上传音视频资料后按文件内容哈希登记任务，在进程池中探测时长和媒体信息、截取封面，
+并可选生成 HLS 分段；结果保存到 media_assets，时长回写到引用该文件的资料。
+任务状态保存在数据库中，重启后未完成的任务重新排队；相同文件只处理一次
+"""
+
+import asyncio
+import json
+import logging
+import math
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.blob import MaterialBlob, MediaAsset
+from app.models.training import TrainingMaterial
+from app.services.media_transcoders import run_media_job
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+READY = "ready"
+FAILED = "failed"
+
+MEDIA_KINDS = {
+    ".mp4": "video",
+    ".avi": "video",
+    ".mov": "video",
+    ".wmv": "video",
+    ".mp3": "audio",
+}
+
+MEDIA_OUTPUT_DIR = Path(settings.UPLOAD_DIR) / "media"
+
+
+def media_kind(file_path: Optional[str]) -> Optional[str]:
+    """按扩展名判断是否为音视频文件"""
+    if not file_path:
+        return None
+    return MEDIA_KINDS.get(Path(file_path).suffix.lower())
+
+
+def duration_minutes(duration_seconds: Optional[float]) -> Optional[int]:
+    """时长转换为分钟（向上取整，不足1分钟按1分钟）"""
+    if not duration_seconds:
+        return None
+    return max(1, math.ceil(duration_seconds / 60))
+
+
+def media_output_dir(sha256: str) -> Path:
+    """处理结果目录"""
+    return MEDIA_OUTPUT_DIR / sha256
+
+
+def _output_url(sha256: str, relative: Optional[str]) -> Optional[str]:
+    """处理结果文件的访问URL"""
+    return f"/uploads/media/{sha256}/{relative}" if relative else None
+
+
+def asset_response(asset: Optional[MediaAsset]) -> Dict[str, Any]:
+    """处理结果响应"""
+    if asset is None:
+        return {"status": None}
+    return {
+        "status": asset.status,
+        "duration_seconds": asset.duration_seconds,
+        "metadata": json.loads(asset.media_metadata) if asset.media_metadata else None,
+        "poster_url": asset.poster_url,
+        "hls_url": asset.hls_url,
+        "error": asset.error_message,
+        "attempts": asset.attempts,
+        "processed_at": asset.processed_at.isoformat() if asset.processed_at else None,
+    }
+
+
+class MediaProcessingQueue:
+    """进程内任务队列：协程从队列取任务，转码在进程池中执行，不阻塞事件循环"""
+
+    def __init__(
+        self,
+        workers: int,
+        transcoder: str,
+        make_hls: bool = False,
+        segment_seconds: int = 6,
+        timeout_seconds: int = 1800
+    ):
+        self.workers = workers
+        self.transcoder = transcoder
+        self.make_hls = make_hls
+        self.segment_seconds = segment_seconds
+        self.timeout_seconds = timeout_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # 统计信息
+        self._processed = 0
+        self._failed = 0
+
+    async def start(self):
+        """启动工作协程并重新排队未完成的任务"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        async with AsyncSessionLocal() as db:
+            unfinished = (await db.scalars(
+                select(MediaAsset.sha256).where(MediaAsset.status.in_((PENDING, PROCESSING)))
+            )).all()
+        for sha256 in unfinished:
+            self.submit(sha256)
+        if unfinished:
+            logger.info(f"重新排队未完成的媒体处理任务: {len(unfinished)} 个")
+
+    async def stop(self):
+        """停止工作协程并关闭进程池（处理中的任务保留为 processing，下次启动重新处理）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, sha256: str) -> bool:
+        """加入队列；队列未启动时返回 False（任务保持 pending，启动时再处理）"""
+        if self._queue is None:
+            return False
+        if sha256 not in self._queued:
+            self._queued.add(sha256)
+            self._queue.put_nowait(sha256)
+        return True
+
+    async def join(self):
+        """等待队列中的任务全部处理完"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取队列统计信息"""
+        return {
+            "running": bool(self._tasks),
+            "workers": self.workers,
+            "transcoder": self.transcoder,
+            "queued": len(self._queued),
+            "processed": self._processed,
+            "failed": self._failed,
+        }
+
+    async def _worker(self):
+        while True:
+            sha256 = await self._queue.get()
+            try:
+                await self._process(sha256)
+            except Exception:
+                logger.exception(f"媒体处理任务异常: {sha256}")
+            finally:
+                self._queued.discard(sha256)
+                self._queue.task_done()
+
+    async def _process(self, sha256: str):
+        """处理一个文件并保存结果"""
+        async with AsyncSessionLocal() as db:
+            asset = await db.get(MediaAsset, sha256)
+            if asset is None or asset.status not in (PENDING, PROCESSING):
+                return
+            blob = await db.get(MaterialBlob, sha256)
+            if blob is None:
+                await db.delete(asset)
+                await db.commit()
+                return
+            asset.status = PROCESSING
+            asset.attempts += 1
+            source = blob.path
+            await db.commit()
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._executor, run_media_job,
+                self.transcoder, source, str(media_output_dir(sha256)),
+                self.make_hls and media_kind(source) == "video",
+                self.segment_seconds, self.timeout_seconds
+            )
+        except Exception as e:
+            self._failed += 1
+            logger.warning(f"媒体处理失败: {source}: {e}")
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(MediaAsset).where(MediaAsset.sha256 == sha256).values(
+                        status=FAILED, error_message=str(e)[:2000], processed_at=func.now()
+                    )
+                )
+                await db.commit()
+            return
+
+        async with AsyncSessionLocal() as db:
+            # 处理期间文件已被删除（最后一条资料被删除）
+            if await db.get(MaterialBlob, sha256) is None:
+                await db.execute(delete(MediaAsset).where(MediaAsset.sha256 == sha256))
+                await db.commit()
+                shutil.rmtree(media_output_dir(sha256), ignore_errors=True)
+                return
+
+            await db.execute(
+                update(MediaAsset).where(MediaAsset.sha256 == sha256).values(
+                    status=READY,
+                    duration_seconds=result["duration_seconds"],
+                    media_metadata=json.dumps(result["metadata"], ensure_ascii=False),
+                    poster_url=_output_url(sha256, result["poster"]),
+                    hls_url=_output_url(sha256, result["hls"]),
+                    error_message=None,
+                    processed_at=func.now()
+                )
+            )
+            minutes = duration_minutes(result["duration_seconds"])
+            if minutes:
+                await db.execute(
+                    update(TrainingMaterial).where(TrainingMaterial.file_path == source).values(
+                        duration_minutes=minutes
+                    )
+                )
+            await db.commit()
+        self._processed += 1
+        logger.info(f"媒体处理完成: {source} 时长 {result['duration_seconds']:.1f} 秒")
+
+
+class MediaProcessingService:
+    """资料媒体处理服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _sha256_of(self, material: TrainingMaterial) -> Optional[str]:
+        """资料文件的内容哈希（内容寻址之前上传的文件没有哈希，不处理）"""
+        if not media_kind(material.file_path):
+            return None
+        return await self.db.scalar(
+            select(MaterialBlob.sha256).where(MaterialBlob.path == material.file_path)
+        )
+
+    async def get(self, material: TrainingMaterial) -> Optional[MediaAsset]:
+        """查询资料文件的处理结果"""
+        sha256 = await self._sha256_of(material)
+        return await self.db.get(MediaAsset, sha256) if sha256 else None
+
+    async def schedule(self, material: TrainingMaterial) -> Optional[MediaAsset]:
+        """为音视频资料登记处理任务；相同文件已处理完成时直接回写时长"""
+        if not settings.MEDIA_PROCESSING_ENABLED:
+            return None
+        sha256 = await self._sha256_of(material)
+        if sha256 is None:
+            return None
+
+        asset = await self.db.get(MediaAsset, sha256)
+        if asset is None:
+            self.db.add(MediaAsset(sha256=sha256, status=PENDING, attempts=0))
+            try:
+                await self.db.commit()
+            except IntegrityError:
+                # 同一文件的另一次上传已登记
+                await self.db.rollback()
+            asset = await self.db.get(MediaAsset, sha256)
+        elif asset.status == READY and material.duration_minutes is None:
+            material.duration_minutes = duration_minutes(asset.duration_seconds)
+            await self.db.commit()
+            await self.db.refresh(material)
+
+        if asset.status == PENDING:
+            media_queue.submit(sha256)
+        return asset
+
+    async def reprocess(self, material: TrainingMaterial) -> Optional[MediaAsset]:
+        """重新处理资料文件（如失败后或启用 HLS 之后）"""
+        sha256 = await self._sha256_of(material)
+        if sha256 is None:
+            return None
+        asset = await self.db.get(MediaAsset, sha256)
+        if asset is None:
+            return await self.schedule(material)
+        if asset.status != PROCESSING:
+            asset.status = PENDING
+            asset.error_message = None
+            await self.db.commit()
+            media_queue.submit(sha256)
+        return asset
+
+    async def discard(self, sha256: str) -> Path:
+        """文件被删除时删除处理记录（不提交），返回需在提交后删除的结果目录"""
+        await self.db.execute(delete(MediaAsset).where(MediaAsset.sha256 == sha256))
+        return media_output_dir(sha256)
+
+
+media_queue = MediaProcessingQueue(
+    workers=settings.MEDIA_PROCESSING_WORKERS,
+    transcoder=settings.MEDIA_TRANSCODER,
+    make_hls=settings.MEDIA_HLS_ENABLED,
+    segment_seconds=settings.MEDIA_HLS_SEGMENT_SECONDS,
+    timeout_seconds=settings.MEDIA_PROCESSING_TIMEOUT_SECONDS
+)
@@ -0,0 +1,213 @@
+"""
+媒体转码后端
+Transcoder 定义探测时长/元数据、截取封面和生成 HLS 分段三个操作；
+内置 ffmpeg 实现和用于测试的 stub 实现，也可通过 “模块路径:类名” 接入其他实现。
+run_media_job 在进程池的子进程中执行，参数和返回值都必须可序列化
+"""
+
+import importlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+POSTER_NAME = "poster.jpg"
+HLS_DIR_NAME = "hls"
+HLS_PLAYLIST_NAME = "index.m3u8"
+
+
+class TranscoderError(Exception):
+    """转码失败"""
+
+
+class Transcoder:
+    """转码后端基类"""
+
+    name = "base"
+
+    def __init__(self, timeout_seconds: int = 1800):
+        self.timeout_seconds = timeout_seconds
+
+    def available(self) -> Optional[str]:
+        """检查运行环境，不可用时返回原因"""
+        return None
+
+    def probe(self, source: Path) -> Dict[str, Any]:
+        """读取时长和媒体信息，结果须包含 duration_seconds"""
+        raise NotImplementedError
+
+    def poster(self, source: Path, output: Path, at_seconds: float):
+        """截取一帧作为封面"""
+        raise NotImplementedError
+
+    def hls(self, source: Path, output_dir: Path, segment_seconds: int) -> Path:
+        """生成 HLS 分段，返回播放列表路径"""
+        raise NotImplementedError
+
+
+class FFmpegTranscoder(Transcoder):
+    """调用 ffprobe / ffmpeg 命令行"""
+
+    name = "ffmpeg"
+
+    def available(self) -> Optional[str]:
+        missing = [command for command in ("ffmpeg", "ffprobe") if shutil.which(command) is None]
+        return f"未安装 {', '.join(missing)}" if missing else None
+
+    def _run(self, args) -> str:
+        try:
+            completed = subprocess.run(
+                args, capture_output=True, text=True, timeout=self.timeout_seconds, check=False
+            )
+        except subprocess.TimeoutExpired:
+            raise TranscoderError(f"{args[0]} 执行超时（{self.timeout_seconds} 秒）")
+        if completed.returncode != 0:
+            raise TranscoderError(f"{args[0]} 执行失败: {completed.stderr.strip()[-500:]}")
+        return completed.stdout
+
+    def probe(self, source: Path) -> Dict[str, Any]:
+        output = self._run([
+            "ffprobe", "-v", "error", "-print_format", "json",
+            "-show_format", "-show_streams", str(source)
+        ])
+        info = json.loads(output or "{}")
+        media_format = info.get("format", {})
+        streams = info.get("streams", [])
+        video = next((stream for stream in streams if stream.get("codec_type") == "video"), None)
+        audio = next((stream for stream in streams if stream.get("codec_type") == "audio"), None)
+
+        try:
+            duration = float(media_format.get("duration") or 0)
+        except ValueError:
+            duration = 0.0
+        metadata = {
+            "duration_seconds": duration,
+            "format": media_format.get("format_name"),
+            "bit_rate": int(media_format["bit_rate"]) if media_format.get("bit_rate", "").isdigit() else None,
+        }
+        if video:
+            metadata.update(
+                video_codec=video.get("codec_name"),
+                width=video.get("width"),
+                height=video.get("height"),
+            )
+        if audio:
+            metadata.update(
+                audio_codec=audio.get("codec_name"),
+                sample_rate=int(audio["sample_rate"]) if str(audio.get("sample_rate", "")).isdigit() else None,
+                channels=audio.get("channels"),
+            )
+        metadata["has_video"] = video is not None
+        return metadata
+
+    def poster(self, source: Path, output: Path, at_seconds: float):
+        self._run([
+            "ffmpeg", "-v", "error", "-y", "-ss", f"{at_seconds:.2f}", "-i", str(source),
+            "-frames:v", "1", "-vf", "scale='min(1280,iw)':-2", "-q:v", "3", str(output)
+        ])
+
+    def hls(self, source: Path, output_dir: Path, segment_seconds: int) -> Path:
+        """转码为 H.264/AAC（最高 720p）并切分为 HLS 分段"""
+        playlist = output_dir / HLS_PLAYLIST_NAME
+        self._run([
+            "ffmpeg", "-v", "error", "-y", "-i", str(source),
+            "-vf", "scale=-2:'min(720,ih)'",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", "128k",
+            "-f", "hls", "-hls_time", str(segment_seconds), "-hls_playlist_type", "vod",
+            "-hls_segment_filename", str(output_dir / "segment_%04d.ts"), str(playlist)
+        ])
+        return playlist
+
+
+class StubTranscoder(Transcoder):
+    """测试用转码后端：不调用外部命令，写入占位文件并返回固定时长"""
+
+    name = "stub"
+    duration_seconds = 90.0
+
+    def probe(self, source: Path) -> Dict[str, Any]:
+        return {
+            "duration_seconds": self.duration_seconds,
+            "format": "stub",
+            "size": source.stat().st_size,
+            "has_video": source.suffix.lower() in (".mp4", ".avi", ".mov", ".wmv"),
+        }
+
+    def poster(self, source: Path, output: Path, at_seconds: float):
+        output.write_bytes(b"stub poster")
+
+    def hls(self, source: Path, output_dir: Path, segment_seconds: int) -> Path:
+        playlist = output_dir / HLS_PLAYLIST_NAME
+        shutil.copyfile(source, output_dir / "segment_0000.ts")
+        playlist.write_text(
+            "#EXTM3U\n#EXT-X-VERSION:3\n"
+            f"#EXT-X-TARGETDURATION:{segment_seconds}\n#EXT-X-PLAYLIST-TYPE:VOD\n"
+            f"#EXTINF:{self.duration_seconds:.3f},\nsegment_0000.ts\n#EXT-X-ENDLIST\n"
+        )
+        return playlist
+
+
+TRANSCODERS = {
+    FFmpegTranscoder.name: FFmpegTranscoder,
+    StubTranscoder.name: StubTranscoder,
+}
+
+
+def get_transcoder(spec: str, timeout_seconds: int = 1800) -> Transcoder:
+    """按名称（ffmpeg、stub）或 “模块路径:类名” 创建转码后端"""
+    if spec in TRANSCODERS:
+        return TRANSCODERS[spec](timeout_seconds)
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"无效的转码后端: {spec}")
+    transcoder_class = getattr(importlib.import_module(module_name), class_name)
+    return transcoder_class(timeout_seconds)
+
+
+def run_media_job(
+    transcoder_spec: str,
+    source: str,
+    output_dir: str,
+    make_hls: bool,
+    segment_seconds: int,
+    timeout_seconds: int
+) -> Dict[str, Any]:
+    """处理一个媒体文件（在子进程中执行）
+
+    输出先写入临时目录，全部成功后替换 output_dir，避免客户端读到不完整的播放列表；
+    返回时长、元数据以及封面、播放列表相对 output_dir 的路径
+    """
+    transcoder = get_transcoder(transcoder_spec, timeout_seconds)
+    reason = transcoder.available()
+    if reason:
+        raise TranscoderError(reason)
+
+    source_path = Path(source)
+    final_dir = Path(output_dir)
+    work_dir = final_dir.with_name(f".{final_dir.name}.{os.getpid()}")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+
+    try:
+        metadata = transcoder.probe(source_path)
+        duration = float(metadata.get("duration_seconds") or 0)
+        result = {"duration_seconds": duration, "metadata": metadata, "poster": None, "hls": None}
+
+        if metadata.get("has_video"):
+            transcoder.poster(source_path, work_dir / POSTER_NAME, min(1.0, duration / 10))
+            result["poster"] = POSTER_NAME
+            if make_hls:
+                hls_dir = work_dir / HLS_DIR_NAME
+                hls_dir.mkdir()
+                playlist = transcoder.hls(source_path, hls_dir, segment_seconds)
+                result["hls"] = playlist.relative_to(work_dir).as_posix()
+
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(work_dir, final_dir)
+        return result
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
@@ -0,0 +1,116 @@
+"""
+参考数据服务
+为教师端和管理端提供练习模式、课程主题、评估重点的读穿缓存，
+管理端写操作提交后调用 invalidate_reference_data 使缓存失效
+"""
+
+import logging
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.reference_cache import ReferenceDataCache
+from app.models.training import PracticeMode, CourseTopic, EvaluationFocus
+
+logger = logging.getLogger(__name__)
+
+# 缓存键
+PRACTICE_MODES = "practice_modes"
+COURSE_TOPICS = "course_topics"
+EVALUATION_FOCUS = "evaluation_focus"
+MANAGER_COURSE_TOPICS = "manager_course_topics"
+
+# 数据库中没有课程主题时管理端显示的默认主题
+DEFAULT_COURSE_TOPICS = [
+    "数学基础概念",
+    "语文阅读理解",
+    "英语口语交流",
+    "科学实验探索",
+    "历史文化传承"
+]
+
+reference_cache = ReferenceDataCache(ttl_seconds=settings.REFERENCE_CACHE_TTL_SECONDS)
+
+
+def invalidate_reference_data(*keys: str):
+    """使参考数据缓存失效（不指定键时失效全部）"""
+    reference_cache.invalidate(*keys)
+
+
+class ReferenceDataService:
+    """参考数据服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._loaders = {
+            PRACTICE_MODES: self._load_practice_modes,
+            COURSE_TOPICS: self._load_course_topics,
+            EVALUATION_FOCUS: self._load_evaluation_focus,
+            MANAGER_COURSE_TOPICS: self._load_manager_course_topics,
+        }
+
+    async def get(self, key: str) -> Tuple[bytes, str]:
+        """读取预序列化的响应体和 ETag，未命中时从数据库加载"""
+        cached = reference_cache.get(key)
+        if cached is not None:
+            return cached
+
+        version = reference_cache.version
+        data = await self._loaders[key]()
+        return reference_cache.set(key, data, version)
+
+    async def prewarm(self):
+        """预热全部参考数据"""
+        for key in self._loaders:
+            await self.get(key)
+        logger.info(f"参考数据缓存预热完成: {len(self._loaders)} 项")
+
+    async def _load_practice_modes(self) -> List[Dict[str, Any]]:
+        """加载启用的练习模式"""
+        result = await self.db.execute(
+            select(PracticeMode).where(
+                PracticeMode.is_active == True
+            ).order_by(PracticeMode.order_index)
+        )
+        return [
+            {
+                "id": mode.id,
+                "name": mode.name,
+                "description": mode.description or "",
+                "duration_minutes": mode.duration_minutes,
+                "difficulty_level": mode.difficulty_level,
+            }
+            for mode in result.scalars().all()
+        ]
+
+    async def _load_course_topics(self) -> List[Dict[str, Any]]:
+        """加载课程主题（教师端）"""
+        result = await self.db.execute(select(CourseTopic))
+        return [{"id": topic.id, "name": topic.name} for topic in result.scalars().all()]
+
+    async def _load_evaluation_focus(self) -> List[Dict[str, Any]]:
+        """加载启用的评估重点"""
+        result = await self.db.execute(
+            select(EvaluationFocus).where(
+                EvaluationFocus.is_active == True
+            ).order_by(EvaluationFocus.order_index)
+        )
+        return [
+            {
+                "id": item.id,
+                "name": item.name,
+                "description": item.description or "",
+                "category": item.category or "",
+                "weight": item.weight,
+                "criteria": item.criteria,
+            }
+            for item in result.scalars().all()
+        ]
+
+    async def _load_manager_course_topics(self) -> List[str]:
+        """加载课程主题名称（管理端），没有主题时返回默认主题"""
+        result = await self.db.execute(select(CourseTopic.name).order_by(CourseTopic.created_at, CourseTopic.id))
+        names = list(result.scalars().all())
+        return names or DEFAULT_COURSE_TOPICS
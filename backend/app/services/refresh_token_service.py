@@ -0,0 +1,147 @@
+"""
+刷新令牌服务
+签发、轮换和吊销刷新令牌；数据库只保存令牌的 SHA-256 摘要，
+已轮换的令牌再次出现时吊销整个令牌家族（重放检测）
+"""
+
+import asyncio
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.refresh_token import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+def hash_refresh_token(token: str) -> str:
+    """计算刷新令牌摘要"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class RefreshTokenService:
+    """刷新令牌服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def issue(self, realm: str, subject: str, family_id: Optional[str] = None) -> str:
+        """签发新的刷新令牌，未指定家族时开启新家族"""
+        token = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+
+        self.db.add(RefreshToken(
+            token_hash=hash_refresh_token(token),
+            family_id=family_id or uuid.uuid4().hex,
+            realm=realm,
+            subject=subject,
+            expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            revoked=False
+        ))
+        await self.db.commit()
+
+        return token
+
+    async def rotate(self, realm: str, token: str) -> Tuple[str, str]:
+        """使用刷新令牌换取新令牌，返回 (subject, 新刷新令牌)"""
+        invalid_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="刷新令牌无效或已过期",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+        record = await self._get_record(realm, token)
+        if record is None:
+            raise invalid_exception
+
+        if record.revoked or record.used_at is not None:
+            # 已使用过的令牌再次出现，说明令牌可能泄露，吊销整个家族
+            await self.revoke_family(record.family_id)
+            raise invalid_exception
+
+        now = datetime.utcnow()
+        if record.expires_at.replace(tzinfo=None) <= now:
+            raise invalid_exception
+
+        # 条件更新保证并发请求中只有一个能完成轮换
+        result = await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == record.id, RefreshToken.used_at.is_(None))
+            .values(used_at=now)
+        )
+        if result.rowcount == 0:
+            await self.db.rollback()
+            await self.revoke_family(record.family_id)
+            raise invalid_exception
+
+        new_token = await self.issue(realm, record.subject, family_id=record.family_id)
+        return record.subject, new_token
+
+    async def revoke(self, realm: str, token: str):
+        """吊销刷新令牌所在的家族（用于登出）"""
+        record = await self._get_record(realm, token)
+        if record is not None:
+            await self.revoke_family(record.family_id)
+
+    async def revoke_family(self, family_id: str):
+        """吊销整个令牌家族"""
+        await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id)
+            .values(revoked=True)
+        )
+        await self.db.commit()
+
+    async def revoke_user(self, realm: str, subject: str) -> int:
+        """吊销用户的全部刷新令牌家族（用于重置密码），与会话中未提交的修改一起提交"""
+        result = await self.db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.realm == realm,
+                RefreshToken.subject == subject,
+                RefreshToken.revoked.is_(False)
+            )
+            .values(revoked=True)
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    async def purge_expired(self) -> int:
+        """清理已过期的刷新令牌记录"""
+        result = await self.db.execute(
+            delete(RefreshToken).where(RefreshToken.expires_at <= datetime.utcnow())
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    async def _get_record(self, realm: str, token: str) -> Optional[RefreshToken]:
+        """根据令牌查找记录"""
+        result = await self.db.execute(
+            select(RefreshToken).where(
+                RefreshToken.token_hash == hash_refresh_token(token),
+                RefreshToken.realm == realm
+            )
+        )
+        return result.scalars().first()
+
+
+async def purge_expired_periodically(interval_seconds: float):
+    """定期清理过期的刷新令牌记录（启动时执行一次，之后按间隔执行）"""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                purged = await RefreshTokenService(db).purge_expired()
+            if purged:
+                logger.info(f"已清理过期刷新令牌: {purged} 条")
+        except Exception as e:
+            logger.error(f"清理过期刷新令牌失败: {e}")
+        await asyncio.sleep(interval_seconds)
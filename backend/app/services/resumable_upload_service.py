@@ -0,0 +1,202 @@
+"""
+断点续传上传服务（参照 tus 协议）
+创建上传后客户端按偏移量分块 PATCH 追加数据，中断后通过 HEAD 查询已接收的字节数，
+只需续传剩余部分；未完成的上传保存在磁盘（数据文件 + 元数据 JSON），过期后自动清理
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict
+
+import aiofiles
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.core.uploads import ensure_disk_space, format_size_limit, upload_semaphore
+
+logger = logging.getLogger(__name__)
+
+TUS_VERSION = "1.0.0"
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _not_found():
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="上传不存在或已过期"
+    )
+
+
+class ResumableUploadStore:
+    """未完成上传的磁盘存储"""
+
+    def __init__(self, directory: Path, expire_seconds: int):
+        self.directory = directory
+        self.expire_seconds = expire_seconds
+        # 同一上传的 PATCH 串行执行
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _data_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def _info_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def _write_info(self, info: Dict[str, Any]):
+        """原子写入元数据"""
+        path = self._info_path(info["id"])
+        temp_path = path.with_suffix(".json.tmp")
+        temp_path.write_text(json.dumps(info, ensure_ascii=False), encoding="utf-8")
+        os.replace(temp_path, path)
+
+    def create(self, length: int, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """创建上传，返回上传信息"""
+        if length <= 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload-Length 无效")
+        if length > settings.MATERIAL_MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"文件大小不能超过 {format_size_limit(settings.MATERIAL_MAX_UPLOAD_SIZE)}"
+            )
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.purge_expired()
+        ensure_disk_space(self.directory, length)
+
+        now = time.time()
+        info = {
+            "id": uuid.uuid4().hex,
+            "length": length,
+            "metadata": metadata,
+            "created_at": now,
+            "expires_at": now + self.expire_seconds,
+        }
+        self._write_info(info)
+        self._data_path(info["id"]).touch()
+        return {**info, "offset": 0}
+
+    def get(self, upload_id: str) -> Dict[str, Any]:
+        """读取上传信息（offset 为磁盘上已接收的字节数），不存在或已过期时返回404"""
+        if not _UPLOAD_ID.match(upload_id):
+            raise _not_found()
+        try:
+            info = json.loads(self._info_path(upload_id).read_text(encoding="utf-8"))
+            offset = self._data_path(upload_id).stat().st_size
+        except (OSError, ValueError):
+            raise _not_found()
+        if info["expires_at"] <= time.time():
+            self.delete(upload_id)
+            raise _not_found()
+        return {**info, "offset": offset}
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """从 offset 处追加数据；偏移量与已接收字节数不一致时返回409，超出声明长度时返回413"""
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        async with lock, upload_semaphore:
+            info = self.get(upload_id)
+            if offset != info["offset"]:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Upload-Offset 不匹配，服务器已接收 {info['offset']} 字节"
+                )
+
+            received = offset
+            data_path = self._data_path(upload_id)
+            async with aiofiles.open(data_path, "ab") as output:
+                try:
+                    async for chunk in chunks:
+                        if received + len(chunk) > info["length"]:
+                            await output.truncate(offset)
+                            raise HTTPException(
+                                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail="上传数据超出 Upload-Length"
+                            )
+                        await output.write(chunk)
+                        received += len(chunk)
+                except ClientDisconnect:
+                    # 连接中断时保留已写入的数据，客户端通过 HEAD 查询偏移量后继续
+                    logger.info(f"断点续传连接中断: {upload_id} 已接收 {received} 字节")
+
+            # 每次续传都顺延过期时间
+            info["expires_at"] = time.time() + self.expire_seconds
+            self._write_info({key: value for key, value in info.items() if key != "offset"})
+            return {**info, "offset": received}
+
+    async def complete(self, upload_id: str, destination: Path) -> Dict[str, Any]:
+        """上传完成后计算 SHA-256 并移动到目标位置，返回上传信息（含 sha256）"""
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            info = self.get(upload_id)
+            if info["offset"] != info["length"]:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"上传尚未完成：已接收 {info['offset']} / {info['length']} 字节"
+                )
+
+            data_path = self._data_path(upload_id)
+            sha256 = await run_in_threadpool(_file_sha256, data_path)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(data_path, destination)
+            self.delete(upload_id)
+            return {**info, "sha256": sha256}
+
+    def delete(self, upload_id: str):
+        """删除上传的数据和元数据"""
+        for path in (self._data_path(upload_id), self._info_path(upload_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self._locks.pop(upload_id, None)
+
+    def purge_expired(self) -> int:
+        """清理过期的上传，返回清理数量"""
+        if not self.directory.exists():
+            return 0
+
+        now = time.time()
+        purged = 0
+        for info_path in self.directory.glob("*.json"):
+            upload_id = info_path.stem
+            try:
+                expires_at = json.loads(info_path.read_text(encoding="utf-8"))["expires_at"]
+            except (OSError, ValueError, KeyError):
+                expires_at = 0
+            if expires_at <= now and not (upload_id in self._locks and self._locks[upload_id].locked()):
+                self.delete(upload_id)
+                purged += 1
+
+        # 没有元数据的残留数据文件
+        for data_path in self.directory.glob("*.part"):
+            if not self._info_path(data_path.stem).exists():
+                data_path.unlink(missing_ok=True)
+
+        if purged:
+            logger.info(f"已清理过期的断点续传上传: {purged} 个")
+        return purged
+
+
+def _file_sha256(path: Path) -> str:
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(settings.UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 未完成的上传不放在 uploads 目录下，避免通过静态文件路由被访问
+resumable_uploads = ResumableUploadStore(
+    Path(settings.RESUMABLE_UPLOAD_DIR),
+    settings.RESUMABLE_UPLOAD_EXPIRE_HOURS * 3600
+)
@@ -1,7 +1,8 @@
 from typing import List, Optional, Dict, Any
+from fastapi import HTTPException
 from supabase import Client
 from app.core.supabase import get_supabase_client, get_supabase_admin_client, Tables, UserRoles
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,7 +27,7 @@ class SupabaseUserService:
                 raise ValueError("邮箱已存在")
             
             # 创建用户
-            hashed_password = get_password_hash(password)
+            hashed_password = await get_password_hash_async(password)
             user_data = {
                 "email": email,
                 "name": name,
@@ -52,6 +53,24 @@ class SupabaseUserService:
             logger.error(f"创建用户失败: {e}")
             raise
     
+    async def bulk_create_users(self, users: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量创建用户（密码需已哈希），单次请求写入整个批次"""
+        try:
+            if not users:
+                return []
+            
+            result = self.client.table(Tables.USERS).insert(users).execute()
+            
+            created = result.data or []
+            for user in created:
+                user.pop("hashed_password", None)
+            logger.info(f"批量创建用户成功: {len(created)} 个")
+            return created
+            
+        except Exception as e:
+            logger.error(f"批量创建用户失败: {e}")
+            return []
+    
     async def authenticate_user(self, email: str, password: str) -> Optional[Dict[str, Any]]:
         """用户认证"""
         try:
@@ -64,7 +83,7 @@ class SupabaseUserService:
             user = result.data[0]
             
             # 验证密码
-            if not verify_password(password, user["hashed_password"]):
+            if not await verify_password_async(password, user["hashed_password"]):
                 return None
             
             # 移除敏感信息
@@ -72,6 +91,8 @@ class SupabaseUserService:
             logger.info(f"用户认证成功: {email}")
             return user
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"用户认证失败: {e}")
             return None
@@ -184,8 +205,31 @@ class SupabaseUserService:
             logger.error(f"停用用户失败: {e}")
             return False
     
+    async def search_users(self, keyword: str, role: str = UserRoles.TEACHER, limit: int = 20) -> List[Dict[str, Any]]:
+        """按姓名或邮箱搜索用户（使用 pg_trgm 索引，见 migrations/add_user_search_trgm.sql）"""
+        try:
+            result = self.admin_client.rpc("search_users", {
+                "keyword": keyword,
+                "user_role_filter": role,
+                "max_results": limit
+            }).execute()
+            return result.data or []
+        except Exception as e:
+            logger.error(f"搜索用户失败: {e}")
+            return []
+    
     async def get_user_statistics(self) -> Dict[str, Any]:
         """获取用户统计信息（管理员功能）"""
+        try:
+            # 优先读取触发器维护的计数行（见 migrations/add_user_statistics_counters.sql）
+            counters = self.admin_client.table(Tables.USER_STATISTICS).select(
+                "total_users, teachers, managers, completed_training"
+            ).eq("id", 1).execute()
+            if counters.data:
+                return counters.data[0]
+        except Exception as e:
+            logger.warning(f"读取用户统计计数失败，改为实时统计: {e}")
+        
         try:
             # 总用户数
             total_users = self.client.table(Tables.USERS).select("id", count="exact").eq("is_active", True).execute()
@@ -213,4 +257,4 @@ class SupabaseUserService:
                 "teachers": 0,
                 "managers": 0,
                 "completed_training": 0
-            }
\ No newline at end of file
+            }
@@ -0,0 +1,266 @@
+"""
+教师批量导入服务
+流式解析 CSV/JSON 文件，逐行校验后并行计算密码哈希，按批次写入数据库，
+并生成逐行导入结果报告
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import validate_email
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_password_hash_async, hash_executor
+from app.services.dashboard_counter_service import DashboardCounterService, user_records_counters
+from app.services.activity_service import ActivityService, registration_event
+from app.models.user import User, UserRole, TrainingStatus
+
+logger = logging.getLogger(__name__)
+
+
+class TeacherImportService:
+    """教师批量导入服务类"""
+
+    BATCH_SIZE = 500
+    MIN_PASSWORD_LENGTH = 6
+
+    def __init__(self, db: AsyncSession, sync_supabase: bool = False):
+        self.db = db
+        self.sync_supabase = sync_supabase
+        self._supabase_service = None
+
+    @staticmethod
+    def iter_rows(stream: io.BufferedIOBase, filename: str = "") -> Iterator[Tuple[int, Any]]:
+        """读取上传文件，返回 (行号, 行数据) 迭代器；支持 CSV、JSON 数组和 JSON Lines
+
+        JSON 数组在这里整体解析，格式错误时在导入任何批次之前抛出 ValueError；
+        JSON Lines 中无法解析的行作为该行的错误写入报告
+        """
+        if filename.lower().endswith((".json", ".jsonl", ".ndjson")):
+            text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+            first = text.read(1)
+            while first and first.isspace():
+                first = text.read(1)
+
+            if first == "[":
+                rows = json.loads(first + text.read())
+                return enumerate(rows, start=1)
+            return _iter_json_lines(first, text)
+        return _iter_csv(stream)
+
+    def validate_row(self, row: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """校验单行数据，返回 (规范化数据, 错误信息)"""
+        if isinstance(row, RowParseError):
+            return None, str(row)
+        if not isinstance(row, dict):
+            return None, "行格式错误"
+
+        name = str(row.get("name") or "").strip()
+        email = str(row.get("email") or "").strip()
+        password = str(row.get("password") or "")
+        training_status = str(row.get("training_status") or TrainingStatus.NOT_STARTED.value).strip()
+
+        if not name:
+            return None, "姓名不能为空"
+        try:
+            _, email = validate_email(email)
+        except Exception:
+            return None, "邮箱格式无效"
+        if len(password) < self.MIN_PASSWORD_LENGTH:
+            return None, f"密码长度至少为{self.MIN_PASSWORD_LENGTH}位"
+        try:
+            training_status = TrainingStatus(training_status)
+        except ValueError:
+            return None, f"无效的培训状态: {training_status}"
+
+        return {
+            "email": email,
+            "name": name,
+            "password": password,
+            "training_status": training_status,
+        }, None
+
+    async def import_rows(self, rows: Iterable[Tuple[int, Any]]) -> Dict[str, Any]:
+        """导入教师数据，返回逐行结果报告"""
+        results: List[Dict[str, Any]] = []
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        seen_emails = set()
+
+        iterator = iter(rows)
+        last_row = 0
+        while True:
+            try:
+                row_number, row = next(iterator)
+            except StopIteration:
+                break
+            except (ValueError, UnicodeDecodeError) as e:
+                # 读取中途失败（如编码错误）：之前的批次已提交，报告中记录停止位置，后续行不再导入
+                results.append(_result(last_row + 1, "", "error", detail=f"文件解析失败，后续行未导入: {e}"))
+                break
+            last_row = row_number
+
+            data, error = self.validate_row(row)
+            if error:
+                results.append(_result(row_number, _row_email(row), "error", detail=error))
+                continue
+            if data["email"] in seen_emails:
+                results.append(_result(row_number, data["email"], "skipped", detail="文件中邮箱重复"))
+                continue
+
+            seen_emails.add(data["email"])
+            batch.append((row_number, data))
+            if len(batch) >= self.BATCH_SIZE:
+                results.extend(await self._import_batch(batch))
+                batch = []
+
+        if batch:
+            results.extend(await self._import_batch(batch))
+
+        results.sort(key=lambda item: item["row"])
+        return {
+            "total": len(results),
+            "created": sum(1 for item in results if item["status"] == "created"),
+            "skipped": sum(1 for item in results if item["status"] == "skipped"),
+            "failed": sum(1 for item in results if item["status"] == "error"),
+            "results": results,
+        }
+
+    async def _import_batch(self, batch: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """导入一个批次：过滤已存在邮箱、并行哈希、批量插入"""
+        results = []
+        emails = [data["email"] for _, data in batch]
+        existing = set(
+            (await self.db.execute(select(User.email).where(User.email.in_(emails)))).scalars().all()
+        )
+
+        pending = []
+        for row_number, data in batch:
+            if data["email"] in existing:
+                results.append(_result(row_number, data["email"], "skipped", detail="邮箱已存在"))
+            else:
+                pending.append((row_number, data))
+        if not pending:
+            return results
+
+        hashes = await self._hash_passwords([data["password"] for _, data in pending])
+        records = [
+            {
+                "email": data["email"],
+                "name": data["name"],
+                "hashed_password": hashed_password,
+                "role": UserRole.TEACHER,
+                "is_active": True,
+                "training_status": data["training_status"],
+                "training_progress": 0,
+            }
+            for (_, data), hashed_password in zip(pending, hashes)
+        ]
+
+        try:
+            await self.db.execute(insert(User), records)
+            # 批量插入不经过 ORM flush，需显式更新统计计数
+            await DashboardCounterService(self.db).apply_deltas(user_records_counters(records))
+            # 同理显式追加注册事件
+            inserted = (await self.db.execute(
+                select(User.id, User.email).where(User.email.in_([record["email"] for record in records]))
+            )).all()
+            user_ids = dict((email, user_id) for user_id, email in inserted)
+            await ActivityService(self.db).record_many(
+                registration_event(user_ids.get(record["email"]), record["name"], record["email"])
+                for record in records
+            )
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"批量插入教师失败: {e}")
+            results.extend(
+                _result(row_number, data["email"], "error", detail=f"写入数据库失败: {e}")
+                for row_number, data in pending
+            )
+            return results
+
+        ids = dict((await self.db.execute(
+            select(User.email, User.id).where(User.email.in_([record["email"] for record in records]))
+        )).all())
+
+        synced = set()
+        if self.sync_supabase:
+            synced = await self._sync_to_supabase(records)
+
+        for row_number, data in pending:
+            result = _result(row_number, data["email"], "created", id=ids.get(data["email"]))
+            if self.sync_supabase:
+                result["supabase_synced"] = data["email"] in synced
+            results.append(result)
+
+        return results
+
+    async def _hash_passwords(self, passwords: List[str]) -> List[str]:
+        """并行计算密码哈希，并发数不超过哈希执行器的工作线程数，避免触发排队上限"""
+        semaphore = asyncio.Semaphore(hash_executor.max_workers)
+
+        async def hash_one(password: str) -> str:
+            async with semaphore:
+                return await get_password_hash_async(password)
+
+        return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+    async def _sync_to_supabase(self, records: List[Dict[str, Any]]) -> set:
+        """将一个批次写入 Supabase users 表，返回成功同步的邮箱集合"""
+        if self._supabase_service is None:
+            from app.services.supabase_user_service import SupabaseUserService
+            self._supabase_service = SupabaseUserService()
+
+        created = await self._supabase_service.bulk_create_users([
+            {
+                **record,
+                "role": record["role"].value,
+                "training_status": record["training_status"].value,
+            }
+            for record in records
+        ])
+        return {user["email"] for user in created}
+
+
+class RowParseError(str):
+    """无法解析的行（作为行数据传给校验，生成该行的错误结果）"""
+
+
+def _iter_csv(stream: io.BufferedIOBase) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    # 第1行为表头，数据行号从2开始
+    for index, row in enumerate(reader, start=2):
+        yield index, row
+
+
+def _iter_json_lines(first: str, text: io.TextIOBase) -> Iterator[Tuple[int, Any]]:
+    """JSON Lines 逐行解析"""
+    for index, line in enumerate(_prepend(first, text), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield index, RowParseError(f"JSON 解析失败: {e.msg}（第{e.colno}列）")
+
+
+def _prepend(first: str, text: io.TextIOBase) -> Iterator[str]:
+    """将已读取的首字符拼回第一行"""
+    lines = iter(text)
+    yield first + next(lines, "")
+    yield from lines
+
+
+def _row_email(row: Any) -> str:
+    """尽量取出原始行中的邮箱用于报告"""
+    return str(row.get("email") or "") if isinstance(row, dict) else ""
+
+
+def _result(row_number: int, email: str, status: str, **extra) -> Dict[str, Any]:
+    """生成单行导入结果"""
+    return {"row": row_number, "email": email, "status": status, **extra}
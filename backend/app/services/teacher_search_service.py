@@ -0,0 +1,150 @@
+"""
+教师搜索服务
+SQLite 使用 FTS5 外部内容表（由触发器与 users 表同步）做带排名的前缀匹配；
+PostgreSQL 使用 pg_trgm 三元组索引（见 migrations/add_user_search_trgm.sql）
+"""
+
+import logging
+import re
+from typing import List
+
+from sqlalchemy import case, func, or_, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# FTS5 外部内容表：只保存倒排索引，内容从 users 表读取；prefix 为前缀查询预建索引
+USERS_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        name, email,
+        content='users', content_rowid='id',
+        tokenize='unicode61', prefix='1 2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END
+    """,
+]
+
+# 姓名命中的权重高于邮箱（bm25 分数越小越相关）
+FTS_SEARCH_SQL = """
+SELECT users.* FROM users_fts
+JOIN users ON users.id = users_fts.rowid
+WHERE users_fts MATCH :match AND users.role = :role
+ORDER BY bm25(users_fts, 2.0, 1.0)
+LIMIT :limit
+"""
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_user_search_index(connection):
+    """创建 FTS5 搜索表和同步触发器（可重复执行），首次创建时从 users 表重建索引；非 SQLite 数据库跳过"""
+    if connection.dialect.name != "sqlite":
+        return
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+    ).first()
+    try:
+        for statement in USERS_FTS_DDL:
+            connection.execute(text(statement))
+    except OperationalError as e:
+        # SQLite 未编译 FTS5 时退回 LIKE 查询
+        logger.warning(f"创建 FTS5 搜索表失败，教师搜索将使用 LIKE 查询: {e}")
+        return
+
+    if not exists:
+        connection.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        logger.info("已创建并重建教师搜索索引 users_fts")
+
+
+def build_match_query(keyword: str) -> str:
+    """将搜索词转换为 FTS5 前缀查询：每个词都需匹配（AND），词内按前缀匹配"""
+    terms = _TERM.findall(keyword)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _escape_like(keyword: str) -> str:
+    """转义 LIKE 通配符"""
+    return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class TeacherSearchService:
+    """教师搜索服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(self, keyword: str, limit: int = 20, role: UserRole = UserRole.TEACHER) -> List[User]:
+        """按姓名或邮箱前缀搜索用户，按相关度排序"""
+        keyword = keyword.strip()
+        if not keyword:
+            return []
+
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "sqlite":
+            match = build_match_query(keyword)
+            if not match:
+                return []
+            try:
+                return await self._search_fts(match, limit, role)
+            except OperationalError as e:
+                logger.warning(f"FTS5 搜索失败，改用 LIKE 查询: {e}")
+        elif dialect == "postgresql":
+            return await self._search_trigram(keyword, limit, role)
+
+        return await self._search_like(keyword, limit, role)
+
+    async def _search_fts(self, match: str, limit: int, role: UserRole) -> List[User]:
+        """FTS5 前缀匹配，bm25 排名"""
+        result = await self.db.execute(
+            select(User).from_statement(text(FTS_SEARCH_SQL)),
+            # SQLAlchemy 枚举列在 SQLite 中保存枚举名称
+            {"match": match, "role": role.name, "limit": limit}
+        )
+        return list(result.scalars().all())
+
+    async def _search_trigram(self, keyword: str, limit: int, role: UserRole) -> List[User]:
+        """pg_trgm 模糊匹配：前缀命中优先，其次按相似度排序"""
+        contains = f"%{_escape_like(keyword)}%"
+        prefix = f"{_escape_like(keyword)}%"
+        result = await self.db.execute(
+            select(User).where(
+                User.role == role,
+                or_(User.name.ilike(contains), User.email.ilike(contains))
+            ).order_by(
+                case((or_(User.name.ilike(prefix), User.email.ilike(prefix)), 0), else_=1),
+                func.greatest(func.similarity(User.name, keyword), func.similarity(User.email, keyword)).desc(),
+                User.id.desc()
+            ).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def _search_like(self, keyword: str, limit: int, role: UserRole) -> List[User]:
+        """LIKE 前缀匹配（无全文索引时的兜底方案）"""
+        prefix = f"{_escape_like(keyword)}%"
+        result = await self.db.execute(
+            select(User).where(
+                User.role == role,
+                or_(User.name.like(prefix, escape="\\"), User.email.like(prefix, escape="\\"))
+            ).order_by(User.name).limit(limit)
+        )
+        return list(result.scalars().all())
@@ -0,0 +1,119 @@
+"""
+资料文本提取
+TXT 直接解码；DOCX、PPTX 为 ZIP 包中的 XML，用标准库流式解析；
+PDF 需要安装 pypdf（未安装时跳过正文，只按标题、描述搜索）。
+旧版二进制 DOC、PPT 不提取
+"""
+
+import codecs
+import re
+import zipfile
+from pathlib import Path
+from typing import Iterator, Optional
+from xml.etree.ElementTree import iterparse
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DRAWING_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+
+TEXT_EXTENSIONS = (".txt", ".docx", ".pptx", ".pdf")
+
+_SLIDE_NAME = re.compile(r"^ppt/slides/slide(\d+)\.xml$")
+
+
+class TextExtractionError(Exception):
+    """文本提取失败"""
+
+
+def pdf_available() -> bool:
+    """是否安装了 pypdf"""
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _xml_paragraphs(xml_file, paragraph_tag: str, text_tag: str) -> Iterator[str]:
+    """流式读取 XML，按段落输出文本"""
+    parts = []
+    for event, element in iterparse(xml_file, events=("end",)):
+        if element.tag == text_tag and element.text:
+            parts.append(element.text)
+        elif element.tag == paragraph_tag:
+            if parts:
+                yield "".join(parts)
+                parts = []
+            element.clear()
+
+
+def _extract_docx(path: Path) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive:
+        with archive.open("word/document.xml") as document:
+            yield from _xml_paragraphs(document, f"{WORD_NS}p", f"{WORD_NS}t")
+
+
+def _extract_pptx(path: Path) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive:
+        slides = sorted(
+            (int(match.group(1)), name)
+            for name in archive.namelist()
+            if (match := _SLIDE_NAME.match(name))
+        )
+        for _, name in slides:
+            with archive.open(name) as slide:
+                yield from _xml_paragraphs(slide, f"{DRAWING_NS}p", f"{DRAWING_NS}t")
+
+
+def _extract_pdf(path: Path) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    for page in PdfReader(path).pages:
+        text = page.extract_text()
+        if text:
+            yield text
+
+
+def _extract_txt(path: Path, max_chars: int) -> Iterator[str]:
+    # 中文文本可能是 GBK 编码；每个字符最多 4 字节，只读取需要的部分
+    limit = max_chars * 4
+    with open(path, "rb") as file:
+        data = file.read(limit)
+    # 截断处可能切开最后一个字符：增量解码只丢弃末尾不完整的字节，其余部分仍严格解码
+    truncated = len(data) == limit
+    for encoding in ("utf-8-sig", "gb18030"):
+        try:
+            yield codecs.getincrementaldecoder(encoding)().decode(data, final=not truncated)
+            return
+        except UnicodeDecodeError:
+            continue
+    yield data.decode("utf-8", errors="ignore")
+
+
+def extract_text(path: Path, max_chars: int) -> Optional[str]:
+    """提取文件文本，最多 max_chars 个字符；不支持的格式返回 None"""
+    suffix = path.suffix.lower()
+    if suffix == ".txt":
+        paragraphs = _extract_txt(path, max_chars)
+    elif suffix == ".docx":
+        paragraphs = _extract_docx(path)
+    elif suffix == ".pptx":
+        paragraphs = _extract_pptx(path)
+    elif suffix == ".pdf" and pdf_available():
+        paragraphs = _extract_pdf(path)
+    else:
+        return None
+
+    chunks = []
+    length = 0
+    try:
+        for paragraph in paragraphs:
+            chunks.append(paragraph)
+            length += len(paragraph) + 1
+            if length >= max_chars:
+                break
+    except (zipfile.BadZipFile, KeyError, SyntaxError) as e:
+        # 损坏的 ZIP、缺少正文 XML 或 XML 解析错误（ParseError 是 SyntaxError 的子类）
+        raise TextExtractionError(f"文件格式错误: {e}")
+    except Exception as e:
+        raise TextExtractionError(str(e))
+    return "\n".join(chunks)[:max_chars]
@@ -9,6 +9,7 @@ from app.core.security import get_password_hash
 from app.models.user import User, UserRole, TrainingStatus
 from app.models.training import TrainingMaterial, MaterialType
 from app.models.sync import MaterialSyncRecord, SyncLog, MaterialVersion
+from app.utils.migrate_indexes import ensure_indexes
 
 
 def create_initial_users(db: Session):
@@ -126,6 +127,10 @@ def init_database():
     create_tables()
     print("数据库表创建完成")
     
+    # 为已有表补建索引
+    ensure_indexes()
+    print("数据库索引检查完成")
+    
     # 创建数据库会话
     db = SessionLocal()
     
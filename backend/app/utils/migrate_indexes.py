@@ -0,0 +1,72 @@
+"""
+索引迁移脚本
+为已有数据库补建模型中声明的索引和教师搜索索引，可重复执行；
+创建学习进度唯一索引前先清理重复记录
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+import app.models  # noqa: F401  确保所有模型已注册到 Base.metadata
+from app.core.database import Base, engine as default_engine
+from app.services.teacher_search_service import ensure_user_search_index
+
+# 每个 (user_id, material_id) 只保留一条记录：优先已完成、学习时长最长、最新的一条
+DEDUPE_LEARNING_PROGRESS_SQL = """
+DELETE FROM learning_progress
+WHERE id NOT IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id, material_id
+            ORDER BY is_completed DESC, total_study_seconds DESC, id DESC
+        ) AS row_number
+        FROM learning_progress
+    ) ranked
+    WHERE row_number = 1
+)
+"""
+
+
+def dedupe_learning_progress(connection) -> int:
+    """清理重复的学习进度记录，返回删除的行数"""
+    result = connection.execute(text(DEDUPE_LEARNING_PROGRESS_SQL))
+    return result.rowcount
+
+
+def ensure_indexes(engine: Engine = None) -> list:
+    """补建缺失的索引，返回本次新建的索引名称列表"""
+    engine = engine or default_engine
+    created = []
+
+    with engine.begin() as connection:
+        existing_tables = set(inspect(connection).get_table_names())
+
+        if "learning_progress" in existing_tables:
+            removed = dedupe_learning_progress(connection)
+            if removed:
+                print(f"已清理重复的学习进度记录: {removed} 条")
+
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_indexes = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=connection)
+                    created.append(index.name)
+
+        if "users" in existing_tables:
+            ensure_user_search_index(connection)
+
+    return created
+
+
+if __name__ == "__main__":
+    created = ensure_indexes()
+    if created:
+        print("已创建索引：")
+        for name in created:
+            print(f"- {name}")
+    else:
+        print("索引已是最新，无需迁移")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+SQLite 性能配置基准测试
+模拟并发的学习进度心跳写入和列表读取，对比 default 与 production 配置的吞吐量和锁冲突次数
+
+用法: python benchmark_sqlite_profile.py [--writers 8] [--readers 8] [--seconds 10]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import apply_sqlite_profile, get_read_only_database_url
+
+ROWS = 1000
+
+
+def prepare_database(path):
+    """创建测试表并写入初始数据"""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE progress (id INTEGER PRIMARY KEY, user_id INTEGER, "
+            "progress_percentage REAL, study_duration INTEGER, updated_at TEXT)"
+        ))
+        conn.execute(
+            text("INSERT INTO progress (user_id, progress_percentage, study_duration, updated_at) "
+                 "VALUES (:user_id, 0, 0, datetime('now'))"),
+            [{"user_id": i % 100} for i in range(ROWS)]
+        )
+    engine.dispose()
+
+
+def run_profile(profile, writers, readers, seconds):
+    """在指定配置下运行一轮读写压测"""
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    prepare_database(path)
+
+    url = f"sqlite:///{path}"
+    write_engine = create_engine(url, connect_args={"check_same_thread": False})
+    apply_sqlite_profile(write_engine, profile)
+
+    read_url = get_read_only_database_url(url) if profile == "production" else None
+    read_engine = create_engine(read_url or url, connect_args={"check_same_thread": False})
+    apply_sqlite_profile(read_engine, profile, read_only=read_url is not None)
+
+    counters = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def count(name):
+        with lock:
+            counters[name] += 1
+
+    def writer(worker_id):
+        i = worker_id
+        while time.monotonic() < deadline:
+            try:
+                with write_engine.begin() as conn:
+                    conn.execute(
+                        text("UPDATE progress SET progress_percentage = progress_percentage + 1, "
+                             "study_duration = study_duration + 30, updated_at = datetime('now') WHERE id = :id"),
+                        {"id": i % ROWS + 1}
+                    )
+                count("writes")
+            except OperationalError:
+                count("locked")
+            i += writers
+
+    def reader(worker_id):
+        while time.monotonic() < deadline:
+            try:
+                with read_engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT * FROM progress WHERE user_id = :user_id ORDER BY updated_at DESC"),
+                        {"user_id": worker_id % 100}
+                    ).fetchall()
+                count("reads")
+            except OperationalError:
+                count("locked")
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    write_engine.dispose()
+    read_engine.dispose()
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 性能配置基准测试")
+    parser.add_argument("--writers", type=int, default=8, help="并发写线程数")
+    parser.add_argument("--readers", type=int, default=8, help="并发读线程数")
+    parser.add_argument("--seconds", type=int, default=10, help="每种配置的压测时长（秒）")
+    args = parser.parse_args()
+
+    print(f"写线程: {args.writers}, 读线程: {args.readers}, 时长: {args.seconds}秒")
+    print(f"{'配置':<12}{'写入/秒':>10}{'读取/秒':>10}{'锁冲突':>10}")
+    for profile in ("default", "production"):
+        result = run_profile(profile, args.writers, args.readers, args.seconds)
+        print(
+            f"{profile:<12}"
+            f"{result['writes'] / args.seconds:>10.1f}"
+            f"{result['reads'] / args.seconds:>10.1f}"
+            f"{result['locked']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
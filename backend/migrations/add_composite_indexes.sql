@@ -0,0 +1,30 @@
+-- 添加复合索引和部分索引
+-- 可重复执行：所有语句均为幂等操作
+
+-- 清理重复的学习进度记录：每个用户每个资料只保留一条（优先已完成、学习时长最长、最新的一条）
+DELETE FROM learning_progress
+WHERE id NOT IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id, material_id
+            ORDER BY is_completed DESC, total_study_seconds DESC, id DESC
+        ) AS row_number
+        FROM learning_progress
+    ) ranked
+    WHERE row_number = 1
+);
+
+-- 学习进度唯一索引（旧库可能缺少 UNIQUE 约束）
+CREATE UNIQUE INDEX IF NOT EXISTS uq_learning_progress_user_material ON learning_progress(user_id, material_id);
+-- 已被唯一索引的前导列覆盖
+DROP INDEX IF EXISTS idx_learning_progress_user_id;
+
+-- 培训资料按状态过滤并按排序索引排列
+CREATE INDEX IF NOT EXISTS idx_training_materials_status_order ON training_materials(status, order_index);
+CREATE INDEX IF NOT EXISTS idx_training_materials_published_order ON training_materials(order_index) WHERE status = 'published';
+
+-- 练习记录按用户过滤并按时间倒序
+CREATE INDEX IF NOT EXISTS idx_practice_sessions_user_created ON practice_sessions(user_id, created_at DESC);
+-- 已被复合索引的前导列覆盖
+DROP INDEX IF EXISTS idx_practice_sessions_user_id;
+CREATE INDEX IF NOT EXISTS idx_practice_sessions_completed_created ON practice_sessions(created_at DESC) WHERE status = 'completed';
@@ -0,0 +1,11 @@
+-- 添加管理端列表键集分页所需的索引
+-- 可重复执行：所有语句均为幂等操作
+
+-- 教师列表：按角色（及培训状态）筛选后按 id 倒序分页；每种筛选组合的索引都以 id 结尾，翻页无需排序
+CREATE INDEX IF NOT EXISTS idx_users_role_id ON users(role, id);
+CREATE INDEX IF NOT EXISTS idx_users_role_training_status_id ON users(role, training_status, id);
+
+-- 资料列表：按类别、状态筛选后按 id 倒序分页
+CREATE INDEX IF NOT EXISTS idx_training_materials_category_id ON training_materials(category, id);
+CREATE INDEX IF NOT EXISTS idx_training_materials_status_id ON training_materials(status, id);
+CREATE INDEX IF NOT EXISTS idx_training_materials_category_status_id ON training_materials(category, status, id);
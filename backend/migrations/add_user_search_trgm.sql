@@ -0,0 +1,35 @@
+-- 添加教师搜索索引
+-- 可重复执行；执行后可通过 RPC search_users 搜索用户
+
+-- 教师搜索：pg_trgm 三元组索引支持姓名和邮箱的模糊/前缀匹配
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING GIN (email gin_trgm_ops);
+
+-- 按姓名或邮箱搜索用户：前缀命中优先，其次按相似度排序
+CREATE OR REPLACE FUNCTION search_users(keyword TEXT, user_role_filter user_role DEFAULT 'teacher', max_results INTEGER DEFAULT 20)
+RETURNS TABLE (
+    id BIGINT,
+    email VARCHAR,
+    name VARCHAR,
+    role user_role,
+    is_active BOOLEAN,
+    training_status training_status,
+    training_progress INTEGER,
+    created_at TIMESTAMPTZ
+) AS $$
+    WITH k AS (
+        -- 转义 LIKE 通配符
+        SELECT replace(replace(replace(keyword, '\', '\\'), '%', '\%'), '_', '\_') AS pattern
+    )
+    SELECT u.id, u.email, u.name, u.role, u.is_active, u.training_status, u.training_progress, u.created_at
+    FROM users u, k
+    WHERE u.role = user_role_filter
+      AND (u.name ILIKE '%' || k.pattern || '%' OR u.email ILIKE '%' || k.pattern || '%')
+    ORDER BY
+        (u.name ILIKE k.pattern || '%' OR u.email ILIKE k.pattern || '%') DESC,
+        GREATEST(similarity(u.name, keyword), similarity(u.email, keyword)) DESC,
+        u.id DESC
+    LIMIT max_results;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,83 @@
+-- 添加用户统计计数表
+-- 管理端统计只读一行，不再每次执行多次 COUNT 查询；可重复执行
+
+-- 用户统计计数表（单行），由 users 表触发器在同一事务内增量维护
+CREATE TABLE IF NOT EXISTS user_statistics (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    total_users BIGINT NOT NULL DEFAULT 0, -- 启用的用户数
+    teachers BIGINT NOT NULL DEFAULT 0,
+    managers BIGINT NOT NULL DEFAULT 0,
+    completed_training BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- 仅服务角色可访问
+ALTER TABLE user_statistics ENABLE ROW LEVEL SECURITY;
+
+-- 根据用户行的变化（修改前后）更新计数
+-- 以函数所有者身份执行：users 表的写入可能来自匿名密钥客户端，而 user_statistics 启用了 RLS 且没有策略，
+-- 以调用者身份执行时 UPDATE 匹配 0 行，计数会静默偏离
+CREATE OR REPLACE FUNCTION apply_user_statistics_delta()
+RETURNS TRIGGER AS $$
+DECLARE
+    delta_total BIGINT := 0;
+    delta_teachers BIGINT := 0;
+    delta_managers BIGINT := 0;
+    delta_completed BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND COALESCE(OLD.is_active, false) THEN
+        delta_total := delta_total - 1;
+        delta_teachers := delta_teachers - (OLD.role = 'teacher')::int;
+        delta_managers := delta_managers - (OLD.role = 'manager')::int;
+        delta_completed := delta_completed - COALESCE(OLD.training_status = 'completed', false)::int;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND COALESCE(NEW.is_active, false) THEN
+        delta_total := delta_total + 1;
+        delta_teachers := delta_teachers + (NEW.role = 'teacher')::int;
+        delta_managers := delta_managers + (NEW.role = 'manager')::int;
+        delta_completed := delta_completed + COALESCE(NEW.training_status = 'completed', false)::int;
+    END IF;
+
+    IF delta_total <> 0 OR delta_teachers <> 0 OR delta_managers <> 0 OR delta_completed <> 0 THEN
+        UPDATE user_statistics SET
+            total_users = total_users + delta_total,
+            teachers = teachers + delta_teachers,
+            managers = managers + delta_managers,
+            completed_training = completed_training + delta_completed,
+            updated_at = NOW()
+        WHERE id = 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS maintain_user_statistics ON users;
+CREATE TRIGGER maintain_user_statistics
+    AFTER INSERT OR DELETE OR UPDATE OF role, is_active, training_status ON users
+    FOR EACH ROW EXECUTE FUNCTION apply_user_statistics_delta();
+
+-- 从 users 表重建计数（计数出现偏差时执行：SELECT * FROM reconcile_user_statistics();）
+CREATE OR REPLACE FUNCTION reconcile_user_statistics()
+RETURNS SETOF user_statistics AS $$
+    INSERT INTO user_statistics (id, total_users, teachers, managers, completed_training, updated_at)
+    SELECT
+        1,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE role = 'teacher'),
+        COUNT(*) FILTER (WHERE role = 'manager'),
+        COUNT(*) FILTER (WHERE training_status = 'completed'),
+        NOW()
+    FROM users
+    WHERE is_active
+    ON CONFLICT (id) DO UPDATE SET
+        total_users = EXCLUDED.total_users,
+        teachers = EXCLUDED.teachers,
+        managers = EXCLUDED.managers,
+        completed_training = EXCLUDED.completed_training,
+        updated_at = EXCLUDED.updated_at
+    RETURNING *;
+$$ LANGUAGE sql;
+
+SELECT * FROM reconcile_user_statistics();
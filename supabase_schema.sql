@@ -120,14 +120,24 @@ CREATE TABLE learning_progress (
 -- 7. 创建索引以提高查询性能
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_role ON users(role);
+CREATE INDEX idx_users_role_id ON users(role, id);
+CREATE INDEX idx_users_role_training_status_id ON users(role, training_status, id);
 CREATE INDEX idx_training_materials_type ON training_materials(type);
 CREATE INDEX idx_training_materials_status ON training_materials(status);
-CREATE INDEX idx_practice_sessions_user_id ON practice_sessions(user_id);
+CREATE INDEX idx_training_materials_status_order ON training_materials(status, order_index);
+CREATE INDEX idx_training_materials_category_id ON training_materials(category, id);
+CREATE INDEX idx_training_materials_status_id ON training_materials(status, id);
+CREATE INDEX idx_training_materials_category_status_id ON training_materials(category, status, id);
 CREATE INDEX idx_practice_sessions_status ON practice_sessions(status);
+CREATE INDEX idx_practice_sessions_user_created ON practice_sessions(user_id, created_at DESC);
 CREATE INDEX idx_feedback_practice_session_id ON feedback(practice_session_id);
-CREATE INDEX idx_learning_progress_user_id ON learning_progress(user_id);
+-- learning_progress 的 (user_id, material_id) 查询由上面的唯一约束覆盖
 CREATE INDEX idx_learning_progress_material_id ON learning_progress(material_id);
 
+-- 部分索引：只索引热点状态的行
+CREATE INDEX idx_training_materials_published_order ON training_materials(order_index) WHERE status = 'published';
+CREATE INDEX idx_practice_sessions_completed_created ON practice_sessions(created_at DESC) WHERE status = 'completed';
+
 -- 8. 创建更新时间戳的触发器函数
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -215,4 +225,120 @@ INSERT INTO users (email, name, hashed_password, role) VALUES
 INSERT INTO training_materials (title, description, category, type, status) VALUES 
 ('教学方法基础', '介绍基本的在线教学方法和技巧', '教学方法', 'document', 'published'),
 ('课堂互动技巧', '如何在在线课堂中提高学生参与度', '教学技巧', 'video', 'published'),
-('教学工具使用指南', '常用在线教学工具的使用方法', '技术工具', 'document', 'published');
\ No newline at end of file
+('教学工具使用指南', '常用在线教学工具的使用方法', '技术工具', 'document', 'published');
+
+-- 13. 用户统计计数表
+-- 用户统计计数表（单行），由 users 表触发器在同一事务内增量维护
+CREATE TABLE IF NOT EXISTS user_statistics (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    total_users BIGINT NOT NULL DEFAULT 0, -- 启用的用户数
+    teachers BIGINT NOT NULL DEFAULT 0,
+    managers BIGINT NOT NULL DEFAULT 0,
+    completed_training BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- 仅服务角色可访问
+ALTER TABLE user_statistics ENABLE ROW LEVEL SECURITY;
+
+-- 根据用户行的变化（修改前后）更新计数
+-- 以函数所有者身份执行：users 表的写入可能来自匿名密钥客户端，而 user_statistics 启用了 RLS 且没有策略，
+-- 以调用者身份执行时 UPDATE 匹配 0 行，计数会静默偏离
+CREATE OR REPLACE FUNCTION apply_user_statistics_delta()
+RETURNS TRIGGER AS $$
+DECLARE
+    delta_total BIGINT := 0;
+    delta_teachers BIGINT := 0;
+    delta_managers BIGINT := 0;
+    delta_completed BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND COALESCE(OLD.is_active, false) THEN
+        delta_total := delta_total - 1;
+        delta_teachers := delta_teachers - (OLD.role = 'teacher')::int;
+        delta_managers := delta_managers - (OLD.role = 'manager')::int;
+        delta_completed := delta_completed - COALESCE(OLD.training_status = 'completed', false)::int;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND COALESCE(NEW.is_active, false) THEN
+        delta_total := delta_total + 1;
+        delta_teachers := delta_teachers + (NEW.role = 'teacher')::int;
+        delta_managers := delta_managers + (NEW.role = 'manager')::int;
+        delta_completed := delta_completed + COALESCE(NEW.training_status = 'completed', false)::int;
+    END IF;
+
+    IF delta_total <> 0 OR delta_teachers <> 0 OR delta_managers <> 0 OR delta_completed <> 0 THEN
+        UPDATE user_statistics SET
+            total_users = total_users + delta_total,
+            teachers = teachers + delta_teachers,
+            managers = managers + delta_managers,
+            completed_training = completed_training + delta_completed,
+            updated_at = NOW()
+        WHERE id = 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS maintain_user_statistics ON users;
+CREATE TRIGGER maintain_user_statistics
+    AFTER INSERT OR DELETE OR UPDATE OF role, is_active, training_status ON users
+    FOR EACH ROW EXECUTE FUNCTION apply_user_statistics_delta();
+
+-- 从 users 表重建计数（计数出现偏差时执行：SELECT * FROM reconcile_user_statistics();）
+CREATE OR REPLACE FUNCTION reconcile_user_statistics()
+RETURNS SETOF user_statistics AS $$
+    INSERT INTO user_statistics (id, total_users, teachers, managers, completed_training, updated_at)
+    SELECT
+        1,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE role = 'teacher'),
+        COUNT(*) FILTER (WHERE role = 'manager'),
+        COUNT(*) FILTER (WHERE training_status = 'completed'),
+        NOW()
+    FROM users
+    WHERE is_active
+    ON CONFLICT (id) DO UPDATE SET
+        total_users = EXCLUDED.total_users,
+        teachers = EXCLUDED.teachers,
+        managers = EXCLUDED.managers,
+        completed_training = EXCLUDED.completed_training,
+        updated_at = EXCLUDED.updated_at
+    RETURNING *;
+$$ LANGUAGE sql;
+
+SELECT * FROM reconcile_user_statistics();
+
+-- 14. 教师搜索
+-- 教师搜索：pg_trgm 三元组索引支持姓名和邮箱的模糊/前缀匹配
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING GIN (email gin_trgm_ops);
+
+-- 按姓名或邮箱搜索用户：前缀命中优先，其次按相似度排序
+CREATE OR REPLACE FUNCTION search_users(keyword TEXT, user_role_filter user_role DEFAULT 'teacher', max_results INTEGER DEFAULT 20)
+RETURNS TABLE (
+    id BIGINT,
+    email VARCHAR,
+    name VARCHAR,
+    role user_role,
+    is_active BOOLEAN,
+    training_status training_status,
+    training_progress INTEGER,
+    created_at TIMESTAMPTZ
+) AS $$
+    WITH k AS (
+        -- 转义 LIKE 通配符
+        SELECT replace(replace(replace(keyword, '\', '\\'), '%', '\%'), '_', '\_') AS pattern
+    )
+    SELECT u.id, u.email, u.name, u.role, u.is_active, u.training_status, u.training_progress, u.created_at
+    FROM users u, k
+    WHERE u.role = user_role_filter
+      AND (u.name ILIKE '%' || k.pattern || '%' OR u.email ILIKE '%' || k.pattern || '%')
+    ORDER BY
+        (u.name ILIKE k.pattern || '%' OR u.email ILIKE k.pattern || '%') DESC,
+        GREATEST(similarity(u.name, keyword), similarity(u.email, keyword)) DESC,
+        u.id DESC
+    LIMIT max_results;
+$$ LANGUAGE sql STABLE;